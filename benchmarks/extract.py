@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+# Benchmark the targeted extraction against a full cclib parse
+import os
+import sys
+import argparse
+import warnings
+
+from timeit import repeat
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cclib.io import ccread
+
+from qgrep.extraction import extract, NATIVE_FIELDS
+from qgrep.helper import check_program
+
+tests_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests')
+default_files = [
+    os.path.join(tests_dir, 'orca', 'Benzene_freqs.out'),
+    os.path.join(tests_dir, 'orca', 'CH3F_Cl_scan.out'),
+    os.path.join(tests_dir, 'orca', 'H2O_hybrid_hess.out'),
+    os.path.join(tests_dir, 'psi4_output.dat'),
+]
+
+parser = argparse.ArgumentParser(description='Time qgrep.extract against cclib.io.ccread.')
+parser.add_argument('-i', '--input', help='The file(s) to benchmark.',
+                    type=str, nargs='+', default=default_files)
+parser.add_argument('-f', '--fields', help='Fields to extract (defaults to all native fields of the program).',
+                    type=str, nargs='+', default=None)
+parser.add_argument('-r', '--repeat', help='Number of repetitions (the best is reported).',
+                    type=int, default=5)
+
+args = parser.parse_args()
+warnings.filterwarnings('ignore')
+
+
+def best(func):
+    """Best time of args.repeat single runs"""
+    return min(repeat(func, number=1, repeat=args.repeat))
+
+
+length = max(len(os.path.basename(inp)) for inp in args.input)
+print(f'{"File":{length}s}  Program  {"cclib (s)":>10s}  {"extract (s)":>11s}  Speedup')
+speedups = {}
+for inp in args.input:
+    program = check_program(inp)
+    fields = args.fields or NATIVE_FIELDS.get(program, ['scfenergies'])
+    cclib_time = best(lambda: ccread(inp))
+    extract_time = best(lambda: extract(inp, fields, program, use_cache=False))
+    speedup = cclib_time/extract_time
+    speedups.setdefault(program, []).append(speedup)
+    print(f'{os.path.basename(inp):{length}s}  {program:7s}  {cclib_time:10.4f}  {extract_time:11.4f}  {speedup:6.1f}x')
+
+print()
+for program, values in speedups.items():
+    print(f'{program:7s}: {sum(values)/len(values):6.1f}x mean speedup over {len(values)} file(s)')
@@ -0,0 +1,564 @@
+"""
+Generators of synthetic, arbitrarily large outputs for the benchmarks
+
+Every generator returns the text of a file and only writes the sections (and
+the exact layout) that the qgrep parsers read. The results are deterministic
+for a given seed so that timings can be compared across commits.
+"""
+import os
+import sys
+import random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qgrep.atom import atomic_masses, atomic_numbers
+
+ORCA_HEADER = '''
+                                 *****************
+                                 * O   R   C   A *
+                                 *****************
+
+'''
+
+# Orbital labels printed for each atom by ORCA population analyses
+AOS = {
+    'H': ['s', 'pz', 'px', 'py'],
+    'C': ['s', 'pz', 'px', 'py', 'dz2', 'dxz', 'dyz', 'dx2y2', 'dxy'],
+    'N': ['s', 'pz', 'px', 'py', 'dz2', 'dxz', 'dyz', 'dx2y2', 'dxy'],
+    'O': ['s', 'pz', 'px', 'py', 'dz2', 'dxz', 'dyz', 'dx2y2', 'dxy'],
+}
+
+
+def molecule(natoms, seed=0):
+    """
+    Random organic-like molecule
+    :param natoms: number of atoms
+    :param seed: random seed
+    :return: list of [atom, [x, y, z]] in angstrom
+    """
+    rng = random.Random(seed)
+    size = 1.5*natoms**(1/3)
+    atoms = rng.choices(['C', 'H', 'N', 'O'], weights=[4, 5, 1, 1], k=natoms)
+    return [[atom, [rng.uniform(-size, size) for _ in range(3)]] for atom in atoms]
+
+
+def _orca_coordinates(geom):
+    """Cartesian coordinate blocks (angstrom and bohr) printed by ORCA"""
+    out = '---------------------------------\nCARTESIAN COORDINATES (ANGSTROEM)\n---------------------------------\n'
+    for atom, (x, y, z) in geom:
+        out += f'  {atom:2s} {x:12.6f} {y:12.6f} {z:12.6f}\n'
+    out += '\n----------------------------\nCARTESIAN COORDINATES (A.U.)\n----------------------------\n'
+    out += '  NO LB      ZA    FRAG    MASS        X           Y           Z\n'
+    for i, (atom, xyz) in enumerate(geom):
+        number = atomic_numbers[atom]
+        bohr = (f'{q/0.52917721067:20.15f}' for q in xyz)
+        out += f'{i:4d} {atom:2s} {number:8.4f}    0 {atomic_masses[number]:9.3f}  {"  ".join(bohr)}\n'
+    return out + '\n'
+
+
+def orca_optimization(steps=5000, natoms=20, seed=0):
+    """
+    ORCA geometry optimization
+    :param steps: number of optimization cycles
+    :param natoms: number of atoms
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    geom = molecule(natoms, seed)
+    energy = -40.0*natoms
+    out = ORCA_HEADER + f'Number of atoms                         .... {natoms:3d}\n'
+    out += ' Total Charge           Charge          ....    0\n'
+    out += ' Multiplicity           Mult            ....    1\n\n'
+    out += ('Convergence Tolerances:\n'
+            'Energy Change            TolE     ....  1.0000e-06 Eh\n'
+            'Max. Gradient            TolMAXG  ....  1.0000e-04 Eh/bohr\n'
+            'RMS Gradient             TolRMSG  ....  3.0000e-05 Eh/bohr\n'
+            'Max. Displacement        TolMAXD  ....  1.0000e-03 bohr\n'
+            'RMS Displacement         TolRMSD  ....  6.0000e-04 bohr\n\n')
+    for step in range(1, steps + 1):
+        out += ('         *************************************************************\n'
+                f'         *                GEOMETRY OPTIMIZATION CYCLE {step:4d}            *\n'
+                '         *************************************************************\n')
+        out += _orca_coordinates(geom)
+        delta = -rng.uniform(0, 1e-3)/step
+        energy += delta
+        out += f'               *           SCF CONVERGED AFTER {rng.randint(4, 20):3d} CYCLES          *\n\n'
+        out += f'Total Energy       :   {energy:19.8f} Eh   {energy*27.21138505:19.5f} eV\n\n'
+        out += f'FINAL SINGLE POINT ENERGY    {energy:20.12f}\n\n'
+        out += ('                                .--------------------.\n'
+                '          ----------------------|Geometry convergence|---------------------\n'
+                '          Item                value                 Tolerance   Converged\n'
+                '          -----------------------------------------------------------------\n')
+        if step > 1:
+            out += f'          Energy change {delta:15.8f}            0.00000100      NO\n'
+        for item, tolerance in [('RMS gradient', 3e-5), ('MAX gradient', 1e-4), ('RMS step', 6e-4), ('MAX step', 1e-3)]:
+            out += f'          {item:14s} {rng.uniform(0, 10*tolerance)/step:15.8f} {tolerance:17.8f}      NO\n'
+        out += '          -----------------------------------------------------------------\n\n'
+        for atom in geom:
+            atom[1] = [q + rng.gauss(0, 0.01/step) for q in atom[1]]
+    out += '                                *** OPTIMIZATION RUN DONE ***\n\n'
+    out += '                             ****ORCA TERMINATED NORMALLY****\n'
+    out += 'TOTAL RUN TIME: 0 days 1 hours 2 minutes 3 seconds 456 msec\n'
+    return out
+
+
+def orca_frequencies(natoms=300, seed=0):
+    """
+    ORCA frequency calculation (frequencies, normal modes and IR spectrum)
+    :param natoms: number of atoms
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    geom = molecule(natoms, seed)
+    nmodes = 3*natoms
+    freqs = [0.0]*6 + sorted(rng.uniform(20, 3500) for _ in range(nmodes - 6))
+
+    out = ORCA_HEADER + f'Number of atoms                         .... {natoms:3d}\n\n'
+    out += _orca_coordinates(geom)
+    out += '\n-----------------------\nVIBRATIONAL FREQUENCIES\n-----------------------\n\n'
+    out += ''.join(f'{i:5d}: {freq:12.2f} cm**-1\n' for i, freq in enumerate(freqs))
+    out += ('\n\n------------\nNORMAL MODES\n------------\n\n'
+            'These modes are the cartesian displacements weighted by the diagonal matrix\n'
+            'M(i,i)=1/sqrt(m[i]) where m[i] is the mass of the displaced atom\n'
+            'Thus, these vectors are normalized but *not* orthogonal\n\n')
+    for start in range(0, nmodes, 6):
+        columns = range(start, min(start + 6, nmodes))
+        out += '         ' + ''.join(f'{j:11d}' for j in columns) + '    \n'
+        for i in range(nmodes):
+            values = (0.0 if j < 6 else rng.uniform(-0.5, 0.5) for j in columns)
+            out += f'{i:7d}    ' + ''.join(f'{value:11.6f}' for value in values) + '\n'
+    out += ('\n\n-----------\nIR SPECTRUM\n-----------\n\n'
+            ' Mode    freq (cm**-1)   T**2         TX         TY         TZ\n'
+            '-------------------------------------------------------------------\n')
+    for i, freq in enumerate(freqs[6:], start=6):
+        tx, ty, tz = (rng.uniform(-1, 1) for _ in range(3))
+        out += f'{i:4d}: {freq:12.2f} {tx*tx + ty*ty + tz*tz:11.6f}  ({tx:10.6f} {ty:10.6f} {tz:10.6f})\n'
+    out += '\nThe first frequency considered to be a vibration is 6\n'
+    out += '\n                             ****ORCA TERMINATED NORMALLY****\n'
+    return out
+
+
+def orca_hess(natoms=300, seed=0):
+    """
+    ORCA .hess file (Hessian, frequencies, normal modes, atoms and IR spectrum)
+    :param natoms: number of atoms
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    geom = molecule(natoms, seed)
+    n = 3*natoms
+    freqs = [0.0]*6 + sorted(rng.uniform(20, 3500) for _ in range(n - 6))
+
+    def matrix(width, form, value):
+        out = ''
+        for start in range(0, n, width):
+            columns = range(start, min(start + width, n))
+            out += '            ' + ''.join(f'{j:{len(form % 0)}d}' for j in columns) + '    \n'
+            for i in range(n):
+                out += f'{i:7d}   ' + ''.join(form % value(i, j) for j in columns) + '\n'
+        return out
+
+    out = '\n$orca_hessian_file\n\n$act_atom\n  0\n\n$act_coord\n  0\n\n'
+    out += f'$act_energy\n     {rng.uniform(-2000, -100):.6f}\n\n'
+    out += f'$hessian\n{n}\n' + matrix(5, '%19.10E', lambda i, j: rng.uniform(-0.5, 0.5)) + '\n'
+    out += f'$vibrational_frequencies\n{n}\n' + ''.join(f'{i:5d}   {freq:13.6f}\n' for i, freq in enumerate(freqs))
+    out += f'\n$normal_modes\n{n} {n}\n' + matrix(6, '%11.6f', lambda i, j: 0.0 if j < 6 else rng.uniform(-0.5, 0.5))
+    out += '\n#\n# The atoms: label  mass x y z (in bohrs)\n#\n'
+    out += f'$atoms\n{natoms}\n'
+    for atom, xyz in geom:
+        bohr = ''.join(f'{q/0.52917721067:20.12f}' for q in xyz)
+        out += f' {atom:2s} {atomic_masses[atomic_numbers[atom]]:10.4f}  {bohr}\n'
+    out += f'\n$dipole_derivatives\n{n}\n'
+    out += ''.join(''.join(f'{rng.uniform(-1, 1):15.6E}' for _ in range(3)) + '\n' for _ in range(n))
+    out += '\n#\n# The IR spectrum\n#  wavenumber[cm-1]  T**2  TX  TY  TZ\n#\n'
+    out += f'$ir_spectrum\n{n}\n'
+    for freq in freqs:
+        tx, ty, tz = (0.0, 0.0, 0.0) if freq == 0 else (rng.uniform(-1, 1) for _ in range(3))
+        out += f'{freq:10.2f}{tx*tx + ty*ty + tz*tz:14.6f}{tx:14.6f}{ty:14.6f}{tz:14.6f}\n'
+    return out + '\n$end\n\n'
+
+
+def lowdin_population(norbitals=2000, natoms=None, seed=0):
+    """
+    ORCA Löwdin reduced orbital populations per MO (closed shell)
+    :param norbitals: number of molecular orbitals
+    :param natoms: number of atoms (defaults to enough atoms for the orbitals)
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    natoms = natoms or max(1, norbitals//6)
+    geom = molecule(natoms, seed)
+    aos = [(i, atom, ao) for i, (atom, _) in enumerate(geom) for ao in AOS[atom]]
+    nocc = norbitals//2
+    energy = -20.0
+
+    out = ORCA_HEADER
+    out += ('------------------------------------------\n'
+            'LOEWDIN REDUCED ORBITAL POPULATIONS PER MO\n'
+            '-------------------------------------------\n'
+            'THRESHOLD FOR PRINTING IS 0.1%\n')
+    blocks = []
+    for start in range(0, norbitals, 6):
+        columns = range(start, min(start + 6, norbitals))
+        energies = []
+        for _ in columns:
+            energy += rng.uniform(0, 40/norbitals)
+            energies.append(energy)
+        block = '              ' + ''.join(f'{j:10d}' for j in columns) + '   \n'
+        block += '               ' + ''.join(f'{e:10.5f}' for e in energies) + '\n'
+        block += '               ' + ''.join(f'{2.0 if j < nocc else 0.0:10.5f}' for j in columns) + '\n'
+        block += '                ' + '  --------'*len(columns) + '\n'
+        # Only the AOs that contribute to one of the orbitals are printed
+        for i, atom, ao in sorted(rng.sample(aos, min(len(aos), 40))):
+            values = (rng.choice([0.0, 0.0, rng.uniform(0.1, 100)]) for _ in columns)
+            block += f'{i:2d} {atom:2s} {ao:5s}   ' + ''.join(f'{value:10.1f}' for value in values) + '\n'
+        blocks.append(block)
+    out += '\n'.join(blocks) + '\n\n'
+    out += '------------------------------------------\nLOEWDIN REDUCED ATOMIC POPULATIONS\n'
+    return out
+
+
+def nbo_section(natoms=99, rydbergs=20, seed=0):
+    """
+    NBO analysis of a chain of bonded atoms
+    NBO prints atom numbers above 99 without a space after the atom symbol,
+    which NBOSet cannot split, so natoms is limited to 99.
+    :param natoms: number of atoms (at most 99)
+    :param rydbergs: number of Rydberg orbitals per atom
+    :param seed: random seed
+    """
+    if natoms > 99:
+        raise ValueError('NBOSet can only read NBO sections with at most 99 atoms')
+    rng = random.Random(seed)
+    atoms = [atom for atom, _ in molecule(natoms, seed)]
+
+    def coefficients(n):
+        values = [rng.uniform(-1, 1) for _ in range(n)]
+        # Coefficient lines start with (at least) 40 spaces
+        return ''.join(' '*39 + ''.join(f'{v:8.4f}' for v in values[i:i + 5]) + '\n' for i in range(0, n, 5))
+
+    def hybrid():
+        p = rng.uniform(0, 3)
+        s = 100/(1 + p)
+        return f's({s:6.2f}%)p{p:5.2f}({100 - s:6.2f}%)'
+
+    def bond(kind, i, occupation):
+        a, b = i, i + 1
+        polarization = rng.uniform(20, 80)
+        out = f'{len(orbitals) + 1:4d}. ({occupation:7.5f}) {kind:3s}( 1){atoms[a - 1]:>2}{a:3d}-{atoms[b - 1]:>2}{b:3d}       \n'
+        for n, percent in [(a, polarization), (b, 100 - polarization)]:
+            out += f'               ({percent:6.2f}%) {(percent/100)**0.5:8.4f}*{atoms[n - 1]:>2}{n:3d} {hybrid()}\n'
+            out += coefficients(9)
+        return out
+
+    def single(kind, i, number, occupation):
+        return f'{len(orbitals) + 1:4d}. ({occupation:7.5f}) {kind:3s}({number:2d}){atoms[i - 1]:>2}{i:3d}             {hybrid()}\n' + coefficients(9)
+
+    orbitals = []
+    for i in range(1, natoms):
+        orbitals.append(bond('BD', i, rng.uniform(1.9, 2.0)))
+    for i in range(1, natoms + 1):
+        if atoms[i - 1] != 'H':
+            orbitals.append(single('CR', i, 1, rng.uniform(1.99, 2.0)))
+            orbitals.append(single('LP', i, 1, rng.uniform(1.8, 2.0)))
+    for i in range(1, natoms + 1):
+        for number in range(1, rydbergs + 1):
+            orbitals.append(single('RY*', i, number, rng.uniform(0, 0.01)))
+    for i in range(1, natoms):
+        orbitals.append(bond('BD*', i, rng.uniform(0, 0.05)))
+
+    out = ' NATURAL BOND ORBITALS (Summary):\n\n\n'
+    out += '     (Occupancy)   Bond orbital / Coefficients / Hybrids\n'
+    out += ' ' + '-'*79 + '\n'
+    out += ''.join(orbitals) + '\n\n'
+    out += ' NHO DIRECTIONALITY AND BOND BENDING (deviations from line of nuclear centers)\n'
+    return out
+
+
+def qstat_xml(jobs=10000, grid_engine='sge', queues=('gen4.q', 'gen5.q', 'gen6.q', 'large.q'), seed=0):
+    """
+    XML output of qstat (qstat -u "*" -r -f -xml for SGE, qstat -x -t for PBS)
+    :param jobs: number of jobs
+    :param grid_engine: 'sge' or 'pbs'
+    :param queues: names of the queues
+    :param seed: random seed
+    :return: xml, {queue: size}
+    """
+    rng = random.Random(seed)
+    owners = ['alice', 'bob', 'carol', 'dave', 'erin', 'frank']
+    running = jobs//3
+    sizes = {queue: running//len(queues) + 1 for queue in queues}
+
+    if grid_engine == 'sge':
+        nodes = {queue: [] for queue in queues}
+        pending = []
+        for i in range(jobs):
+            queue = rng.choice(queues)
+            state = 'running' if i < running else 'pending'
+            xml = (f'    <job_list state="{state}">\n'
+                   f'      <JB_job_number>{100000 + i}</JB_job_number>\n'
+                   f'      <JB_name>job_{i}</JB_name>\n'
+                   f'      <JB_owner>{rng.choice(owners)}</JB_owner>\n'
+                   f'      <state>{"r" if state == "running" else "qw"}</state>\n'
+                   f'      <hard_req_queue>{queue}</hard_req_queue>\n'
+                   '    </job_list>\n')
+            if state == 'running':
+                nodes[queue].append(xml)
+            else:
+                pending.append(xml)
+        out = "<?xml version='1.0'?>\n<job_info>\n  <queue_info>\n"
+        for queue, job_xmls in nodes.items():
+            for n in range(0, max(len(job_xmls), 1), 16):
+                out += f'  <Queue-List>\n    <name>{queue}@node{n//16}.cluster</name>\n'
+                out += ''.join(job_xmls[n:n + 16]) + '  </Queue-List>\n'
+        out += '  </queue_info>\n  <job_info>\n' + ''.join(pending) + '  </job_info>\n</job_info>\n'
+        return out, sizes
+
+    if grid_engine == 'pbs':
+        out = '<Data>'
+        for i in range(jobs):
+            owner = rng.choice(owners)
+            state = 'R' if i < running else rng.choice(['Q', 'Q', 'H', 'C'])
+            out += (f'<Job><Job_Id>{100000 + i}.master</Job_Id><Job_Name>job_{i}</Job_Name>'
+                    f'<Job_Owner>{owner}@login</Job_Owner><job_state>{state}</job_state>'
+                    f'<queue>{rng.choice(queues)}</queue>'
+                    '<Resource_List><nodect>1</nodect><nodes>1:ppn=8</nodes></Resource_List>'
+                    f'<Variable_List>PBS_O_HOME=/home/{owner},PBS_O_WORKDIR=/home/{owner}/job_{i}</Variable_List></Job>')
+        return out + '</Data>\n', sizes
+
+    raise ValueError(f'Only sge and pbs are supported, got: {grid_engine}')
+
+
+def gaussian94_basis(natoms=100, shells=30, seed=0):
+    """
+    Basis set in Gaussian94 format
+    :param natoms: number of atom entries (repeated elements overwrite each other when read)
+    :param shells: number of contracted shells per atom
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    elements = [atom for atom in atomic_numbers if atom != 'X']
+    out = '****\n'
+    for n in range(natoms):
+        out += f'{elements[n % len(elements)]}     0\n'
+        for shell in range(shells):
+            am = 'SPDFG'[min(shell*5//shells, 4)]
+            nprim = rng.randint(1, 8)
+            exps = sorted((10**rng.uniform(-1.5, 4) for _ in range(nprim)), reverse=True)
+            out += f'{am}   {nprim}   1.00\n'
+            out += ''.join(f'{e:18.7f} {rng.uniform(-1, 1):23.8E}\n' for e in exps)
+        out += '****\n'
+    return out
+
+
+def qchem_optimization(steps=2000, natoms=20, seed=0):
+    """
+    Q-Chem geometry optimization
+    :param steps: number of optimization cycles
+    :param natoms: number of atoms
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    geom = molecule(natoms, seed)
+    out = '                  Welcome to Q-Chem\n\n'
+    for step in range(1, steps + 1):
+        out += ('       Standard Nuclear Orientation (Angstroms)\n'
+                '    I     Atom         X            Y            Z\n'
+                ' ----------------------------------------------------\n')
+        for i, (atom, (x, y, z)) in enumerate(geom, start=1):
+            out += f'{i:5d}      {atom:<2}  {x:12.6f} {y:12.6f} {z:12.6f}\n'
+        out += ' ----------------------------------------------------\n\n'
+        out += ('                             Maximum     Tolerance    Cnvgd?\n'
+                f'         Gradient       {rng.uniform(0, 1e-1)/step:10.6f}      0.000030      NO\n'
+                f'         Displacement   {rng.uniform(0, 1e-1)/step:10.6f}      0.000120      NO\n'
+                f'         Energy change  {rng.uniform(0, 1e-3)/step:10.6f}      0.000000      NO\n\n')
+        for atom in geom:
+            atom[1] = [q + rng.gauss(0, 0.01/step) for q in atom[1]]
+    out += '        *  Thank you very much for using Q-Chem.  Have a nice day.  *\n'
+    return out
+
+
+def psi4_frequencies(natoms=300, seed=0):
+    """
+    Psi4 harmonic vibrational analysis (frequencies, properties and normal modes)
+    :param natoms: number of atoms
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    geom = molecule(natoms, seed)
+    nmodes = 3*natoms - 6
+    freqs = sorted(rng.uniform(20, 3500) for _ in range(nmodes))
+
+    out = '          Psi4: An Open-Source Ab Initio Electronic Structure Package\n\n'
+    out += '    Geometry (in Angstrom), charge = 0, multiplicity = 1:\n\n'
+    out += '       Center              X                  Y                   Z       \n'
+    out += '    ------------   -----------------  -----------------  -----------------\n'
+    out += ''.join(f'    {atom:>8}    {x:18.12f} {y:18.12f} {z:18.12f}\n' for atom, (x, y, z) in geom)
+    out += '\n  ==> Harmonic Vibrational Analysis <==\n\n'
+    for start in range(0, nmodes, 3):
+        columns = range(start, min(start + 3, nmodes))
+        out += '  Vibration           ' + ''.join(f'{j + 7:20d}' for j in columns) + '\n'
+        out += '  Freq [cm^-1]        ' + ''.join(f'{freqs[j]:20.4f}' for j in columns) + '\n'
+        out += '  Irrep               ' + ''.join(f'{"A":>20}' for j in columns) + '\n'
+        for label in ['Reduced mass [u]', 'Force const [mDyne/A]', 'Turning point v=0 [a0]',
+                      'RMS dev v=0 [a0 u^1/2]', 'IR activ [km/mol]', 'Char temp [K]']:
+            out += f'  {label:<22}' + ''.join(f'{rng.uniform(0, 10):18.4f}  ' for j in columns) + '\n'
+        out += '  ' + '-'*82 + '\n'
+        for i, (atom, xyz) in enumerate(geom, start=1):
+            out += f'{i:7d}   {atom:<2}        ' + ''.join(
+                '    ' + ' '.join(f'{rng.uniform(-0.5, 0.5):5.2f}' for _ in range(3)) for j in columns) + '\n'
+        out += '\n'
+    out += '\n*** Psi4 exiting successfully. Buy a developer a beer!\n'
+    return out
+
+
+def cfour_ccsd_t(steps=200, iterations=15, seed=0):
+    """
+    CFOUR UHF-CCSD(T) geometry optimization, only the lines read by cfour.get_summary and the
+    amplitude blocks printed every CC iteration
+    :param steps: number of optimization cycles
+    :param iterations: number of CC iterations per cycle
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    out = '  * CFOUR Coupled-Cluster techniques for Computational Chemistry *\n\n'
+    out += ''.join(f'       {name:<20} {key:<15} {value:<12}       ***\n' for name, key, value in [
+        ('CALCLEVEL', 'ICLLVL', 'CCSD(T)'), ('BASIS', 'IBASIS', 'PVTZ'), ('REFERENCE', 'IREFNC', 'UHF'),
+        ('CHARGE', 'ICHRGE', '0'), ('MULTIPLICTY', 'IMULTP', '2'), ('CC_CONV', 'ICCCNV', '10D-  7'),
+        ('SCF_CONV', 'ISCFCV', '10D-  7'), ('GEO_CONV', 'ICONTL', '5'), ('LINEQ_CONV', 'IZTACN', '10D-  7')])
+
+    def amplitudes(rank, case):
+        header = f' Largest T{rank} amplitudes for spin case {case}:\n'
+        header += ' ' + '-'*77 + '\n'
+        # i (j) a (b) indices of the amplitudes
+        indices = [(1, 9)]*rank + [(10, 30)]*rank
+        rows = ''.join(' ' + ''.join('[' + ' '.join(f'{rng.randint(*bounds):3d}' for bounds in indices)
+                                     + f']{rng.uniform(-0.05, 0.05):8.5f} ' for _ in range(3)) + '\n'
+                       for _ in range(5))
+        norm = f' Norm of T{rank}{case} vector (      490 symmetry allowed elements):  {rng.uniform(0, 0.2):.10f}.\n'
+        return header + rows + ' ' + '-'*77 + '\n' + norm
+
+    for step in range(steps):
+        out += '  There are   2 frozen-core orbitals.\n  Integrals less than  0.10E-13 are neglected.\n'
+        out += ' total alpha spin electron number:   5.00000000000000\n'
+        out += ' total  beta spin electron number:   4.00000000000000\n'
+        out += f'     E(SCF)=       {-75.5 - rng.uniform(0, 0.1):.15f}              0.3403518367D-07\n'
+        out += f'  The expectation value of S**2 is  {0.75 + rng.uniform(0, 0.01):.8f}\n'
+        out += f'              Total MP2 energy      =  {-75.6 - rng.uniform(0, 0.1):.12f} a.u.\n'
+        for iteration in range(iterations):
+            out += f' Iteration Nr. {iteration}\n'
+            out += amplitudes(1, 'AA') + amplitudes(1, 'BB')
+            out += amplitudes(2, 'AA') + amplitudes(2, 'BB') + amplitudes(2, 'AB')
+        out += f'  Total CCSD energy          :     {-75.7 - rng.uniform(0, 0.1):.12f}\n'
+        out += f'  CCSD(T) energy                   {-75.71 - rng.uniform(0, 0.1):.12f}\n'
+    return out
+
+
+def gamess_dat(nbasis=600, natoms=100, seed=0):
+    """
+    GAMESS .dat (punch) file with a $VEC and a $HESS group
+    :param nbasis: number of basis functions (and orbitals)
+    :param natoms: number of atoms (the hessian is 3N x 3N)
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+
+    def group(name, nrows, ncolumns, header=''):
+        out = f' ${name}\n' + header
+        for i in range(1, nrows + 1):
+            values = [rng.uniform(-1, 1) for _ in range(ncolumns)]
+            for j in range(0, ncolumns, 5):
+                out += f'{i % 100:2d}{(j//5 + 1) % 1000:3d}' + ''.join(f'{v:15.8E}' for v in values[j:j + 5]) + '\n'
+        return out + ' $END\n'
+
+    out = ' $DATA\nsynthetic\nC1\n $END\n'
+    out += '--- CLOSED SHELL ORBITALS --- GENERATED AT Mon Jan  1 00:00:00 2024\n'
+    out += group('VEC', nbasis, nbasis)
+    out += group('HESS', 3*natoms, 3*natoms, 'ENERGY IS     -115.0489341553 E(NUC) IS       31.1542932839\n')
+    return out
+
+
+def _gaussian_orientation(title, geom):
+    """Orientation table printed by Gaussian"""
+    out = f'{title:^70}\n' + ' ' + '-'*69 + '\n'
+    out += ' Center     Atomic      Atomic             Coordinates (Angstroms)\n'
+    out += ' Number     Number       Type             X           Y           Z\n' + ' ' + '-'*69 + '\n'
+    for i, (atom, (x, y, z)) in enumerate(geom, start=1):
+        out += f' {i:6d} {atomic_numbers[atom]:10d} {0:11d}    {x:12.6f}{y:12.6f}{z:12.6f}\n'
+    return out + ' ' + '-'*69 + '\n'
+
+
+def gaussian_opt_freq(steps=2000, natoms=20, hpmodes=True, seed=0):
+    """
+    Gaussian 16 geometry optimization followed by a frequency calculation
+    :param steps: number of optimization cycles
+    :param natoms: number of atoms
+    :param hpmodes: also print the high precision normal modes (freq=HPModes)
+    :param seed: random seed
+    """
+    rng = random.Random(seed)
+    geom = molecule(natoms, seed)
+    energy = -40.0*natoms
+    out = ' Entering Gaussian System, Link 0=g16\n Copyright (c) 1988-2019, Gaussian, Inc.  All Rights Reserved.\n'
+    out += ' ' + '-'*20 + '\n #p Opt Freq B3LYP/def2SVP\n ' + '-'*20 + '\n'
+    out += ' Charge =  0 Multiplicity = 1\n'
+    for step in range(1, steps + 1):
+        out += _gaussian_orientation('Input orientation:', geom) + _gaussian_orientation('Standard orientation:', geom)
+        energy -= rng.uniform(0, 1e-3)/step
+        out += f' SCF Done:  E(RB3LYP) =  {energy:.10f}     A.U. after {rng.randint(4, 20):4d} cycles\n'
+        out += f' Step number {step:3d} out of a maximum of {steps:3d}\n'
+        out += '         Item               Value     Threshold  Converged?\n'
+        for item, threshold in [('Maximum Force', 4.5e-4), ('RMS     Force', 3e-4),
+                                ('Maximum Displacement', 1.8e-3), ('RMS     Displacement', 1.2e-3)]:
+            value = rng.uniform(0, 10*threshold)/step
+            out += f' {item:20s} {value:12.6f} {threshold:12.6f}     {"YES" if value < threshold else "NO"}\n'
+        predicted = f'{-rng.uniform(0, 1e-3)/step:.6E}'.replace('E', 'D')
+        out += f' Predicted change in Energy={predicted}\n'
+        if step < steps:
+            for atom in geom:
+                atom[1] = [q + rng.gauss(0, 0.01/step) for q in atom[1]]
+    out += ' Optimization completed.\n    -- Stationary point found.\n'
+    out += ' Normal termination of Gaussian 16 at Mon Jan  1 00:00:00 2024.\n'
+    out += ' Link1:  Proceeding to internal job step number  2.\n'
+    out += ' ' + '-'*20 + '\n #p Geom=AllCheck Freq B3LYP/def2SVP\n ' + '-'*20 + '\n'
+
+    out += _gaussian_orientation('Input orientation:', geom) + _gaussian_orientation('Standard orientation:', geom)
+    out += f' SCF Done:  E(RB3LYP) =  {energy:.10f}     A.U. after    1 cycles\n'
+    nmodes = 3*natoms - 6
+    freqs = sorted(rng.uniform(20, 3500) for _ in range(nmodes))
+    header = (' Harmonic frequencies (cm**-1), IR intensities (KM/Mole), Raman scattering\n'
+              ' activities (A**4/AMU), depolarization ratios for plane and unpolarized\n'
+              ' incident light, reduced masses (AMU), force constants (mDyne/A),\n'
+              ' and normal coordinates:\n')
+    properties = [[rng.uniform(1, 10) for _ in range(nmodes)] for _ in range(3)]
+    if hpmodes:
+        out += header
+        for start in range(0, nmodes, 5):
+            columns = range(start, min(start + 5, nmodes))
+            out += ' '*16 + ''.join(f'{j + 1:10d}' for j in columns) + '\n'
+            out += ' '*16 + ''.join(f'{"A":>10}' for j in columns) + '\n'
+            for label, values in zip(['      Frequencies', '   Reduced masses', '  Force constants',
+                                      '   IR Intensities'], [freqs] + properties):
+                out += f'{label} ---' + ''.join(f'{values[j]:10.4f}' for j in columns) + '\n'
+            out += '  Coord Atom Element:\n'
+            for i, (atom, xyz) in enumerate(geom, start=1):
+                for coord in range(1, 4):
+                    out += f'{coord:4d}{i:6d}{atomic_numbers[atom]:6d}    ' + ''.join(
+                        f'{rng.uniform(-0.5, 0.5):10.5f}' for j in columns) + '\n'
+    out += header
+    for start in range(0, nmodes, 3):
+        columns = range(start, min(start + 3, nmodes))
+        out += ' '*15 + ''.join(f'{j + 1:23d}' for j in columns) + '\n'
+        out += ' '*15 + ''.join(f'{"A":>23}' for j in columns) + '\n'
+        for label, values in zip([' Frequencies --', ' Red. masses --', ' Frc consts  --', ' IR Inten    --'],
+                                 [freqs] + properties):
+            out += label + ''.join(f'{values[j]:11.4f}            ' for j in columns) + '\n'
+        out += '  Atom  AN' + '      X      Y      Z  '*len(columns) + '\n'
+        for i, (atom, xyz) in enumerate(geom, start=1):
+            out += f'{i:6d}{atomic_numbers[atom]:4d}  ' + ''.join(
+                '  ' + ''.join(f'{rng.uniform(-0.5, 0.5):7.2f}' for _ in range(3)) for j in columns) + '\n'
+    out += '\n Zero-point correction=                           0.123456 (Hartree/Particle)\n'
+    out += f' Sum of electronic and thermal Enthalpies=        {energy + 0.13:12.6f}\n'
+    out += f' Sum of electronic and thermal Free Energies=     {energy + 0.09:12.6f}\n\n'
+    out += ' Normal termination of Gaussian 16 at Mon Jan  1 00:00:10 2024.\n'
+    return out
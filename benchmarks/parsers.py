@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+
+# Benchmark the parsers on large synthetic outputs
+import os
+import sys
+import json
+import argparse
+import platform
+import warnings
+import subprocess
+
+from timeit import repeat
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from xml.etree import ElementTree
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generators
+
+from qgrep import cfour, gamess, gaussian, orca, psi4
+from qgrep.basis import BasisSet
+from qgrep.helper import read
+from qgrep.population.nbo import NBOSet
+from qgrep.population.orbital_pop import OrbitalPopulation
+from qgrep.queues import Queues
+from qgrep.sections import extract_sections, registered
+
+
+def bench_orca_plot(directory, scale):
+    steps = _scaled(5000, scale)
+    file_name = _write(directory, 'opt.out', generators.orca_optimization(steps, natoms=20))
+    return f'{steps} step optimization, 20 atoms', file_name, lambda: orca.plot(read(file_name)[0])
+
+
+def bench_orca_get_all_energies(directory, scale):
+    steps = _scaled(5000, scale)
+    file_name = _write(directory, 'opt.out', generators.orca_optimization(steps, natoms=20))
+    return f'{steps} step optimization, 20 atoms', file_name, lambda: orca.get_all_energies(read(file_name)[0])
+
+
+def bench_orca_output_report(directory, scale):
+    steps = _scaled(5000, scale)
+    file_name = _write(directory, 'opt.out', generators.orca_optimization(steps, natoms=20))
+
+    def run():
+        # Ten properties from one index
+        with orca.OrcaOutput(file_name) as output:
+            return (output.geometry(), output.geometry('xyz', 'bohr'), output.energy(), output.energies,
+                    output.charge, output.multiplicity, output.molecule, output.trajectory,
+                    output.nat_orb_occ, output.completed)
+    return f'{steps} step optimization, 20 atoms', file_name, run
+
+
+def bench_orca_get_freqs(directory, scale):
+    natoms = _scaled(300, scale, 3)
+    file_name = _write(directory, 'freqs.out', generators.orca_frequencies(natoms))
+    return f'{natoms} atom frequencies', file_name, lambda: orca.get_freqs(read(file_name)[0])
+
+
+def bench_orca_get_vibrations(directory, scale):
+    natoms = _scaled(300, scale, 3)
+    file_name = _write(directory, 'freqs.out', generators.orca_frequencies(natoms))
+    return f'{natoms} atom frequencies', file_name, lambda: orca.get_vibrations(read(file_name)[0])
+
+
+def bench_orca_read_hess(directory, scale):
+    natoms = _scaled(300, scale, 3)
+    file_name = _write(directory, 'freqs.hess', generators.orca_hess(natoms))
+    return f'{natoms} atom .hess', file_name, lambda: orca.read_hess(file_name, use_cache=False)
+
+
+def bench_psi4_get_vibrations(directory, scale):
+    natoms = _scaled(300, scale, 3)
+    file_name = _write(directory, 'freqs.out', generators.psi4_frequencies(natoms))
+    return f'{natoms} atom frequencies', file_name, lambda: psi4.get_vibrations(read(file_name)[0])
+
+
+def bench_psi4_get_freqs(directory, scale):
+    natoms = _scaled(300, scale, 3)
+    file_name = _write(directory, 'freqs.out', generators.psi4_frequencies(natoms))
+    return f'{natoms} atom frequencies', file_name, lambda: psi4.get_freqs(read(file_name)[0])
+
+
+def bench_gaussian_output_report(directory, scale):
+    steps = _scaled(2000, scale)
+    file_name = _write(directory, 'opt.log', generators.gaussian_opt_freq(steps, natoms=20))
+
+    def run():
+        # Optimization, frequencies and termination from one index
+        with gaussian.GaussianOutput(file_name) as output:
+            return (output.trajectory, output.energies, output.convergence, output.vibrations,
+                    output.charge, output.multiplicity, output.completed)
+    return f'{steps} step optimization and frequencies, 20 atoms', file_name, run
+
+
+def bench_gaussian_get_vibrations(directory, scale):
+    natoms = _scaled(300, scale, 3)
+    file_name = _write(directory, 'freqs.log', generators.gaussian_opt_freq(1, natoms))
+    return f'{natoms} atom HPModes frequencies', file_name, lambda: gaussian.get_vibrations(read(file_name)[0])
+
+
+def bench_cfour_get_summary(directory, scale):
+    steps = _scaled(200, scale)
+    file_name = _write(directory, 'ccsd_t.out', generators.cfour_ccsd_t(steps))
+    return f'{steps} step CCSD(T) optimization', file_name, lambda: cfour.get_summary(read(file_name)[0])
+
+
+def bench_gamess_read_vec(directory, scale):
+    nbasis = _scaled(1000, scale, 5)
+    file_name = _write(directory, 'input.dat', generators.gamess_dat(nbasis, natoms=100))
+    return f'{nbasis} basis functions, 100 atom hessian', file_name, lambda: gamess.read_vec(file_name)
+
+
+def bench_orbital_population(directory, scale):
+    norbitals = _scaled(2000, scale, 6)
+    file_name = _write(directory, 'lowdin.out', generators.lowdin_population(norbitals))
+    return f'{norbitals} MO Löwdin populations', file_name, lambda: OrbitalPopulation(file_name)
+
+
+def bench_nbo_set(directory, scale):
+    rydbergs = _scaled(50, scale)
+    file_name = _write(directory, 'nbo.out', generators.nbo_section(99, rydbergs))
+
+    def run():
+        with open(file_name) as f:
+            return NBOSet(f)
+    return f'99 atoms, {rydbergs} Rydbergs per atom', file_name, run
+
+
+def _bench_queues(grid_engine):
+    def bench(directory, scale):
+        jobs = _scaled(10000, scale)
+        xml, sizes = generators.qstat_xml(jobs, grid_engine)
+        file_name = _write(directory, f'qstat_{grid_engine}.xml', xml)
+
+        def run():
+            # Bypass __init__, which calls qstat
+            queues = Queues.__new__(Queues)
+            queues.grid_engine, queues.sizes = grid_engine, sizes
+            queues.tree = ElementTree.parse(file_name).getroot()
+            queues.parse_tree()
+            return queues
+        return f'{jobs} {grid_engine.upper()} jobs', file_name, run
+    return bench
+
+
+def bench_basis_read_str(directory, scale):
+    natoms = _scaled(1000, scale)
+    basis = generators.gaussian94_basis(natoms, shells=40)
+    file_name = _write(directory, 'basis.gbs', basis)
+    return f'{natoms} atoms x 40 shells', file_name, lambda: BasisSet.read_str(basis.strip())
+
+
+def _bench_sections(program, one_pass):
+    """All of the registered sections of a program, found in one pass or with one pass per section"""
+    def bench(directory, scale):
+        steps = _scaled(2000, scale)
+        if program == 'orca':
+            text = generators.orca_optimization(steps, natoms=20)
+        else:
+            text = generators.qchem_optimization(steps, natoms=20)
+        file_name = _write(directory, f'{program}.out', text)
+        names = list(registered(program))
+
+        def run():
+            lines = read(file_name)[0]
+            if one_pass:
+                return extract_sections(lines, program)
+            return [extract_sections(lines, program, [name]) for name in names]
+        return f'{steps} step optimization, {len(names)} sections', file_name, run
+    return bench
+
+
+BENCHMARKS = {
+    'orca.plot': bench_orca_plot,
+    'orca.get_all_energies': bench_orca_get_all_energies,
+    'OrcaOutput report': bench_orca_output_report,
+    'orca.get_freqs': bench_orca_get_freqs,
+    'orca.get_vibrations': bench_orca_get_vibrations,
+    'orca.read_hess': bench_orca_read_hess,
+    'psi4.get_vibrations': bench_psi4_get_vibrations,
+    'psi4.get_freqs': bench_psi4_get_freqs,
+    'GaussianOutput report': bench_gaussian_output_report,
+    'gaussian.get_vibrations': bench_gaussian_get_vibrations,
+    'cfour.get_summary': bench_cfour_get_summary,
+    'gamess.read_vec': bench_gamess_read_vec,
+    'OrbitalPopulation': bench_orbital_population,
+    'NBOSet': bench_nbo_set,
+    'Queues.parse_tree[sge]': _bench_queues('sge'),
+    'Queues.parse_tree[pbs]': _bench_queues('pbs'),
+    'BasisSet.read_str': bench_basis_read_str,
+    'sections[orca, one pass]': _bench_sections('orca', True),
+    'sections[orca, per section]': _bench_sections('orca', False),
+    'sections[qchem, one pass]': _bench_sections('qchem', True),
+    'sections[qchem, per section]': _bench_sections('qchem', False),
+}
+
+
+def _scaled(size, scale, minimum=1):
+    return max(minimum, int(round(size*scale)))
+
+
+def _write(directory, name, text):
+    file_name = os.path.join(directory, name)
+    with open(file_name, 'w') as f:
+        f.write(text)
+    return file_name
+
+
+def commit():
+    """Current git commit of the repository (None if unavailable)"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names, directory, scale, repetitions):
+    """
+    Generate the inputs and time the benchmarks
+    :return: {name: {'size': description, 'bytes': input size, 'best': s, 'mean': s}}
+    """
+    results = {}
+    length = max(map(len, names))
+    print(f'{"Benchmark":{length}s}  {"Best (s)":>9s}  {"Mean (s)":>9s}  Input')
+    for name in names:
+        size, file_name, func = BENCHMARKS[name](directory, scale)
+        times = repeat(func, number=1, repeat=repetitions)
+        results[name] = {
+            'size': size,
+            'bytes': os.path.getsize(file_name),
+            'best': min(times),
+            'mean': sum(times)/len(times),
+        }
+        print(f'{name:{length}s}  {min(times):9.4f}  {sum(times)/len(times):9.4f}  {size}')
+    return results
+
+
+def compare(results, baseline):
+    """Print the change of the best times relative to a previous run"""
+    print(f'\nCompared to {baseline.get("commit")} ({baseline.get("date")}):')
+    length = max(map(len, results))
+    for name, result in results.items():
+        old = baseline['results'].get(name)
+        if old is None:
+            print(f'{name:{length}s}  (new)')
+        elif old['size'] != result['size']:
+            print(f'{name:{length}s}  (different input: {old["size"]})')
+        else:
+            print(f'{name:{length}s}  {old["best"]:9.4f} -> {result["best"]:9.4f}  {old["best"]/result["best"]:6.2f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the parsers on large synthetic outputs.')
+    parser.add_argument('-b', '--benchmarks', help='Benchmarks to run (defaults to all).',
+                        type=str, nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('-s', '--scale', help='Scale the size of all inputs (e.g. 0.1 for a quick run).',
+                        type=float, default=1.0)
+    parser.add_argument('-r', '--repeat', help='Number of repetitions (the best and mean are reported).',
+                        type=int, default=3)
+    parser.add_argument('-o', '--output', help='Write the results as JSON.',
+                        type=str, default=None)
+    parser.add_argument('-c', '--compare', help='JSON results of a previous run to compare against.',
+                        type=str, default=None)
+    parser.add_argument('-d', '--directory', help='Keep the generated inputs in this directory.',
+                        type=str, default=None)
+
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    if args.directory:
+        os.makedirs(args.directory, exist_ok=True)
+        results = run(args.benchmarks, args.directory, args.scale, args.repeat)
+    else:
+        with TemporaryDirectory() as directory:
+            results = run(args.benchmarks, directory, args.scale, args.repeat)
+
+    report = {
+        'commit': commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
@@ -0,0 +1 @@
+from .extraction import extract
@@ -4,6 +4,13 @@ import numpy as np
 from .helper import BOHR_TO_ANGSTROM
 from operator import itemgetter
 
+from .sections import Section, extract_sections, register
+
+
+GEOMETRY = register('bagel', 'geometry', Section(
+    '  *** Geometry ***', skip=3, row=lambda line: [q.strip('",') for q in itemgetter(3, 7, 8, 9)(line.split())],
+    units='bohr'))
+
 
 def get_geom(lines, style='xyz', units='angstrom'):
     """
@@ -12,24 +19,6 @@ def get_geom(lines, style='xyz', units='angstrom'):
     :param style: output style for geom
     :param units: units for geometry
     """
-    start = '  *** Geometry ***'
-    end = '\n'
-    geom_start = -1
-    geom_end = -1
-    for i, line in reversed(list(enumerate(lines))):
-        if line[:18] == start:
-            geom_start = i + 4
-            break
-    if geom_start == -1:
-        raise Exception('Could not find start of geometry')
-
-    for i, line in enumerate(lines[geom_start:], start=geom_start):
-        if line == end:
-            geom_end = i
-            break
-    if geom_end == -1:
-        raise Exception('Could not find end of geometry')
-
     scale = 1
     units = units.lower()
     if units == 'angstrom':
@@ -37,9 +26,12 @@ def get_geom(lines, style='xyz', units='angstrom'):
     elif units != 'bohr':
         raise ValueError('Invalid Units')
 
+    geoms = extract_sections(lines, 'bagel', ['geometry'], last=True)['geometry']
+    if not geoms:
+        raise Exception('Could not find geometry')
+
     geom = []
-    for line in lines[geom_start: geom_end]:
-        atom, *xyz = [q.strip('",') for q in itemgetter(3, 7, 8, 9)(line.split())]
+    for atom, *xyz in geoms[0]:
         x, y, z = [scale*float(q) for q in xyz]
         geom.append(f'{atom} {x} {y} {z}')
 
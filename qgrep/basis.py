@@ -1,8 +1,10 @@
 import json
 import numpy as np
 
-from collections import Iterable, OrderedDict
+from collections import OrderedDict
+from collections.abc import Iterable
 from .atom import ensure_short_atom_name
+from .compression import open_file
 
 SUPPORTED = ['gaussian94', 'gamess', 'bagel', 'cfour', 'molpro']
 AM = 'SPDFGHIKLMN'
@@ -359,7 +361,7 @@ class BasisSet:
     def read_file(in_file="basis.gbs", style='gaussian94', basis_name=None, debug=False):
         if basis_name is None:
             basis_name = '.'.join(in_file.split('/')[-1].split('.')[:-1])
-        with open(in_file) as f:
+        with open_file(in_file) as f:
             basis_set_str = f.read().strip()
         return BasisSet.read_str(basis_set_str, style, basis_name, debug)
 
@@ -778,7 +780,7 @@ class ECPSet:
     def read_file(in_file="ecp.gbs", style='gaussian94', name=None, debug=False):
         if name is None:
             name = '.'.join(in_file.split('.')[:-1])
-        with open(in_file) as f:
+        with open_file(in_file) as f:
             ecp_str = f.read()
         return ECPSet.read_str(ecp_str, style, name, debug)
 
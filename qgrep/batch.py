@@ -0,0 +1,50 @@
+"""Run a function over many files in parallel"""
+import io
+import traceback
+import multiprocessing
+
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+
+
+def run(func, item, *args):
+    """
+    Run func(item, *args), capturing what it prints and any exception
+    :return: (printed output, result, traceback or None)
+    """
+    out = io.StringIO()
+    try:
+        with redirect_stdout(out):
+            result = func(item, *args)
+        return out.getvalue(), result, None
+    except Exception:
+        return out.getvalue(), None, traceback.format_exc()
+
+
+def batch_map(func, items, *args, jobs=1):
+    """
+    Map func over items in a process pool, yielding the results in the order of items
+    A failure for one item is returned as its traceback and does not stop the rest.
+    Workers are forked, so func may be defined in a script; where fork is not
+    available the items are run serially.
+    :param func: function that takes an item and args
+    :param items: items to process (e.g. file names)
+    :param jobs: number of processes to use
+    :return: generator of (item, printed output, result, traceback or None)
+    """
+    items = list(items)
+    jobs = min(jobs, len(items))
+    if jobs <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for item in items:
+            yield (item, *run(func, item, *args))
+        return
+
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(jobs, mp_context=context) as executor:
+        futures = [executor.submit(run, func, item, *args) for item in items]
+        for item, future in zip(items, futures):
+            try:
+                yield (item, *future.result())
+            except Exception:
+                # The worker itself died (e.g. killed or out of memory)
+                yield item, '', None, traceback.format_exc()
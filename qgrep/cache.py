@@ -0,0 +1,212 @@
+"""Persistent cache of cclib parse results"""
+import os
+import json
+import hashlib
+import numpy as np
+
+from configparser import ConfigParser
+
+from .compression import compression, open_file
+from .profiling import timed
+
+config_file = os.path.join(os.path.expanduser("~"), '.qgrepconfig')
+config = ConfigParser()
+config.read(config_file)
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), '.cache', 'qgrep')
+MAX_SIZE = 512
+if 'cache' in config:
+    CACHE_DIR = os.path.expanduser(config['cache'].get('directory', CACHE_DIR))
+    MAX_SIZE = config['cache'].getint('max_size', MAX_SIZE)
+CACHE_DIR = os.environ.get('QGREP_CACHE_DIR', CACHE_DIR)
+# Maximum size of the cache in MB
+MAX_SIZE = int(os.environ.get('QGREP_CACHE_SIZE', MAX_SIZE))
+ENABLED = os.environ.get('QGREP_NO_CACHE', '') == ''
+
+# Attributes that are stored, anything else requires a fresh parse
+ATTRIBUTES = [
+    'atomcoords', 'atommasses', 'atomnos', 'charge', 'mult', 'natom', 'nbasis', 'nmo',
+    'scfenergies', 'scfvalues', 'scftargets', 'mpenergies', 'ccenergies',
+    'moenergies', 'homos', 'geovalues', 'geotargets', 'optdone', 'grads',
+    'vibfreqs', 'vibirs', 'vibdisps', 'freeenergy', 'enthalpy', 'entropy', 'zpve',
+    'temperature', 'pressure', 'metadata',
+]
+
+
+@timed('parse')
+def ccread(file_name, use_cache=True):
+    """
+    Drop-in replacement for cclib.io.ccread that reuses earlier parses
+    Entries are keyed on the path and invalidated when the size, mtime or inode
+    of the file changes
+    :param file_name: output file to parse
+    :param use_cache: read from and write to the cache
+    :return: ccData (only ATTRIBUTES are restored from the cache)
+    """
+    if not (use_cache and ENABLED):
+        return parse(file_name)
+
+    key = file_key(file_name)
+    data = load(file_name, key)
+    if data is None:
+        data = parse(file_name)
+        if data is not None:
+            store(file_name, key, data)
+    return data
+
+
+def parse(file_name):
+    """Parse a file with cclib, decompressing it on the fly if needed"""
+    from cclib.io import ccread as cclib_ccread
+
+    if compression(file_name) is None:
+        return cclib_ccread(file_name)
+    with open_file(file_name) as f:
+        return cclib_ccread(f)
+
+
+def file_key(file_name):
+    """A key that changes whenever the file does"""
+    stat = os.stat(file_name)
+    return [os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+def entry_path(file_name, extension='.npz'):
+    """
+    Location of the cache entry for a file
+    :param extension: distinguishes other kinds of entries (e.g. .hess.npz), must end in .npz to be evicted
+    """
+    name = hashlib.sha1(os.path.abspath(file_name).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, name + extension)
+
+
+def load(file_name, key=None):
+    """
+    Load the cached parse of a file
+    :param file_name: output file
+    :param key: current key of the file (generated if not given)
+    :return: ccData, or None if there is no valid entry
+    """
+    from cclib.parser.data import ccData, ccData_optdone_bool
+
+    path = entry_path(file_name)
+    if not os.path.isfile(path):
+        return None
+    if key is None:
+        key = file_key(file_name)
+    try:
+        with np.load(path) as entry:
+            if json.loads(str(entry['__key__'])) != key:
+                return None
+            types = json.loads(str(entry['__types__']))
+            attributes = {}
+            for attr, (kind, length) in types.items():
+                if kind == 'array':
+                    attributes[attr] = entry[attr]
+                elif kind == 'scalar':
+                    attributes[attr] = entry[attr].item()
+                elif kind == 'list':
+                    attributes[attr] = [entry[f'{attr}.{i}'] for i in range(length)]
+                else:
+                    attributes[attr] = json.loads(str(entry[attr]))
+    except (OSError, ValueError, KeyError):
+        # Corrupt or outdated entry
+        return None
+    # Mark as recently used for the LRU eviction
+    os.utime(path)
+
+    # optdone is already stored as a bool, so skip the list conversion
+    data = ccData_optdone_bool()
+    ccData.setattributes(data, attributes)
+    return data
+
+
+def store(file_name, key, data):
+    """
+    Store the parsed data of a file, evicting old entries if the cache is full
+    Nothing is stored if the cache cannot be written
+    :param file_name: output file
+    :param key: key of the file when it was parsed
+    :param data: ccData to store
+    """
+    arrays = {'__key__': np.array(json.dumps(key))}
+    types = {}
+    for attr in ATTRIBUTES:
+        if not hasattr(data, attr):
+            continue
+        value = getattr(data, attr)
+        if isinstance(value, np.ndarray):
+            types[attr] = ('array', None)
+            arrays[attr] = value
+        elif isinstance(value, (bool, int, float)):
+            types[attr] = ('scalar', None)
+            arrays[attr] = np.array(value)
+        elif isinstance(value, list) and all(isinstance(v, np.ndarray) for v in value):
+            types[attr] = ('list', len(value))
+            for i, v in enumerate(value):
+                arrays[f'{attr}.{i}'] = v
+        else:
+            # Values that JSON cannot handle (e.g. timedeltas) are stored as strings
+            types[attr] = ('json', None)
+            arrays[attr] = np.array(json.dumps(value, default=str))
+    arrays['__types__'] = np.array(json.dumps(types))
+
+    path = entry_path(file_name)
+    # Write to a temporary file so that concurrent readers never see half an entry
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        evict()
+    except OSError:
+        # The entry is only an optimization (e.g. the cache directory is read-only or the disk is full)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def invalidate(file_name):
+    """Remove the cache entry for a file"""
+    try:
+        os.remove(entry_path(file_name))
+    except FileNotFoundError:
+        pass
+
+
+def clear():
+    """Remove all cache entries"""
+    for entry in _entries():
+        os.remove(entry.path)
+
+
+def evict(max_size=None):
+    """
+    Delete the least recently used entries until the cache fits in max_size
+    :param max_size: size in MB (defaults to MAX_SIZE)
+    """
+    max_size = (MAX_SIZE if max_size is None else max_size) * 2**20
+    entries = []
+    for entry in _entries():
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            # Removed by another process
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for mtime, size, path in entries)
+    for mtime, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _entries():
+    """All entries in the cache directory"""
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    return [entry for entry in os.scandir(CACHE_DIR) if entry.name.endswith('.npz')]
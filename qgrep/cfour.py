@@ -2,6 +2,13 @@ import re
 import math
 
 from .helper import BOHR_TO_ANGSTROM
+from .profiling import timed
+from .sections import Section, extract_sections, register
+
+
+GEOMETRY = register('cfour', 'geometry', Section(
+    ' Z-matrix   Atomic            Coordinates (in bohr)', skip=2, end=' ' + '-'*64,
+    row=lambda line: [line.split()[i] for i in [0, 2, 3, 4]], units='bohr'))
 
 
 def get_geom(lines, geom_type='xyz', units='bohr'):
@@ -12,35 +19,17 @@ def get_geom(lines, geom_type='xyz', units='bohr'):
     :param geom_type: style of geometry to return
     :param units: units for the coordinates
     """
-    if geom_type == 'xyz' and units.lower() in ['bohr', 'angstrom']:
-        start = ' Z-matrix   Atomic            Coordinates (in bohr)'
-    else:
+    if geom_type != 'xyz' or units.lower() not in ['bohr', 'angstrom']:
         print("Invalid format")
         return ''
 
-    geom_start = -1
-    # Iterate backwards until the start of the last set of coordinates is found
-    for i, line in enumerate(reversed(lines)):
-        if start == line[:51]:
-            geom_start = len(lines) - i + 2
-            break
-    if geom_start == -1:
-        print("Could not find start of geometry")
+    geoms = extract_sections(lines, 'cfour', ['geometry'], last=True)['geometry']
+    if not geoms:
+        print("Could not find geometry")
         return ''
 
-    geom_end = -1
-    for i, line in enumerate(lines[geom_start:]):
-        if line[:65] == ' ' + '-'*64:
-            geom_end = geom_start + i
-            break
-    if geom_end == -1:
-        print("Could not find end of geometry")
-        return ''
-
-    # Remove the atomic number
     geom = []
-    for line in lines[geom_start: geom_end]:
-        atom, an, *xyz = line.split()
+    for atom, *xyz in geoms[0]:
         x, y, z = map(lambda x: float(x) * BOHR_TO_ANGSTROM, xyz)
         geom.append(f'{atom:s}\t{x}\t{y}\t{z}\n')
 
@@ -54,30 +43,21 @@ def plot(lines, geom_type='xyz', units='angstrom'):
     :param geom_type: style of geometry to return
     :param units: units for the coordinates
     """
-    if geom_type == 'xyz' and units in ['bohr', 'angstrom']:
-        start = ' Z-matrix   Atomic            Coordinates (in bohr)\n'
-    else:
+    if geom_type != 'xyz' or units not in ['bohr', 'angstrom']:
         print("Invalid format")
         return ''
-    end = ' ----------------------------------------------------------------\n'
 
     geoms = []
-    step = 0
-    for i, line in enumerate(lines):
-        if line == start:
-            step += 1
-            geom = ''
-            geom_start = i+3
-            for j, line2 in enumerate(lines[geom_start:], start=geom_start):
-                if line2 == end:
-                    geoms.append(f'{j - geom_start}\nStep {step}\n' + geom)
-                    break
-                atom, an, *xyz = line2.split()
-                if units == 'angstrom':
-                    x, y, z = map(lambda x: float(x)*BOHR_TO_ANGSTROM, xyz)
-                    geom += f'{atom:<2s} {x:> 15.8f} {y:> 15.8f} {z:> 15.8f}\n'
-                else:
-                    geom += f'{atom:<2s} {x:>11} {y:>11s} {z:>11s}\n'
+    for step, rows in enumerate(extract_sections(lines, 'cfour', ['geometry'])['geometry'], start=1):
+        geom = ''
+        for atom, *xyz in rows:
+            if units == 'angstrom':
+                x, y, z = map(lambda x: float(x)*BOHR_TO_ANGSTROM, xyz)
+                geom += f'{atom:<2s} {x:> 15.8f} {y:> 15.8f} {z:> 15.8f}\n'
+            else:
+                x, y, z = xyz
+                geom += f'{atom:<2s} {x:>11s} {y:>11s} {z:>11s}\n'
+        geoms.append(f'{len(rows)}\nStep {step}\n' + geom)
     return geoms
 
 
@@ -145,125 +125,233 @@ def get_ir(lines):
     return freqs
 
 
-def get_theo_method(lines):
-    """ Get the level of correlation and basis set for the computation. """
-    for line in lines:
-        if 'ICLLVL' in lines:
-            theory = line.split()[2]
-        if 'IBASIS' in line:
-            basis = line.split()[2]
-        if 'IREFNC' in line:
-            reference = line.split()[2]
+# Control parameters (internal name: (attribute, conversion of the value))
+PARAMETERS = {
+    'ICLLVL': ('method', str),
+    'IBASIS': ('basis', str),
+    'IREFNC': ('reference', str),
+    'ICHRGE': ('charge', int),
+    'IMULTP': ('multiplicity', int),
+    # Convergence thresholds are printed as 10D-  7 (or as the exponent alone)
+    'ISCFCV': ('scf_conv', lambda value: 10.0**-int(value)),
+    'ICCCNV': ('cc_conv', lambda value: 10.0**-int(value)),
+    'IZTACN': ('lineq_conv', lambda value: 10.0**-int(value)),
+    'ICONTL': ('geo_conv', lambda value: 10.0**-int(value)),
+}
 
-    return theory, basis, reference
+T2_AMPLITUDE = re.compile(r'\]\s*(-?\d+\.\d+)')
+FLOAT = re.compile(r'[:=]\s*(-?\d+\.\d+)')
 
 
-def get_charge(lines):
-    """ Searches through file and finds the charge of the molecule. """
+class Summary:
+    """
+    Setup, diagnostics and energies of a CFOUR output (see get_summary)
+    Values that are not printed are None, energies are the last ones printed (in hartree)
+    :attr method, basis, reference: level of correlation, basis set and reference (e.g. CCSD, 3-21G, RHF)
+    :attr charge, multiplicity: of the molecule
+    :attr scf_conv, cc_conv, geo_conv, lineq_conv, int_thresh: convergence thresholds
+    :attr s2: last expectation value of S**2
+    :attr t1_norms: {spin case: last norm of the T1 vector}, e.g. {'AA': 0.0128}
+    :attr t2_amplitudes: {spin case: largest T2 amplitude (absolute value) of the last iteration}
+    :attr nalpha, nbeta, ncore: number of alpha and beta electrons and of frozen-core orbitals
+    :attr energies: {'scf', 'mp2', 'ccsd' and 'ccsd(t)': last energy}
+    :attr printed: {attribute: value as printed} for the control parameters, int_thresh and s2
+    """
+    def __init__(self):
+        self.method = self.basis = self.reference = None
+        self.charge = self.multiplicity = None
+        self.scf_conv = self.cc_conv = self.geo_conv = self.lineq_conv = self.int_thresh = None
+        self.s2 = None
+        self.t1_norms = {}
+        self.t2_amplitudes = {}
+        self.nalpha = self.nbeta = None
+        self.ncore = 0
+        self.energies = {'scf': None, 'mp2': None, 'ccsd': None, 'ccsd(t)': None}
+        self.printed = {}
+
+    def set(self, attribute, value, convert=float):
+        """Set an attribute from its printed value"""
+        self.printed[attribute] = value
+        setattr(self, attribute, convert(value))
+
+    @property
+    def max_t2(self):
+        """Largest T2 amplitude (absolute value) of the last iteration, over all spin cases"""
+        return max(self.t2_amplitudes.values(), default=None)
+
+    @property
+    def t1(self):
+        """T1 diagnostic, sqrt(|T1|**2/number of correlated electrons)"""
+        if 'AA' not in self.t1_norms or self.nalpha is None:
+            return None
+        # Restricted references only print the alpha norm
+        t1bb = self.t1_norms.get('BB', self.t1_norms['AA'])
+        return math.sqrt((self.t1_norms['AA']**2 + t1bb**2)/(self.nalpha + self.nbeta - 2*self.ncore))
+
+
+def _parameter(summary, line):
+    """       CALCLEVEL            ICLLVL           CCSD       [ 10]   ***"""
+    name, key, *values = line.split()
+    if key in PARAMETERS and values:
+        attribute, convert = PARAMETERS[key]
+        summary.set(attribute, values[1] if values[0].endswith('D-') and len(values) > 1 else values[0], convert)
+
+
+def _electrons(summary, line):
+    """total electron number:   10.0 (or total alpha/beta spin electron number for UHF)"""
+    # Printed with rounding errors, e.g. 9.99999999999999
+    number = float(line.split(':')[1])
+    if line.startswith('total alpha'):
+        summary.nalpha = round(number)
+    elif line.startswith('total  beta'):
+        summary.nbeta = round(number)
+    else:
+        summary.nalpha = summary.nbeta = round(number/2)
+
+
+def _frozen_core(summary, line):
+    """There is   1 frozen-core orbital."""
+    if 'frozen-core' in line:
+        summary.ncore = int(line.split()[2])
+
+
+def _energy(name):
+    """Handler for lines with an energy after a : or ="""
+    def handler(summary, line):
+        match = FLOAT.search(line)
+        if match:
+            summary.energies[name] = float(match.group(1))
+    return handler
+
+
+def _ccsd_t(summary, line):
+    """CCSD(T) energy       -76.2418"""
+    values = line.split()
+    if len(values) == 3:
+        summary.energies['ccsd(t)'] = float(values[2])
+
+
+def _t1_norm(summary, line):
+    """Norm of T1AA vector (       16 symmetry allowed elements):  0.0128636733."""
+    summary.t1_norms[line[10:12]] = float(line.split(':')[1].strip().rstrip('.'))
+
+
+# {start of the stripped line: handler(summary, stripped line)}, the T2 amplitude blocks are handled in get_summary
+DISPATCH = {
+    'E(SCF)=': _energy('scf'),
+    'Total MP2 energy': _energy('mp2'),
+    'Total CCSD energy': _energy('ccsd'),
+    'CCSD(T) energy': _ccsd_t,
+    'The expectation value of S**2 is': lambda summary, line: summary.set('s2', line.split()[6]),
+    'Norm of T1AA vector': _t1_norm,
+    'Norm of T1BB vector': _t1_norm,
+    'total electron number:': _electrons,
+    'total alpha spin electron number:': _electrons,
+    'total  beta spin electron number:': _electrons,
+    'There is': _frozen_core,
+    'There are': _frozen_core,
+    'Integrals less than': lambda summary, line: summary.set('int_thresh', line.split()[3]),
+}
+# Control parameters are dispatched on their external names
+for _name in ['CALCLEVEL', 'BASIS', 'REFERENCE', 'CHARGE', 'MULTIPLICTY', 'MULTIPLICITY',
+              'CC_CONV', 'SCF_CONV', 'GEO_CONV', 'LINEQ_CONV']:
+    DISPATCH[_name + ' '] = _parameter
+# Every line is looked up by its first few characters, and only then compared to the full prefixes
+KEY_LENGTH = min(map(len, DISPATCH))
+_KEYS = {}
+for _prefix, _handler in sorted(DISPATCH.items(), key=lambda item: len(item[0]), reverse=True):
+    _KEYS.setdefault(_prefix[:KEY_LENGTH], []).append((_prefix, _handler))
+
+
+@timed('parse')
+def get_summary(lines):
+    """
+    Collects the setup, diagnostics and energies of a CFOUR output in a single pass
+    :param lines: lines of a cfour output file (list or LazyLines)
+    :return: Summary
+    """
+    summary = Summary()
+    # Amplitudes of the T2 block being read
+    amplitudes = None
     for line in lines:
-        if 'ICHRGE' in line:
-            return line.split()[2]
+        stripped = line.lstrip()
+        if amplitudes is not None:
+            if stripped[:1] == '[':
+                amplitudes.extend(T2_AMPLITUDE.findall(stripped))
+                continue
+            # The block ends with the line after the amplitudes (the header lines are skipped)
+            if not amplitudes and not stripped.startswith('Norm of T2'):
+                continue
+            summary.t2_amplitudes[case] = max((abs(float(t)) for t in amplitudes), default=0.0)
+            amplitudes = None
+        if stripped.startswith('Largest T2 amplitudes for spin case'):
+            case = stripped.split()[-1].rstrip(':')
+            amplitudes = []
+            continue
+        for prefix, handler in _KEYS.get(stripped[:KEY_LENGTH], ()):
+            if stripped.startswith(prefix):
+                handler(summary, stripped)
+                break
+    return summary
 
-    return None
 
+def get_theo_method(lines):
+    """ Get the level of correlation and basis set for the computation. """
+    summary = get_summary(lines)
+    return summary.method, summary.basis, summary.reference
 
-def get_multiplicity(lines):
+
+def get_charge(lines):
     """ Searches through file and finds the charge of the molecule. """
-    for line in lines:
-        if 'IMULTP' in line:
-            return line.split()[2]
+    return get_summary(lines).printed.get('charge')
 
-    return None
 
+def get_multiplicity(lines):
+    """ Searches through file and finds the multiplicity of the molecule. """
+    return get_summary(lines).printed.get('multiplicity')
 
-def get_conv_params(lines):
-    """ Finds the convergence criterion for SCF, CC, and Geometry. """
-    for line in lines:
-        if 'ISCFCV' in line:
-            scf_conv = line.split()[3]
-        if 'ICCCNV' in line:
-            cc_conv = line.split()[3]
-        if 'ICONTL' in line:
-            geo_conv = line.split()[2]
-        if 'IZTACN' in line:
-            lineq_conv = line.split()[3]
-        if 'Integrals less than' in line:
-            int_thresh = line.split()[3]
 
-    return scf_conv, cc_conv, geo_conv, lineq_conv, int_thresh
+def get_conv_params(lines):
+    """ Finds the convergence criterion for SCF, CC, and Geometry (the exponents as printed). """
+    printed = get_summary(lines).printed
+    return tuple(printed.get(name) for name in ['scf_conv', 'cc_conv', 'geo_conv', 'lineq_conv', 'int_thresh'])
 
 
 def get_diagnostics(lines):
     """ Gets the S^2 and T1 and T2 diagnostics. """
-    s2 = maxT2 = t1a = t1b = t1 = 0.0
-    end = case = caset1 = Nbeta = Nalpha = Ncore = 0
-
-    for i in range(len(lines) - 1, -1, -1):
-        line = lines[i]
-        if 'The expectation value of S**2 is' in line:
-            s2 = line.split()[6]
-
-        if 'Largest T2 amplitudes for spin case' in line:
-            maxT = 0
-            case = case + 1
-            if not case > 3:
-                if 'Largest T2 amplitudes for spin case AB' in line:
-                    for a in range(15):
-                        if 'Norm of T2' in lines[i+a]:
-                            end = a - 1
-                            break
-                    for a in range(i+4, i+end):
-                        c = re.findall(r'\]\s?-?\d.\d*', lines[a])
-                        for j in range(3):
-                            maxT = max(abs(float(b[j][1:])), maxT)
-                else:
-                    for a in range(10):
-                        if 'Norm of T2' in lines[i + a]:
-                            end = a - 1
-                            break
-                    for a in range(i+3, i+end):
-                        c = re.findall(r'\]\s?-?\d.\d*', lines[a])
-                        for j in range(3):
-                            maxT = max(abs(float(b[j][1:])), maxT)
-            if maxT > maxT2:
-                maxT2 = maxT
-
-        if 'Norm of T1AA' in line:
-            caset1 = caset1 + 1
-            if not caset1 > 2:
-                t1a = line.split(':')[1][:-2]
-        if 'Norm of T1BB' in line:
-            caset1 = caset1 + 1
-            if not caset1 > 2:
-                t1b = line.split(':')[1][:-2]
-        if 'total alpha spin electron number: ' in line:
-            Nalpha = float(line.split(':')[1])
-        if 'total  beta spin electron number: ' in line:
-            Nbeta = float(line.split(':')[1])
-        if 'frozen-core orbitals' in line:
-            Ncore = 2*float(line.split()[2])
-
-    t1 = math.sqrt((pow(float(t1a), 2) + pow(float(t1b), 2))/(Nalpha + Nbeta - Ncore))
-    return s2, maxT2, t1
+    summary = get_summary(lines)
+    return summary.printed.get('s2'), summary.max_t2, summary.t1
 
 
 def get_final_energy(lines):
+    """ The last CCSD(T) energy, searching from the end of the file. """
     for line in reversed(lines):
         if 'CCSD(T) energy' in line and len(line.split()) == 3:
             return line.split()[2]
     return None
 
 
+# Starts of the stripped energy lines of get_energy, in the order they are returned
+ENERGY_LINES = ['CCSD(T) energy', 'Total CCSD energy', 'Total MP2 energy', 'E(SCF)=']
+
+
 def get_energy(lines):
-    """ Obtain the latest HF, MP2, CCSD, and CCSD(T), energies. """
+    """
+    Obtain the latest CCSD(T), CCSD, MP2 and HF energies, searching from the end
+    of the file until all of them are found (None for those that are missing)
+    WARNING: They are returned as strings in order to prevent python from rounding
+    """
+    energies = dict.fromkeys(ENERGY_LINES)
     for line in reversed(lines):
-        if 'CCSD(T) energy' in line:
-            ccsdpt_energy = line.split()[2]
-        if 'CCSD energy' in line:
-            ccsd_energy = line.split()[2]
-        if 'Total MP2 energy' in line:
-            mp2_energy = line.split()[4]
-        if 'E(SCF)=' in line:
-            hf_energy = line.split()[1]
-
-    return ccsdpt_energy, ccsd_energy, mp2_energy, hf_energy
+        stripped = line.lstrip()
+        for start in ENERGY_LINES:
+            if energies[start] is None and stripped.startswith(start):
+                if start == 'CCSD(T) energy':
+                    values = stripped.split()
+                    energies[start] = values[2] if len(values) == 3 else None
+                else:
+                    match = FLOAT.search(stripped)
+                    energies[start] = match.group(1) if match else None
+        if None not in energies.values():
+            break
+    return tuple(energies.values())
@@ -0,0 +1,345 @@
+"""Transparent access to compressed (gzip, bz2 and xz) output files"""
+import io
+import bz2
+import gzip
+import zlib
+
+from bisect import bisect_right
+
+try:
+    import lzma
+except ImportError:
+    # Python built without liblzma
+    lzma = None
+
+# Magic bytes at the start of each compressed format
+MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'xz',
+}
+
+
+def compression(file_name):
+    """
+    Detect the compression of a file from its magic bytes
+    :param file_name: file to check
+    :return: 'gzip', 'bz2', 'xz', or None if it is not compressed
+    """
+    with open(file_name, 'rb') as f:
+        return compression_of(f.read(6))
+
+
+def compression_of(data):
+    """
+    Detect the compression from the first bytes of a file
+    :param data: bytes from the start of the file
+    :return: 'gzip', 'bz2', 'xz', or None if it is not compressed
+    """
+    for magic, kind in MAGIC.items():
+        if data.startswith(magic):
+            return kind
+    return None
+
+
+def open_file(file_name, mode='r', encoding=None, errors=None):
+    """
+    Drop-in replacement for open() when reading that decompresses on the fly
+    :param file_name: file to open
+    :param mode: 'r'/'rt' for text or 'rb' for bytes
+    :param encoding: text encoding
+    :param errors: how to handle encoding errors
+    :return: file object
+    """
+    if mode not in ['r', 'rt', 'rb']:
+        raise ValueError(f'open_file only supports reading, not mode={mode}')
+    kind = compression(file_name)
+    if kind is None:
+        return open(file_name, mode, encoding=encoding, errors=errors)
+    if kind == 'xz' and lzma is None:
+        raise ImportError(f'{file_name} is xz compressed, but Python was built without lzma')
+    opener = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open if lzma else None}[kind]
+    if mode == 'rb':
+        return opener(file_name, 'rb')
+    return opener(file_name, 'rt', encoding=encoding, errors=errors)
+
+
+def open_index(file_name):
+    """
+    Random access to the decompressed bytes of a compressed file
+    gzip and xz files are indexed so that reading near the end (e.g. for
+    reversed()) does not hold the whole file in memory. bz2 files are
+    decompressed into memory.
+    :param file_name: compressed file
+    :return: GzipIndex, XzIndex or MemoryIndex, None if the file is not compressed
+    """
+    kind = compression(file_name)
+    if kind == 'gzip':
+        return GzipIndex(file_name)
+    if kind == 'xz':
+        try:
+            return XzIndex(file_name)
+        except NotImplementedError:
+            # Unsupported filters, fall back to a full decompression
+            pass
+    if kind is not None:
+        with open_file(file_name, 'rb') as f:
+            return MemoryIndex(f.read())
+    return None
+
+
+class BlockIndex:
+    """
+    Random access to a file split into independently decompressible blocks
+    Subclasses set self.starts (the decompressed offset of each block and,
+    once known, the total size) and implement _decompress(i)
+    """
+
+    def __init__(self):
+        self.starts = [0]
+        # Only the most recently used block is kept
+        self._cache = (None, b'')
+
+    @property
+    def complete(self):
+        """Whether the offsets of all blocks are known"""
+        return True
+
+    @property
+    def size(self):
+        """Size of the decompressed file"""
+        while not self.complete:
+            self._block(len(self.starts) - 1)
+        return self.starts[-1]
+
+    def read(self, start, end):
+        """
+        Read the decompressed bytes from start to end
+        :param start: first byte offset
+        :param end: byte offset after the last byte
+        """
+        while not self.complete and self.starts[-1] <= start:
+            self._block(len(self.starts) - 1)
+        pieces = []
+        i = bisect_right(self.starts, start) - 1
+        while start < end and (i < len(self.starts) - 1 or not self.complete):
+            data = self._block(i)
+            offset = self.starts[i]
+            pieces.append(data[start - offset:end - offset])
+            start = offset + len(data)
+            i += 1
+        return b''.join(pieces)
+
+    def _block(self, i):
+        """Decompressed bytes of block i, using the cache"""
+        if self._cache[0] != i:
+            self._cache = (i, self._decompress(i))
+        return self._cache[1]
+
+    def _decompress(self, i):
+        raise NotImplementedError
+
+    def close(self):
+        self._cache = (None, b'')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class MemoryIndex(BlockIndex):
+    """A single block holding the whole decompressed file"""
+
+    def __init__(self, data):
+        super().__init__()
+        self.data = data
+        self.starts = [0, len(data)]
+
+    def _decompress(self, i):
+        return self.data
+
+
+class GzipIndex(BlockIndex):
+    """
+    Seekable gzip file
+    Checkpoints (copies of the decompressor state) are saved every spacing
+    bytes while decompressing, so later reads restart from the nearest one
+    instead of the beginning of the file. The first read past a point has to
+    decompress everything before it, but only one block is held at a time.
+    Multi-member files (e.g. from concatenation or pigz) are supported.
+    """
+    # Decompressed bytes between checkpoints
+    spacing = 2**22
+    chunk_size = 2**15
+
+    def __init__(self, file_name):
+        super().__init__()
+        self.file = open(file_name, 'rb')
+        # (compressed offset, decompressor, at member boundary) for each entry in starts
+        self.checkpoints = [(0, zlib.decompressobj(31), True)]
+        self._complete = False
+
+    @property
+    def complete(self):
+        return self._complete
+
+    def _decompress(self, i):
+        """Decompress block i, adding the checkpoint at its end if it is new"""
+        in_pos, decompressor, boundary = self.checkpoints[i]
+        decompressor = decompressor.copy()
+        new = i == len(self.starts) - 1
+        # The last block runs to the end of the file
+        end = self.checkpoints[i + 1][0] if i + 1 < len(self.checkpoints) else None
+
+        self.file.seek(in_pos)
+        pieces = []
+        size = 0
+        eof = False
+        while (size < self.spacing) if new else (end is None or in_pos < end):
+            data = self.file.read(self.chunk_size if end is None else min(self.chunk_size, end - in_pos))
+            if not data:
+                eof = True
+                break
+            in_pos += len(data)
+            while data:
+                if boundary:
+                    # Members may be followed by zero padding
+                    data = data.lstrip(b'\x00')
+                    if not data:
+                        break
+                    boundary = False
+                out = decompressor.decompress(data)
+                pieces.append(out)
+                size += len(out)
+                data = b''
+                if decompressor.eof:
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(31)
+                    boundary = True
+
+        if new:
+            self.starts.append(self.starts[i] + size)
+            if eof:
+                self._complete = True
+            else:
+                self.checkpoints.append((in_pos, decompressor.copy(), boundary))
+        return b''.join(pieces)
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+class XzIndex(BlockIndex):
+    """
+    Seekable xz file using the block index stored at the end of every xz stream
+    Only the blocks that are read are decompressed. Files compressed in a single
+    block (the default for single-threaded xz) therefore have to be fully
+    decompressed, use xz -T0 or --block-size to create seekable files.
+    """
+    # Size of the integrity check for each check type
+    check_sizes = [0, 4, 4, 4, 8, 8, 8, 16, 16, 16, 32, 32, 32, 64, 64, 64]
+
+    def __init__(self, file_name):
+        if lzma is None:
+            raise ImportError(f'{file_name} is xz compressed, but Python was built without lzma')
+        super().__init__()
+        self.file = open(file_name, 'rb')
+        # (compressed offset, unpadded size, check size) of each block
+        self.blocks = []
+        starts = [0]
+        for stream_start, check, records in self._read_streams():
+            in_pos = stream_start + 12
+            for unpadded, uncompressed in records:
+                self.blocks.append((in_pos, unpadded, self.check_sizes[check]))
+                starts.append(starts[-1] + uncompressed)
+                in_pos += (unpadded + 3)//4*4
+        self.starts = starts
+
+    def _read_streams(self):
+        """
+        Read the index of every stream, working backwards from the end
+        :return: list of (stream offset, check type, [(unpadded size, uncompressed size)])
+        """
+        f = self.file
+        end = f.seek(0, io.SEEK_END)
+        streams = []
+        while end > 0:
+            # Skip stream padding
+            f.seek(end - 4)
+            if f.read(4) == b'\x00'*4:
+                end -= 4
+                continue
+            f.seek(end - 12)
+            footer = f.read(12)
+            if footer[10:] != b'YZ':
+                raise ValueError(f'{f.name} is not a valid xz file')
+            index_size = (int.from_bytes(footer[4:8], 'little') + 1)*4
+            check = footer[9] & 0x0F
+            index_start = end - 12 - index_size
+            f.seek(index_start)
+            index = f.read(index_size)
+            count, pos = _varint(index, 1)
+            records = []
+            for _ in range(count):
+                unpadded, pos = _varint(index, pos)
+                uncompressed, pos = _varint(index, pos)
+                records.append((unpadded, uncompressed))
+            end = index_start - sum((unpadded + 3)//4*4 for unpadded, _ in records) - 12
+            streams.append((end, check, records))
+        return streams[::-1]
+
+    def _decompress(self, i):
+        in_pos, unpadded, check_size = self.blocks[i]
+        self.file.seek(in_pos)
+        block = self.file.read(unpadded)
+        header_size = (block[0] + 1)*4
+        flags = block[1]
+        pos = 2
+        # Optional compressed and uncompressed sizes
+        if flags & 0x40:
+            _, pos = _varint(block, pos)
+        if flags & 0x80:
+            _, pos = _varint(block, pos)
+        filters = []
+        for _ in range((flags & 0x03) + 1):
+            filter_id, pos = _varint(block, pos)
+            size, pos = _varint(block, pos)
+            filters.append(_xz_filter(filter_id, block[pos:pos + size]))
+            pos += size
+        decompressor = lzma.LZMADecompressor(lzma.FORMAT_RAW, filters=filters)
+        return decompressor.decompress(block[header_size:unpadded - check_size])
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+def _varint(data, pos):
+    """Decode the variable length integer at pos, returns it and the following position"""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        value |= (byte & 0x7F) << shift
+        pos += 1
+        shift += 7
+        if byte < 0x80:
+            return value, pos
+
+
+def _xz_filter(filter_id, props):
+    """Convert the filter flags of an xz block header to an lzma filter"""
+    if filter_id == lzma.FILTER_LZMA2:
+        bits = props[0] & 0x3F
+        dict_size = 0xFFFFFFFF if bits == 40 else (2 | (bits & 1)) << (bits//2 + 11)
+        return {'id': filter_id, 'dict_size': dict_size}
+    if filter_id == lzma.FILTER_DELTA:
+        return {'id': filter_id, 'dist': props[0] + 1}
+    if filter_id in [lzma.FILTER_X86, lzma.FILTER_POWERPC, lzma.FILTER_IA64,
+                     lzma.FILTER_ARM, lzma.FILTER_ARMTHUMB, lzma.FILTER_SPARC]:
+        if props:
+            return {'id': filter_id, 'start_offset': int.from_bytes(props, 'little')}
+        return {'id': filter_id}
+    raise NotImplementedError(f'Unsupported xz filter: {filter_id:#x}')
@@ -43,27 +43,38 @@ class Convergence:
         yield from self.steps
 
     def __str__(self):
-        if self.program == 'orca':
+        out = self.header()
+        for i, step in enumerate(self):
+            out += self.row(i, step)
+        return out + self.footer()
+
+    def header(self):
+        """Header of the convergence table"""
+        if self.program in ['orca', 'gaussian']:
             header = "      Δ energy  RMS grad  MAX grad  RMS step  MAX Step | SCF Steps\n"
         else:
-            raise NotImplementedError('Convergence currently only implemented for ORCA')
+            raise NotImplementedError('Convergence currently only implemented for ORCA and Gaussian')
 
-        line = '-'*66 + '\n'
-        out = header + line
-        for i, step in enumerate(self):
-            out += f'{i:>3}: '
-            for (key, value), criterion in zip(step.params.items(), step.criteria):
-                # integers
-                if key in ['scf_steps']:
-                    pass
-                else:
-                    star = ' '
-                    if abs(value) < criterion and not (i == 0 and key == 'delta_e'):
-                        star = '*'
-                    out += f'{value:> 9.2e}{star}'
-            out += f'|{step.scf_steps:> 7d}\n'
-
-        return out + line + '    ' + (' {:> 9.2e}'*len(self.criteria)).format(*self.criteria)
+        return header + '-'*66 + '\n'
+
+    @staticmethod
+    def row(i, step):
+        """Line of the convergence table for the ith step, converged values are starred"""
+        out = f'{i:>3}: '
+        for (key, value), criterion in zip(step.params.items(), step.criteria):
+            # integers
+            if key in ['scf_steps']:
+                pass
+            else:
+                star = ' '
+                if abs(value) < criterion and not (i == 0 and key == 'delta_e'):
+                    star = '*'
+                out += f'{value:> 9.2e}{star}'
+        return out + f'|{step.scf_steps:> 7d}\n'
+
+    def footer(self):
+        """Closing line of the convergence table with the criteria"""
+        return '-'*66 + '\n' + '    ' + (' {:> 9.2e}'*len(self.criteria)).format(*self.criteria)
 
     def plot(self, show=True):
         """
@@ -3,19 +3,33 @@
 # Script that takes an output file and returns the orbital energies
 import numpy as np
 
-from cclib import ccopen
 from cclib.parser.utils import convertor
 import matplotlib.pyplot as plt
 
+from .cache import ccread
+from .gbw import GBW, is_gbw
 
-def read_energy_levels(input_file, units='eV'):
+
+def read_energy_levels(input_file, units='eV', use_cache=True):
     """
     Determines the energy levels and homos from and output file
     :param input_file: input file to read
     :param units: units to return energies in
+    :param use_cache: use the parse cache
     """
+    if is_gbw(input_file):
+        # Orbital energies are stored in hartree
+        with GBW(input_file) as gbw:
+            levels = np.array(gbw.energies)
+            homos = gbw.homos
+        if units != 'hartree':
+            try:
+                levels = convertor(levels, 'hartree', units)
+            except KeyError as e:
+                raise KeyError(f'Cannot convert energy levels to {units}')
+        return levels, homos
     try:
-        data = ccopen(input_file).parse()
+        data = ccread(input_file, use_cache)
         levels = np.array(data.moenergies)
         if units != 'eV':
             try:
@@ -27,13 +41,14 @@ def read_energy_levels(input_file, units='eV'):
     return levels, data.homos
 
 
-def energy_levels(input_file, units='eV', verbose=True, write=None):
+def energy_levels(input_file, units='eV', verbose=True, write=None, use_cache=True):
     """
     Determines the energy levels and homos from and output file
     :param input_file: input file to read
     :param units: units to return energies in
+    :param use_cache: use the parse cache
     """
-    levels, homos = read_energy_levels(input_file, units)
+    levels, homos = read_energy_levels(input_file, units, use_cache)
 
     if levels.shape[0] == 1:
         i = homos[0]
@@ -0,0 +1,316 @@
+"""Extract selected quantities from output files without a full cclib parse"""
+import numpy as np
+
+from .atom import atomic_numbers
+from .gaussian import GaussianOutput
+from .helper import LazyLines, check_program
+from .profiling import timed
+
+HARTREE_TO_EV = 27.21138505
+# Total energies that cclib stores in eV, extract returns them in hartree
+EV_FIELDS = ['scfenergies', 'mpenergies', 'ccenergies']
+
+
+@timed('extract')
+def extract(file_name, fields, program=None, use_cache=True):
+    """
+    Extract only the requested fields from an output file in a single pass
+
+    Fields use the names of cclib attributes (e.g. scfenergies, freeenergy,
+    geovalues, geotargets, vibfreqs, optdone) and the same conventions, except
+    that total energies are in hartree. Two extra fields are available:
+    completed (normal termination) and scfsteps (SCF iterations per geometry).
+    Fields without a native extractor for the program are read with cclib.
+    :param file_name: output file to read
+    :param fields: list of fields to extract
+    :param program: program that wrote the file (detected if not given)
+    :param use_cache: use the parse cache for the cclib fallback
+    :return: dictionary of the fields that were found
+    """
+    if program is None:
+        program = check_program(file_name)
+    native = NATIVE_FIELDS.get(program, [])
+    native_fields = [field for field in fields if field in native]
+
+    results = {}
+    if native_fields:
+        with LazyLines(file_name) as lines:
+            results.update(SCANNERS[program](lines, native_fields))
+    other_fields = [field for field in fields if field not in native]
+    if other_fields:
+        results.update(extract_cclib(file_name, other_fields, use_cache))
+
+    return results
+
+
+def extract_cclib(file_name, fields, use_cache=True):
+    """
+    Extract the fields with a full cclib parse
+    :param file_name: output file to read
+    :param fields: list of fields to extract
+    :param use_cache: use the parse cache
+    :return: dictionary of the fields that were found
+    """
+    from .cache import ccread
+
+    data = ccread(file_name, use_cache)
+    if data is None:
+        return {}
+
+    results = {}
+    for field in fields:
+        if field == 'completed':
+            if 'success' in data.metadata:
+                results[field] = bool(data.metadata['success'])
+        elif field == 'scfsteps':
+            if hasattr(data, 'scfvalues'):
+                results[field] = [len(values) for values in data.scfvalues]
+        elif hasattr(data, field):
+            value = getattr(data, field)
+            if field in EV_FIELDS:
+                value = np.asarray(value) / HARTREE_TO_EV
+            results[field] = value
+    return results
+
+
+def scan_orca(lines, fields):
+    """
+    Single pass over the lines of an ORCA output for the requested fields
+    Only the checks needed for the requested fields are run on each line.
+    Most lines are matched at fixed columns, the messages that ORCA centres in
+    boxes of stars (whose width depends on the version) are matched at the
+    start of the line without its leading blanks and stars.
+    :param lines: lines of an ORCA output file
+    :param fields: list of fields (see NATIVE_FIELDS['orca'])
+    :return: dictionary of the fields that were found
+    """
+    found = {
+        'total': [], 'dispersion': [], 'geovalues': [], 'geotargets': [],
+        'names': [], 'scfsteps': [], 'relaxed_scan': False,
+    }
+    handlers, boxed = [], []
+    if 'scfenergies' in fields:
+        handlers += [
+            (0, 20, 'Total Energy       :', lambda line, it: found['total'].append(float(line.split()[3]))),
+            (0, 21, 'Dispersion correction', lambda line, it: found['dispersion'].append(float(line.split()[-1]))),
+        ]
+    if 'geovalues' in fields or 'geotargets' in fields:
+        handlers += [
+            (0, 23, 'Convergence Tolerances:', lambda line, it: _orca_geotargets(it, found)),
+            (33, 53, 'Geometry convergence', lambda line, it: _orca_geovalues(it, found)),
+            (23, 48, '*    Relaxed Surface Scan', lambda line, it: found.update(relaxed_scan=True)),
+        ]
+    if 'freeenergy' in fields:
+        def freeenergy(line, it):
+            found['freeenergy'] = float(line.split()[5])
+        handlers += [
+            (0, 25, 'Final Gibbs free enthalpy', freeenergy),
+            (0, 23, 'Final Gibbs free energy', freeenergy),
+        ]
+    if 'vibfreqs' in fields:
+        handlers.append((0, 23, 'VIBRATIONAL FREQUENCIES', lambda line, it: _orca_vibfreqs(it, found)))
+    if 'optdone' in fields:
+        handlers += [
+            (21, 68, 'FINAL ENERGY EVALUATION AT THE STATIONARY POINT', lambda line, it: found.update(optdone=True)),
+        ]
+        boxed.append(('The optimization did not converge', lambda line, it: found.setdefault('optdone', False)))
+    if 'completed' in fields:
+        handlers.append((0, 14, 'TOTAL RUN TIME', lambda line, it: found.update(completed=True)))
+    if 'natom' in fields:
+        handlers.append((0, 15, 'Number of atoms', lambda line, it: found.update(natom=int(line.split()[-1]))))
+    if 'charge' in fields or 'mult' in fields:
+        def charge(line, it):
+            # The multiplicity is on the following line
+            found['charge'] = int(line.split()[-1])
+            found['mult'] = int(next(it).split()[-1])
+        handlers.append((1, 13, 'Total Charge', charge))
+    if 'scfsteps' in fields:
+        # *           SCF CONVERGED AFTER   5 CYCLES          *, iterations are numbered from 0
+        boxed.append(('SCF CONVERGED AFTER', lambda line, it: found['scfsteps'].append(int(line.split()[-3]) + 1)))
+
+    it = iter(lines)
+    for line in it:
+        for start, end, text, handler in handlers:
+            if line[start:end] == text:
+                handler(line, it)
+        if boxed:
+            stripped = line.lstrip(' *')
+            for text, handler in boxed:
+                if stripped[:len(text)] == text:
+                    handler(line, it)
+
+    results = {}
+    if 'scfenergies' in fields and found['total']:
+        energies = np.array(found['total'])
+        # Like cclib, include the dispersion correction
+        n = min(len(energies), len(found['dispersion']))
+        energies[:n] += found['dispersion'][:n]
+        results['scfenergies'] = energies
+    if 'geovalues' in fields and found['geovalues']:
+        results['geovalues'] = np.array(found['geovalues'])
+    if 'geotargets' in fields and found['geotargets']:
+        results['geotargets'] = np.array(found['geotargets'])
+    if 'scfsteps' in fields and found['scfsteps']:
+        results['scfsteps'] = found['scfsteps']
+    if 'completed' in fields:
+        results['completed'] = found.get('completed', False)
+    for field in ['freeenergy', 'vibfreqs', 'optdone', 'natom', 'charge', 'mult']:
+        if field in fields and field in found:
+            results[field] = found[field]
+
+    return results
+
+
+def _orca_geotargets(it, found):
+    """
+    Read the convergence tolerances, their order determines that of geovalues
+    Convergence Tolerances:
+    Energy Change            TolE     ....  1.0000e-06 Eh
+    Max. Gradient            TolMAXG  ....  1.0000e-04 Eh/bohr
+    ...
+    """
+    found['names'], found['geotargets'] = [], []
+    for i in range(5):
+        line = next(it)
+        name = line[:25].strip().lower().replace('.', '').replace('displacement', 'step')
+        found['names'].append(name)
+        found['geotargets'].append(float(line.split()[-2]))
+
+
+def _orca_geovalues(it, found):
+    """
+    Read a geometry convergence block (see orca.convergence)
+    A missing energy change is 0 in relaxed scans and nan otherwise
+    """
+    next(it), next(it)
+    values = {}
+    line = next(it)
+    while len(set(line.strip())) > 1:
+        values[line[10:28].strip().lower()] = float(line.split()[2])
+        line = next(it)
+    missing = 0.0 if found['relaxed_scan'] else np.nan
+    found['geovalues'].append([values.get(name, missing) for name in found['names']])
+
+
+def _orca_vibfreqs(it, found):
+    """
+    Read the frequencies, dropping the leading zero (translation/rotation) modes
+       0:         0.00 cm**-1
+       ...
+       6:       401.64 cm**-1
+    """
+    freqs = []
+    for line in it:
+        if 'cm**-1' in line:
+            freqs.append(float(line.split()[1]))
+        elif freqs:
+            break
+    freqs = np.array(freqs)
+    nonzero = np.flatnonzero(freqs)
+    found['vibfreqs'] = freqs[nonzero[0]:] if len(nonzero) else freqs[:0]
+
+
+def scan_psi4(lines, fields):
+    """
+    Single pass over the lines of a Psi4 output for the requested fields
+    :param lines: lines of a Psi4 output file
+    :param fields: list of fields (see NATIVE_FIELDS['psi4'])
+    :return: dictionary of the fields that were found
+    """
+    energies = []
+    found = {'completed': False}
+    finite_difference = False
+    # The optimizer messages are indented differently by each version of optking
+    optimization = 'optdone' in fields
+    for line in lines:
+        if line[:3] == '  @' and 'Final Energy:' in line:
+            # Skip the displaced geometries of a finite difference calculation
+            if not finite_difference:
+                energies.append(float(line.split()[3]))
+        elif line[:39] == '  Using finite-differences of gradients':
+            finite_difference = True
+        elif line[:15] in ('*** Psi4 exitin', '*** PSI4 exitin'):
+            found['completed'] = True
+        elif line[:22] == '      Number of atoms:':
+            found['natom'] = int(line.split()[-1])
+        elif line[2:16] == 'Charge       =':
+            found['charge'] = int(line.split()[-1])
+        elif line[2:16] == 'Multiplicity =':
+            found['mult'] = int(line.split()[-1])
+        elif optimization and 'Optimiz' in line:
+            stripped = line.strip()
+            if stripped == '**** Optimization is complete! ****':
+                found['optdone'] = True
+            elif stripped == 'Optimizer: Did not converge!':
+                found.setdefault('optdone', False)
+
+    results = {field: found[field] for field in fields if field in found}
+    if 'scfenergies' in fields and energies:
+        results['scfenergies'] = np.array(energies)
+    return results
+
+
+def scan_gaussian(lines, fields):
+    """
+    Read the requested fields of a Gaussian output from a GaussianOutput,
+    which finds all of the sections it reads in a single pass
+    :param lines: lines of a Gaussian output file
+    :param fields: list of fields (see NATIVE_FIELDS['gaussian'])
+    :return: dictionary of the fields that were found
+    """
+    output = GaussianOutput(lines)
+    results = {}
+    energies = output.energies if {'scfenergies', 'freeenergy', 'enthalpy', 'zpve'} & set(fields) else {}
+    if 'scfenergies' in fields and len(energies['scf']):
+        results['scfenergies'] = energies['scf']
+    for field, energy_type in [('freeenergy', 'gibbs'), ('enthalpy', 'enthalpy'), ('zpve', 'zpve')]:
+        if field in fields and len(energies[energy_type]):
+            results[field] = energies[energy_type][-1]
+    if 'geovalues' in fields or 'geotargets' in fields:
+        convergence = output.convergence
+        # Like cclib, in the order of the table (max force, RMS force, max displacement, RMS displacement)
+        keys = ['max_grad', 'rms_grad', 'max_step', 'rms_step']
+        if convergence.steps and 'geovalues' in fields:
+            results['geovalues'] = np.array([[step.params[key] for key in keys] for step in convergence])
+        if convergence.steps and 'geotargets' in fields:
+            criteria = dict(zip(convergence.steps[-1].params, convergence.criteria))
+            results['geotargets'] = np.array([criteria[key] for key in keys])
+    if {'vibfreqs', 'vibirs', 'vibrmasses', 'vibdisps'} & set(fields) and output.vibrations is not None:
+        vibrations = output.vibrations
+        for field, value in [('vibfreqs', vibrations.frequencies), ('vibirs', vibrations.intensities),
+                             ('vibrmasses', vibrations.reduced_masses), ('vibdisps', vibrations.displacements())]:
+            if field in fields and value is not None:
+                results[field] = value
+    if {'atomcoords', 'atomnos', 'natom'} & set(fields) and output.index['geometry']:
+        atoms, trajectory = output.trajectory
+        # Like cclib, the geometry printed again after an optimization (e.g. by a frequency calculation) is dropped
+        if output.convergence.steps:
+            trajectory = trajectory[:len(output.convergence.steps)]
+        for field, value in [('atomcoords', trajectory), ('natom', len(atoms)),
+                             ('atomnos', np.array([atomic_numbers[atom] for atom in atoms]))]:
+            if field in fields:
+                results[field] = value
+    if 'charge' in fields and output.charge is not None:
+        results['charge'] = output.charge
+    if 'mult' in fields and output.multiplicity:
+        results['mult'] = output.multiplicity
+    if 'optdone' in fields and output.optimization_done is not None:
+        results['optdone'] = output.optimization_done
+    if 'completed' in fields:
+        results['completed'] = output.completed
+    return results
+
+
+SCANNERS = {
+    'orca': scan_orca,
+    'psi4': scan_psi4,
+    'gaussian': scan_gaussian,
+}
+
+NATIVE_FIELDS = {
+    'orca': ['scfenergies', 'freeenergy', 'geovalues', 'geotargets', 'vibfreqs',
+             'optdone', 'completed', 'scfsteps', 'natom', 'charge', 'mult'],
+    'psi4': ['scfenergies', 'optdone', 'completed', 'natom', 'charge', 'mult'],
+    'gaussian': ['scfenergies', 'freeenergy', 'enthalpy', 'zpve', 'geovalues', 'geotargets', 'vibfreqs', 'vibirs',
+                 'vibrmasses', 'vibdisps', 'atomcoords', 'atomnos', 'natom', 'charge', 'mult', 'optdone', 'completed'],
+}
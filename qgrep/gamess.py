@@ -1,21 +1,26 @@
 import os
 import re
+import mmap
+import numpy as np
 
 from .atom import Atom
 from .basis import BasisSet
+from .compression import compression, open_file
 from .molecule import Molecule
+from .sections import Section, extract_sections, register, trajectory
 from collections import OrderedDict
 
 
+GEOMETRY = register('gamess', 'geometry', Section(
+    ' COORDINATES OF ALL ATOMS ARE (ANGS)\n', skip=2, row=lambda line: [line.split()[i] for i in [0, 2, 3, 4]],
+    units='angstrom'))
+CONVERGENCE = register('gamess', 'convergence', Section('MAXIMUM GRADIENT', skip=1, rows=1, row=str.strip,
+                                                          indented=True))
+
+
 def check_convergence(lines):
     """Returns all the geometry convergence results"""
-    convergence_result = 'MAXIMUM GRADIENT'
-    convergence_list = []
-    for i, line in enumerate(lines):
-        if convergence_result in line:
-            convergence_list.append(''.join(lines[i + 2].strip()))
-
-    return convergence_list
+    return [rows[0] for rows in extract_sections(lines, 'gamess', ['convergence'])['convergence']]
 
 
 def get_geom(lines, geom_type='xyz', units='angstrom'):
@@ -23,64 +28,35 @@ def get_geom(lines, geom_type='xyz', units='angstrom'):
     Takes the lines of an output file and returns its last geometry in the
     specified format
     """
-    start = ' COORDINATES OF ALL ATOMS ARE (ANGS)\n'
-    end = '\n'
     if geom_type == 'zmat' or units == 'bohr':
         raise SyntaxError(
             "Currently only supports Angstroms and xyz coordinates")
 
-    geom_start = -1
-    # Iterate backwards until the start of the last set of coordinates is found
-    for i in reversed(list(range(len(lines)))):
-        if start == lines[i]:
-            geom_start = i + 3
-            break
-    if geom_start == -1:
-        print("Could not find start of geometry")
+    geoms = extract_sections(lines, 'gamess', ['geometry'], last=True)['geometry']
+    if not geoms:
+        print("Could not find geometry")
         return ''
 
-    geom_end = -1
-    for i, line in enumerate(lines[geom_start:], start=geom_start):
-        if end == line:
-            geom_end = i
-            break
-    if geom_end == -1:
-        return ''
-
-    geom = []
-    for line in lines[geom_start: geom_end]:
-        atom, an, x, y, z = line.split()
-        geom.append('\t'.join([atom, x, y, z]))
-
-    return geom
+    return ['\t'.join(row) for row in geoms[0]]
 
 
 def plot(lines, geom_type='xyz'):
     """Plots the geometries from the optimization steps"""
-    start = ' COORDINATES OF ALL ATOMS ARE (ANGS)\n'
-    end = '\n'
     geoms = []
-    i = 0
-    step = 0
-    while i < len(lines):
-        if lines[i] == start:
-            i += 3
-            start_num = i
-            while lines[i] != end:
-                i += 1
-            end_num = i
-            geom = f'{end_num - start_num}\nStep {step}\n'
-            for line in lines[start_num:end_num]:
-                atom, num, x, y, z = line.split()
-                geom += '\t'.join([atom, x, y, z]) + '\n'
-
-            geoms.append(geom)
-            step += 1
-        i += 1
+    for step, geom in enumerate(extract_sections(lines, 'gamess', ['geometry'])['geometry']):
+        geoms.append(f'{len(geom)}\nStep {step}\n' + ''.join('\t'.join(row) + '\n' for row in geom))
 
     return geoms
 
 
+def get_trajectory(lines):
+    """
+    The geometries of all of the optimization steps
+    :return: atoms, (nsteps, natoms, 3) array of the coordinates in angstrom
+    """
+    return trajectory(lines, 'gamess')
+
+
 def get_energy(lines, energy_type='sp'):
     """Returns the energy"""
     energy = 0
@@ -95,6 +71,131 @@ def get_energy(lines, energy_type='sp'):
     return energy
 
 
+# Width of the values in $VEC and $HESS groups, which are written as (I2,I3,5E15.8)
+FIELD_WIDTH = 15
+# Each line starts with the row (or orbital) number mod 100 and the line number mod 1000
+LINE = np.dtype([('row', 'S2'), ('line', 'S3'), ('values', f'S{FIELD_WIDTH}', 5)])
+
+
+def read_group(dat_file, group):
+    """
+    The last complete group (e.g. $VEC) of a GAMESS .dat (punch) file
+    The file is searched backwards as bytes (memory mapped unless it is compressed),
+    so only the group itself is ever decoded
+    :param dat_file: .dat file
+    :param group: name of the group, without the $
+    :return: text of the group from $GROUP to $END, None if there is none
+    """
+    if compression(dat_file):
+        with open_file(dat_file, 'rb') as f:
+            return _search_group(f.read(), group)
+    with open(dat_file, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _search_group(data, group)
+
+
+def _search_group(data, group):
+    """The last complete group in the bytes of a .dat file (see read_group)"""
+    header = b'\n $' + group.upper().encode()
+    end = len(data)
+    while end > 0:
+        start = data.rfind(header, 0, end) + 1
+        if not start and data[:len(header) - 1] != header[1:]:
+            return None
+        # Must be the whole name (e.g. not $VECTOR)
+        if data[start + len(header) - 1:start + len(header)] in [b'', b' ', b'\n', b'\r']:
+            stop = data.find(b'\n $END', start)
+            if stop != -1:
+                return data[start:stop + 6].decode()
+        end = start - 1
+    return None
+
+
+def decode_group(text):
+    """
+    Decode the fixed-width values of a $VEC or $HESS group into an array
+    All lines are read at once as fixed-width fields, as neighbouring negative
+    values are not separated by whitespace
+    :param text: text of the group (lines that are not data, e.g. $VEC and $END, are skipped)
+    :return: (nlines, 5) array of the values of each line, padded with nan, and the row numbers (mod 100) of each line
+    """
+    # Data lines end their number columns with a digit, short lines are padded with
+    # nulls, which are stripped from the fields, so that they can be told apart
+    width = LINE.itemsize
+    body = ''.join(line.rstrip()[:width].ljust(width, '\0') for line in text.splitlines() if line[4:5].isdigit())
+    lines = np.frombuffer(body.encode(), dtype=LINE)
+    values = np.full(lines['values'].shape, np.nan)
+    filled = lines['values'] != b''
+    values[filled] = lines['values'][filled].astype(float)
+    return values, lines['row'].astype(int)
+
+
+def _rows(text):
+    """The rows (orbitals or hessian rows) of a group, each row spans the same number of lines"""
+    values, numbers = decode_group(text)
+    if not len(values):
+        return np.zeros((0, 0))
+    # Lines of the first row, the row number changes with every row
+    changes = np.flatnonzero(numbers != numbers[0])
+    nlines = changes[0] if len(changes) else len(values)
+    if len(values) % nlines:
+        raise ValueError(f'{len(values)} lines cannot be split into rows of {nlines} lines')
+    rows = values.reshape(-1, nlines*5)
+    # Only the last line of each row is short
+    return rows[:, ~np.isnan(rows[0])]
+
+
+def read_vec(dat_file):
+    """
+    The MO coefficients of the last $VEC group of a .dat file
+    Unrestricted calculations print the alpha orbitals followed by the beta orbitals
+    :return: (nbasis, norbitals) array with an orbital per column, None if there is no $VEC
+    """
+    text = read_group(dat_file, 'VEC')
+    if text is None:
+        return None
+    return _rows(text).T
+
+
+def read_hess(dat_file):
+    """
+    The hessian of the last $HESS group of a .dat file
+    :return: (3N, 3N) array in hartree/bohr**2, None if there is no $HESS
+    """
+    text = read_group(dat_file, 'HESS')
+    if text is None:
+        return None
+    return _rows(text)
+
+
+def encode_group(group, rows, header=''):
+    """
+    Write rows (orbitals or hessian rows) in the fixed-width format of a .dat group
+    :param group: name of the group, without the $
+    :param rows: 2D array
+    :param header: lines to put before the values (e.g. the energy line of a $HESS)
+    :return: text from $GROUP to $END
+    """
+    out = [f' ${group.upper()}\n' + header]
+    for i, row in enumerate(np.asarray(rows, dtype=float), start=1):
+        values = row.tolist()
+        for j in range(0, len(values), 5):
+            chunk = values[j:j + 5]
+            out.append(f'{i % 100:2d}{(j//5 + 1) % 1000:3d}' + ('%15.8E'*len(chunk)) % tuple(chunk) + '\n')
+    out.append(' $END')
+    return ''.join(out)
+
+
+def vec_group(coefficients):
+    """
+    The $VEC group of MO coefficients (see read_vec)
+    :param coefficients: (nbasis, norbitals) array with an orbital per column
+    """
+    return encode_group('VEC', np.asarray(coefficients).T)
+
+
 class Gamessifier():
     """Class for making Gamess input files"""
 
@@ -105,9 +206,6 @@ class Gamessifier():
         self.options_dict = {}
         self.vec = ''
         self.hess = ''
-        self.vec_re = re.compile("^ \$VEC.*?^ \$END", re.MULTILINE + re.DOTALL)
-        self.hess_re = re.compile("^ \$HESS.*?^ \$END",
-                                  re.MULTILINE + re.DOTALL)
 
     def read_mol(self, geom_file='geom.xyz'):
         """Reads a geometry file and generates a molecule"""
@@ -205,14 +303,9 @@ class Gamessifier():
             return
         if not os.path.isfile(dat_file):
             print("Couldn't find dat file: " + dat_file)
-        with open(dat_file) as f:
-            data = f.read()
-        vec_result = re.findall(self.vec_re, data)
-        hess_result = re.findall(self.hess_re, data)
-        if vec_result:
-            self.vec = vec_result[-1]
-        if hess_result:
-            self.hess = hess_result[-1]
+            return
+        self.vec = read_group(dat_file, 'VEC') or ''
+        self.hess = read_group(dat_file, 'HESS') or ''
 
     def read(self, geom_file='geom.xyz', basis_file='basis.gbs',
              ecp_file='ecp.dat',
@@ -1,36 +1,438 @@
 """Source for all Gaussian related functions"""
-import re
+import numpy as np
+
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import cached_property
 
 from .atom import Atom
+from .helper import join_lines, termination
+from .profiling import timed
+from .convergence import Convergence, Step
+from .sections import LazyOutput, Section, extract_sections, register
+from .trajectory import xyz_frames
+from .vibrations import Vibrations
+
+
+# Column labels of the Input, Standard and Z-Matrix orientation tables, the title is three lines above
+GEOMETRY = register('gaussian', 'geometry', Section(
+    ' Number     Number       Type             X           Y           Z\n', skip=1, end=' ' + '-'*69 + '\n',
+    row=lambda line: line.split()[1:2] + line.split()[3:6], units='angstrom'))
+CONVERGENCE = register('gaussian', 'convergence', Section(
+    '         Item               Value     Threshold  Converged?', rows=4,
+    row=lambda line: [' '.join(line[:22].split())] + line.split()[-3:-1]))
 
 
 def get_geom(lines, geom_type='xyz', units='angstrom'):
     """
-    Takes the lines of an orca output file and returns its last geometry in the
+    Takes the lines of a Gaussian output file and returns its last geometry in the
     specified format
     """
-    start = ''
-    end = ' ' + '-'*69 + '\n'
-    if geom_type == 'xyz' and units == 'angstrom':
-        start = ' Number     Number       Type             X           Y           Z\n'
-    else:
+    if geom_type != 'xyz' or units != 'angstrom':
         raise ValueError('Unsupported format or geom_type')
 
-    geom_start = -1
-    # Iterate backwards until the start of the last set of coordinates is found
-    for i in reversed(list(range(len(lines)))):
-        if start == lines[i]:
-            geom_start = i + 2
-            break
-    if geom_start == -1:
-        print("Could not find start of geometry")
+    geoms = extract_sections(lines, 'gaussian', ['geometry'], last=True)['geometry']
+    if not geoms:
+        print("Could not find geometry")
+        return ''
+
+    return [f'{Atom.atomic_number(an):<2s} {x} {y} {z}' for an, x, y, z in geoms[0]]
+
+
+@timed('parse')
+def get_trajectory(lines):
+    """
+    Gets the geometries of all steps in the standard orientation (the input
+    orientation if symmetry was turned off)
+    :return: atoms, (nsteps, natoms, 3) array of the coordinates in angstrom
+    """
+    return GaussianOutput.of(lines).trajectory
+
+
+def plot(lines, geom_type='xyz'):
+    """Plots the geometries from the optimization steps"""
+    atoms, trajectory = get_trajectory(lines)
+    return list(xyz_frames(atoms, trajectory))
+
+
+def check_convergence(lines):
+    """Returns all the geometry convergence results"""
+    output = GaussianOutput.of(lines)
+    return [''.join(output.lines[i:i + 6]) for i in output.index['convergence']]
+
+
+def template(geom='', jobtype='Opt', theory='B3LYP', basis='def2SVP', freq=False, other=''):
+    """Returns a template with the specified geometry and other variables"""
+    jobtype = 'Opt=Tight' if jobtype.lower() == 'opt' else jobtype
+    theory = theory.replace('-D3', ' EmpiricalDispersion=GD3')
+    freq = 'Freq' if freq is True else (freq or '')
+    return f"""%nprocshared=8
+%mem=8GB
+# {jobtype} {theory}/{basis} {freq} {other}
+
+Title
+
+0 1
+{geom}
+
+"""
+
+
+def get_freqs(lines):
+    """
+    Returns all the frequencies and geometries in xyz format
+    """
+    vibrations = get_vibrations(lines)
+    if vibrations is None:
         return ''
+    # Gaussian only prints the vibrations, not the translations and rotations
+    return vibrations.xyz(start=0)
+
+
+@timed('parse')
+def get_vibrations(lines):
+    """
+    Reads the last frequency calculation, using the high precision modes
+    when they were printed (freq=HPModes)
+    :param lines: lines of the output file (list or LazyLines)
+    :return: Vibrations, None if there are no frequencies
+    """
+    return GaussianOutput.of(lines).vibrations
+
 
-    geom = []
-    for line in lines[geom_start:]:
-        if line == end:
+def _parse_frequencies(lines, start):
+    """
+    Parse a block of frequencies starting at its header
+     Harmonic frequencies (cm**-1), IR intensities (KM/Mole), Raman scattering
+     ...
+     and normal coordinates:
+                          1                      2                      3
+                         A1                     A1                     B2
+     Frequencies --   1633.9457              3748.6584              3851.8034
+     Red. masses --      1.0827                 1.0451                 1.0818
+     Frc consts  --      1.7030                 8.6537                 9.4558
+     IR Inten    --     68.2484                 1.4318                18.2427
+      Atom  AN      X      Y      Z        X      Y      Z        X      Y      Z
+         1   8     0.00   0.00   0.07     0.00   0.00  -0.05     0.00   0.07   0.00
+         ...
+    The high precision block (freq=HPModes) has five modes per block and a row per cartesian coordinate
+           Frequencies ---  1633.9457 3748.6584 3851.8034
+        Reduced masses ---     1.0827    1.0451    1.0818
+       Force constants ---     1.7030    8.6537    9.4558
+        IR Intensities ---    68.2484    1.4318   18.2427
+      Coord Atom Element:
+        1     1     8          0.00000   0.00000   0.00000
+        2     1     8          0.00000   0.00000   0.07107
+        3     1     8          0.07061  -0.05135   0.00000
+        1     2     1 ...
+    Every block has the same layout, so the lines of each block are read at once
+    and its rows are split all at once.
+    :return: atomic numbers, {property: values}, (nmodes, 3N) array of the modes
+    """
+    i, n = start + 1, len(lines)
+    while i < n and ' Frequencies --' not in lines[i]:
+        i += 1
+    # Each block starts with the mode numbers and their irreps
+    i -= 2
+    numbers, properties, modes = [], OrderedDict(), []
+    nproperties = nrows = None
+    while i + 2 < n and ' Frequencies --' in lines[i + 2]:
+        if nrows is None:
+            # Properties, up to the labels of the displacements, then the rows
+            j = i + 2
+            while j < n and '--' in lines[j]:
+                j += 1
+            if j == n:
+                break
+            nproperties = j - i - 2
+            high_precision = lines[j].split()[:1] == ['Coord']
+            width = len(lines[j + 1].split()) if j + 1 < n else 0
+            nrows = 0
+            while j + 1 + nrows < n and len(lines[j + 1 + nrows].split()) == width:
+                nrows += 1
+        length = 3 + nproperties + nrows
+        if i + length > n:
             break
-        idx, an, a_type, x, y, z = line.split()
-        geom.append(f'{Atom.atomic_number(an):<2s} {x} {y} {z}')
+        for line in lines[i + 2:i + 2 + nproperties]:
+            label, values = line.split('--', 1)
+            properties.setdefault(label.strip(), []).extend(values.lstrip('-').split())
+        table = np.array(join_lines(lines, i + 3 + nproperties, i + length).split(), dtype=float).reshape(nrows, -1)
+        if high_precision:
+            numbers = table[::3, 2].astype(int).tolist()
+            modes.append(table[:, 3:].T)
+        else:
+            numbers = table[:, 1].astype(int).tolist()
+            ncols = (table.shape[1] - 2)//3
+            modes.append(table[:, 2:].reshape(nrows, ncols, 3).transpose(1, 0, 2).reshape(ncols, -1))
+        i += length
+    modes = np.concatenate(modes) if modes else np.zeros((0, 0))
+    return numbers, properties, modes
+
+
+def _float(value):
+    """Value of a field, nan if it overflowed (***)"""
+    return np.nan if '*' in value else float(value)
+
+
+def _values(values):
+    """Array of the values of fields (see _float)"""
+    return np.array([_float(value) for value in values])
+
+
+# energy_type: (starts of the lines, field holding the energy after splitting on '=')
+ENERGY_LINES = OrderedDict([
+    ('scf', ((' SCF Done:',), 1)),
+    # The MP4 and coupled cluster codes print the MP2 energy without spaces
+    ('mp2', ((' E2 =', ' E2='), 2)),
+    ('ccsd', ((' Wavefunction amplitudes converged. E(Corr)=',), 1)),
+    ('ccsd(t)', ((' CCSD(T)=',), 1)),
+    ('zpve', ((' Zero-point correction=',), 1)),
+    ('enthalpy', ((' Sum of electronic and thermal Enthalpies=',), 1)),
+    ('gibbs', ((' Sum of electronic and thermal Free Energies=',), 1)),
+])
+
+
+def _energy(line, field):
+    """Energy of a line as a string, Fortran exponents (D+02) are converted"""
+    return line.split('=')[field].split()[0].replace('D', 'E')
+
+
+@timed('parse')
+def get_all_energies(lines, energy_types=None):
+    """
+    Returns every occurrence of each energy type
+    :param energy_types: keys of ENERGY_LINES (defaults to all of them)
+    :return: {energy_type: array of the energies in order}
+    """
+    energies = GaussianOutput.of(lines).energies
+    if energy_types is None:
+        return dict(energies)
+    return {energy_type: energies.get(energy_type, np.zeros(0)) for energy_type in energy_types}
+
+
+@timed('parse')
+def get_energy(lines, energy_type='scf'):
+    """Returns the last calculated energy
+    WARNING: It returns as a string in order to prevent python from rounding"""
+    return GaussianOutput.of(lines).energy(energy_type)
+
+
+def get_energies(lines, energy_type='scf'):
+    """
+    Returns all of the calculated energies
+    """
+    return get_all_energies(lines, [energy_type])[energy_type].tolist()
+
+
+def get_charge(lines):
+    """
+    Returns the charge of the molecule in the computations
+    """
+    return GaussianOutput.of(lines).charge
+
+
+def get_multiplicity(lines):
+    """
+    Returns the multiplicity of the computation.
+    If no multiplicity can be found, it returns 0
+    """
+    return GaussianOutput.of(lines).multiplicity
+
+
+# Items of the convergence table and the keys of their Step parameters
+CONVERGENCE_ITEMS = OrderedDict([
+    ('RMS Force', 'rms_grad'),
+    ('Maximum Force', 'max_grad'),
+    ('RMS Displacement', 'rms_step'),
+    ('Maximum Displacement', 'max_step'),
+])
+
+
+@timed('parse')
+def convergence(output_file):
+    """
+    Reads the geometry convergence of every step
+             Item               Value     Threshold  Converged?
+     Maximum Force            0.000119     0.000450     YES
+     RMS     Force            0.000069     0.000300     YES
+     Maximum Displacement     0.000357     0.001800     YES
+     RMS     Displacement     0.000206     0.001200     YES
+    Gaussian has no criterion for the energy, the energy change is that of
+    the last SCF energy before each table
+    :param output_file: name of the output file, or its lines
+    """
+    return GaussianOutput.of(output_file).convergence
+
+
+def completed(lines):
+    """
+    Check if the output file shows successful completion
+    """
+    return GaussianOutput.of(lines).completed
+
+
+# Starts of the lines found by the GaussianOutput index
+SECTION_HEADERS = OrderedDict([
+    ('geometry', (GEOMETRY.start,)),
+    ('convergence', (CONVERGENCE.start,)),
+    ('charge', (' Charge = ',)),
+    ('optimization_completed', (' Optimization completed.',)),
+    ('optimization_stopped', (' Optimization stopped.',)),
+    ('frequencies', (' Harmonic frequencies (cm**-1)',)),
+] + [(energy_type, starts) for energy_type, (starts, field) in ENERGY_LINES.items()])
+
+
+class GaussianOutput(LazyOutput):
+    """
+    Lazily parsed Gaussian output, indexed by SECTION_HEADERS (see sections.LazyOutput)
+    :param output: name of the output file, or its lines (list or LazyLines)
+    """
+    HEADERS = SECTION_HEADERS
+
+    @cached_property
+    def _orientations(self):
+        """Line numbers of the column labels of the geometries used for the trajectory"""
+        starts = self.index['geometry']
+        standard = [i for i in starts if i >= 3 and 'Standard orientation' in self.lines[i - 3]]
+        if standard:
+            return standard
+        return [i for i in starts if i >= 3 and 'Input orientation' in self.lines[i - 3]]
+
+    @cached_property
+    def trajectory(self):
+        """atoms, (nsteps, natoms, 3) array of the coordinates (angstrom) of every step"""
+        starts = self._orientations
+        if not starts:
+            return [], np.zeros((0, 0, 3))
+        natoms = 0
+        while not GEOMETRY.is_end(self.lines[starts[0] + 2 + natoms]):
+            natoms += 1
+        rows = []
+        for step, start in enumerate(starts):
+            end = start + 2 + natoms
+            if end >= len(self.lines) or not GEOMETRY.is_end(self.lines[end]):
+                raise ValueError(f'Step {step} does not have {natoms} atoms')
+            rows.append(join_lines(self.lines, start + 2, end))
+
+        # Split all of the steps at once
+        geoms = np.array(''.join(rows).split(), dtype=float).reshape(len(starts), natoms, 6)
+        atoms = [Atom.atomic_number(str(int(an))) for an in geoms[0, :, 1]]
+        return atoms, geoms[:, :, 3:]
+
+    def _energy_strings(self, energy_type):
+        """All energies of a type (see ENERGY_LINES) as strings"""
+        if energy_type not in ENERGY_LINES:
+            return []
+        field = ENERGY_LINES[energy_type][1]
+        return [_energy(self.lines[i], field) for i in self.index[energy_type]]
+
+    @cached_property
+    def energies(self):
+        """{energy_type: array of every occurrence of the energy} for all ENERGY_LINES"""
+        return OrderedDict((energy_type, np.array(self._energy_strings(energy_type), dtype=float))
+                           for energy_type in ENERGY_LINES)
+
+    def energy(self, energy_type='scf'):
+        """The last energy of a type as a string (to prevent rounding), 0 if there is none"""
+        lines = self.last(energy_type) if energy_type in ENERGY_LINES else None
+        if lines is None:
+            return 0
+        return _energy(next(lines), ENERGY_LINES[energy_type][1])
+
+    @cached_property
+    def _charge_line(self):
+        """Last line with the charge and multiplicity, split, None if there is none"""
+        lines = self.last('charge')
+        return None if lines is None else next(lines).split()
+
+    @cached_property
+    def charge(self):
+        """Charge of the molecule, None if it cannot be found"""
+        return None if self._charge_line is None else int(self._charge_line[2])
+
+    @cached_property
+    def multiplicity(self):
+        """Multiplicity, 0 if it cannot be found"""
+        return 0 if self._charge_line is None else int(self._charge_line[5])
+
+    @cached_property
+    def convergence(self):
+        """Convergence of every optimization step (see convergence)"""
+        scf = self.index['scf']
+        steps, criteria, previous = [], [], np.nan
+        for start in self.index['convergence']:
+            rows = CONVERGENCE.read(self.lines, start)
+            if rows is None:
+                break
+            values = {item: (_float(value), float(threshold)) for item, value, threshold in rows}
+            # The SCF of the step is the last one before its table
+            i = bisect_left(scf, start) - 1
+            energy, scf_steps = np.nan, 0
+            if i >= 0:
+                line = self.lines[scf[i]]
+                energy = float(_energy(line, ENERGY_LINES['scf'][1]))
+                if 'cycles' in line:
+                    scf_steps = int(line.split()[-2])
+            params = OrderedDict([('delta_e', energy - previous)])
+            params.update((key, values[item][0]) for item, key in CONVERGENCE_ITEMS.items())
+            params['scf_steps'] = scf_steps
+            criteria = [np.nan] + [values[item][1] for item in CONVERGENCE_ITEMS]
+            steps.append(Step(params, criteria + [0]))
+            previous = energy
+
+        return Convergence(steps, criteria, program='gaussian')
+
+    @cached_property
+    def optimization_done(self):
+        """True if the last optimization converged, False if it stopped, None if there is none"""
+        done, stopped = self.index['optimization_completed'], self.index['optimization_stopped']
+        if not done and not stopped:
+            return None
+        return max(done, default=-1) > max(stopped, default=-1)
+
+    @cached_property
+    def vibrations(self):
+        """Vibrations of the last frequency calculation, None if there are none"""
+        starts = self.index['frequencies']
+        if not starts:
+            return None
+        # With HPModes the high precision block is printed right before the usual one
+        start = starts[-1]
+        if len(starts) > 1 and not self._high_precision(starts[-1]) and self._high_precision(starts[-2]):
+            start = starts[-2]
+        numbers, properties, modes = _parse_frequencies(self.lines, start)
+
+        # The modes are in the orientation of the last geometry before them
+        i = bisect_left(self._orientations, starts[-1]) - 1
+        atoms, trajectory = self.trajectory
+        geometry = trajectory[max(i, 0)] if len(trajectory) else np.zeros((len(numbers), 3))
+        atoms = [Atom.atomic_number(str(number)) for number in numbers]
+
+        intensities = properties.get('IR Inten', properties.get('IR Intensities'))
+        masses = properties.get('Red. masses', properties.get('Reduced masses'))
+        return Vibrations(atoms, geometry, _values(properties['Frequencies']), modes,
+                          None if intensities is None else _values(intensities),
+                          None if masses is None else _values(masses))
+
+    def _high_precision(self, start):
+        """The frequency block starting at start is a high precision (HPModes) block"""
+        for i in range(start + 1, min(start + 10, len(self.lines))):
+            if ' Frequencies --' in self.lines[i]:
+                return 'Frequencies ---' in self.lines[i]
+        return False
 
-    return geom
+    @cached_property
+    def completed(self):
+        """
+        The last link of the job terminated normally
+        Only the end of the file is read (see helper.termination), lines
+        without a file are searched backwards for the last termination.
+        """
+        if self.file_name is not None:
+            return termination(self.file_name, 'gaussian') == 'completed'
+        for line in reversed(self.lines):
+            if line[:31] == ' Normal termination of Gaussian':
+                return True
+            if line[:18] == ' Error termination':
+                return False
+        return False
@@ -0,0 +1,99 @@
+"""
+Reads the molecular orbitals of ORCA .gbw files without orca_2mkl
+Only the orbital section is decoded. The geometry and basis set sections of
+the format are not documented and are not read, so molden files (e.g. for
+orbs.draw) still have to be written with orca_2mkl.
+"""
+import os
+import numpy as np
+
+from .compression import compression, open_file
+
+# Byte offset of the pointer (int64) to the orbital section, the last of the header
+ORBITALS_POINTER = 24
+HEADER_SIZE = ORBITALS_POINTER + 8
+
+
+def is_gbw(file_name):
+    """The file is an ORCA .gbw file, possibly compressed (judged by its extension)"""
+    base, extension = os.path.splitext(file_name)
+    if extension in ['.gz', '.bz2', '.xz']:
+        base, extension = os.path.splitext(base)
+    return extension == '.gbw'
+
+
+class GBW:
+    """
+    Molecular orbitals of an ORCA .gbw file
+    The orbital section holds the number of operators (1 when restricted, 2
+    when unrestricted) and of basis functions (int32), then for each operator
+    the coefficients, occupations and energies (float64), and the irreps and
+    core flags (int32) of the orbitals.
+    All arrays are views of a memory map of the file, so the coefficients are
+    only read from disk when they are used. Files that do not fit this layout
+    (a pointer into the header, a section past the end of the file or
+    occupations outside of [0, 2]) raise a ValueError rather than returning
+    garbage.
+    :param file_name: .gbw file (compressed files are read into memory)
+    """
+    def __init__(self, file_name):
+        self.file_name = file_name
+        if compression(file_name):
+            with open_file(file_name, 'rb') as f:
+                self._data = np.frombuffer(f.read(), dtype=np.uint8)
+        else:
+            self._data = np.memmap(file_name, dtype=np.uint8, mode='r')
+
+        offset = int(self._array(ORBITALS_POINTER, '<i8', 1)[0])
+        if offset < HEADER_SIZE:
+            raise ValueError(f'{file_name} is not an ORCA .gbw file')
+        self.noperators, self.nbasis = map(int, self._array(offset, '<i4', 2))
+        if self.noperators not in [1, 2] or self.nbasis < 1:
+            raise ValueError(f'{file_name} is not an ORCA .gbw file')
+        offset += 8
+
+        n = self.nbasis
+        self.coefficients, self.occupations, self.energies, self.irreps, self.cores = [], [], [], [], []
+        for _ in range(self.noperators):
+            # Each orbital is stored contiguously, the transpose has an orbital per column
+            self.coefficients.append(self._array(offset, '<f8', n*n).reshape(n, n).T)
+            offset += 8*n*n
+            for arrays, dtype in [(self.occupations, '<f8'), (self.energies, '<f8'),
+                                  (self.irreps, '<i4'), (self.cores, '<i4')]:
+                arrays.append(self._array(offset, dtype, n))
+                offset += np.dtype(dtype).itemsize*n
+            if not ((self.occupations[-1] >= 0) & (self.occupations[-1] <= 2)).all():
+                raise ValueError(f'{file_name} is not an ORCA .gbw file (invalid occupations)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Release the memory map (arrays that are still referenced keep it open)"""
+        self._data = None
+        self.coefficients, self.occupations, self.energies, self.irreps, self.cores = [], [], [], [], []
+
+    def _array(self, offset, dtype, count):
+        """View of count items of dtype starting at the byte offset"""
+        end = offset + np.dtype(dtype).itemsize*count
+        if offset < 0 or end > len(self._data):
+            raise ValueError(f'{self.file_name} is not an ORCA .gbw file (truncated)')
+        return self._data[offset:end].view(dtype)
+
+    @property
+    def restricted(self):
+        """Both spins share the same orbitals"""
+        return self.noperators == 1
+
+    @property
+    def homos(self):
+        """Index of the highest occupied orbital of each operator"""
+        return np.array([np.flatnonzero(occupations > 0)[-1] if occupations.any() else -1
+                         for occupations in self.occupations])
+
+    def mo(self, i, operator=0):
+        """Coefficients of an orbital (in the order of the basis functions)"""
+        return self.coefficients[operator][:, i]
@@ -1,6 +1,16 @@
 """A repository for various helper functions"""
+import os
+import re
+import mmap
+import hashlib
+import sqlite3
 import numpy as np
 
+from collections.abc import Sequence
+
+from .compression import compression_of, open_file, open_index
+from .profiling import phase, timed
+
 BOHR_TO_ANGSTROM = 0.52917721067
 
 
@@ -8,77 +18,719 @@ def read(file_name):
     """
     Reads the given file and returns its lines and the type of program that uses
     it
+    The lines are a LazyLines object, so nothing is decoded until it is used
     """
-    with open(file_name, 'r') as f:
-        lines = f.readlines()
+    with phase('read'):
+        lines = LazyLines(file_name)
     program = check_program(file_name)
 
     return lines, program
 
 
-def check_program(file_name):
+class LazyLines(Sequence):
+    """
+    Read-only, list-like access to the lines of a file backed by mmap
+
+    Lines are returned as strings that keep their newline, exactly as with
+    readlines(). Iteration streams through the file, the offsets of the lines
+    are only indexed when len() or indexing is first used.
+    Compressed files are read through a seekable index instead (see
+    compression.open_index).
+    :param file_name: file to read
+    :param encoding: encoding used to decode each line
+    """
+    # Number of bytes searched for newlines at once when building the index
+    chunk_size = 2**24
+
+    def __init__(self, file_name, encoding='utf-8'):
+        self.file_name = file_name
+        self.encoding = encoding
+        self._offsets = None
+        self._map = b''
+        # Lazily parsed outputs of the lines by class (see sections.LazyOutput.of)
+        self.outputs = {}
+        self._index = open_index(file_name)
+        if self._index is None:
+            with open(file_name, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                # Empty files cannot be mapped
+                if size:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def size(self):
+        """Size of the (decompressed) file in bytes"""
+        if self._index is not None:
+            return self._index.size
+        return len(self._map)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        offsets = self.offsets
+        if isinstance(i, slice):
+            return [self._line(offsets[j], offsets[j + 1]) for j in range(*i.indices(len(offsets) - 1))]
+        if i < 0:
+            i += len(offsets) - 1
+        if not 0 <= i < len(offsets) - 1:
+            raise IndexError('LazyLines index out of range')
+        return self._line(offsets[i], offsets[i + 1])
+
+    def __iter__(self):
+        if self._index is not None:
+            with open_file(self.file_name, 'rb') as f:
+                for line in f:
+                    yield self._decode(line)
+            return
+        yield from self._iter(0)
+
+    def __reversed__(self):
+        if self._offsets is not None:
+            offsets = self._offsets
+            for i in range(len(offsets) - 2, -1, -1):
+                yield self._line(offsets[i], offsets[i + 1])
+        else:
+            # Avoid indexing the whole file, only the tail that is used is read
+            for line in reverse_blocks(self._read, self.size):
+                yield self._decode(line)
+
+    def tail(self, line):
+        """
+        The last line equal to line and all lines after it, None if it is not found
+        Found with a single byte search of the memory map instead of decoding
+        the lines one at a time (see helper.tail)
+        :param line: the full line to find, including the newline
+        """
+        if self._index is not None or line[-1:] != '\n':
+            return _collect_tail(reversed(self), line)
+        target = line.encode(self.encoding)
+        start = self._map.rfind(b'\n' + target) + 1
+        if not start and self._map[:len(target)] != target:
+            if self._map.find(target[:-1] + b'\r\n') != -1:
+                # Only present with \r\n newlines, which the generic search normalizes
+                return _collect_tail(reversed(self), line)
+            return None
+        text = self._map[start:].decode(self.encoding, errors='replace')
+        return text.replace('\r\n', '\n').splitlines(True)
+
+    def iter_tail(self, starts, indented=False):
+        """
+        Iterator over the last line beginning with any of the starts and all
+        lines after it, None if there is none (see helper.iter_tail)
+        Found with a byte search of the memory map for each start, the lines
+        after it are only decoded as they are used
+        :param starts: start of the line, or a tuple of starts
+        :param indented: the starts may be preceded by any indentation
+        """
+        starts = (starts,) if isinstance(starts, str) else tuple(starts)
+        # Starts ending in a newline would not match \r\n lines in the bytes
+        if self._index is not None or self._map.find(b'\r\n', 0, 2**16) != -1:
+            found = _collect_tail(reversed(self), _line_matcher(starts, indented))
+            return None if found is None else iter(found)
+        positions = [self._rfind_line(start.encode(self.encoding), indented) for start in starts]
+        pos = max(positions)
+        return self._iter(pos) if pos != -1 else None
+
+    def text(self, start, stop):
+        """
+        Lines start to stop (exclusive) as one string, read and decoded at once
+        instead of one line at a time (see helper.join_lines)
+        """
+        offsets = self.offsets
+        start, stop, _ = slice(start, stop).indices(len(offsets) - 1)
+        if start >= stop:
+            return ''
+        return self._read(offsets[start], offsets[stop]).decode(self.encoding, errors='replace').replace('\r\n', '\n')
+
+    def find_lines(self, prefixes, indented=()):
+        """
+        Line numbers of all lines starting with each prefix (see helper.find_lines)
+        Found with a single regex search of the memory map, only the matching
+        lines are ever decoded
+        :param prefixes: strings that lines start with
+        :param indented: strings that lines start with after any indentation
+        """
+        # Prefixes ending in a newline would not match \r\n lines in the bytes
+        if self._index is not None or not (prefixes or indented) or self._map.find(b'\r\n', 0, 2**16) != -1:
+            return _find_lines(self, prefixes, indented)
+        groups = {'exact': {prefix.encode(self.encoding): prefix for prefix in prefixes},
+                  'indented': {prefix.encode(self.encoding): prefix for prefix in indented}}
+        # Longest first so that a line is only assigned to the longest prefix it starts with
+        branches = [(b'[ \t]*' if name == 'indented' else b'') + b'(?P<' + name.encode() + b'>'
+                    + b'|'.join(re.escape(target) for target in sorted(targets, key=len, reverse=True)) + b')'
+                    for name, targets in groups.items() if targets]
+        # A lookahead only consumes the newline, so consecutive matching lines are all found
+        pattern = re.compile(b'\n(?=' + b'|'.join(branches) + b')')
+
+        found = {prefix: [] for prefix in list(prefixes) + list(indented)}
+        # The first line is not preceded by a newline
+        match = pattern.match(b'\n' + self._map[:self._map.find(b'\n') + 1 or len(self._map)])
+        if match:
+            found[groups[match.lastgroup][match.group(match.lastgroup)]].append(0)
+        positions = {prefix: [] for prefix in found}
+        for match in pattern.finditer(self._map):
+            positions[groups[match.lastgroup][match.group(match.lastgroup)]].append(match.start() + 1)
+        for prefix, starts in positions.items():
+            if starts:
+                found[prefix] += np.searchsorted(self.offsets, starts).tolist()
+        return found
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Release the memory map"""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        if self._index is not None:
+            self._index.close()
+
+    @property
+    def offsets(self):
+        """
+        Byte offsets of the start of every line, followed by the size of the file
+        Built in chunks with numpy, so only the index (8 bytes per line) is held
+        """
+        if self._offsets is None:
+            starts = [np.zeros(1, dtype=np.int64)]
+            for pos in range(0, self.size, self.chunk_size):
+                count = min(self.chunk_size, self.size - pos)
+                if self._index is not None:
+                    chunk = np.frombuffer(self._read(pos, pos + count), dtype=np.uint8)
+                else:
+                    chunk = np.frombuffer(self._map, dtype=np.uint8, count=count, offset=pos)
+                starts.append(np.flatnonzero(chunk == 10) + (pos + 1))
+                del chunk
+            offsets = np.concatenate(starts)
+            # The last line does not end in a newline
+            if offsets[-1] != self.size:
+                offsets = np.append(offsets, self.size)
+            self._offsets = offsets
+        return self._offsets
+
+    def _rfind_line(self, target, indented=False):
+        """Byte offset of the last line beginning with target (after any indentation), -1 if there is none"""
+        if not indented:
+            pos = self._map.rfind(b'\n' + target) + 1
+            return pos if pos or self._map[:len(target)] == target else -1
+        end = len(self._map)
+        while True:
+            pos = self._map.rfind(target, 0, end)
+            if pos == -1:
+                return -1
+            start = self._map.rfind(b'\n', 0, pos) + 1
+            if not self._map[start:pos].strip(b' \t'):
+                return start
+            # Only look before this match
+            end = pos + len(target) - 1
+
+    def _iter(self, pos):
+        """Yield the lines of the memory map from the byte offset pos onwards"""
+        size = self.size
+        while pos < size:
+            end = self._map.find(b'\n', pos) + 1 or size
+            yield self._line(pos, end)
+            pos = end
+
+    def _read(self, start, end):
+        """Bytes between the given offsets"""
+        if self._index is not None:
+            return self._index.read(start, end)
+        return self._map[start:end]
+
+    def _line(self, start, end):
+        """Decode the line between the given byte offsets"""
+        return self._decode(self._read(start, end))
+
+    def _decode(self, raw):
+        """Decode a line of bytes, normalizing the newline"""
+        line = raw.decode(self.encoding, errors='replace')
+        if line[-2:] == '\r\n':
+            line = line[:-2] + '\n'
+        return line
+
+
+def reverse_blocks(read, size, chunk_size=2**16):
+    """
+    Yields the lines (as bytes, including newlines) of a buffer from last to first
+    Scans backwards from the end in fixed-size chunks, so finding something near
+    the end of a file only costs the size of the tail
+    :param read: function that takes (start, end) and returns those bytes
+    :param size: total number of bytes
+    :param chunk_size: number of bytes read at a time
+    """
+    end = size
+    # Bytes at the start of the previous chunk whose line begins in an earlier chunk
+    rest = b''
+    while end > 0:
+        start = max(0, end - chunk_size)
+        buffer = read(start, end) + rest
+        end = start
+        if start > 0:
+            first = buffer.find(b'\n') + 1
+            if not first:
+                rest = buffer
+                continue
+            rest, buffer = buffer[:first], buffer[first:]
+        pieces = buffer.split(b'\n')
+        last = pieces.pop()
+        if last:
+            yield last
+        for piece in reversed(pieces):
+            yield piece + b'\n'
+
+
+def reverse_readlines(file_name, chunk_size=2**16, encoding='utf-8'):
+    """
+    Yields the lines of a file from last to first without reading the whole file
+    :param file_name: file to read (may be compressed)
+    :param chunk_size: number of bytes read at a time
+    :param encoding: encoding used to decode each line
+    """
+    index = open_index(file_name)
+    if index is not None:
+        with index:
+            for line in reverse_blocks(index.read, index.size, chunk_size):
+                line = line.decode(encoding, errors='replace')
+                if line[-2:] == '\r\n':
+                    line = line[:-2] + '\n'
+                yield line
+        return
+
+    with open(file_name, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+
+        def read_chunk(start, end):
+            f.seek(start)
+            return f.read(end - start)
+
+        for line in reverse_blocks(read_chunk, size, chunk_size):
+            line = line.decode(encoding, errors='replace')
+            if line[-2:] == '\r\n':
+                line = line[:-2] + '\n'
+            yield line
+
+
+def tail(lines, start):
+    """
+    Finds the last line matching start and returns it and all lines after it
+    Searches backwards, so only the tail of a LazyLines (or file) is ever read
+    :param lines: list of lines, LazyLines, or anything supporting reversed()
+    :param start: line to find, or a function that returns True for it
+    :return: list of lines beginning with the match, None if it is not found
+    """
+    if isinstance(lines, LazyLines) and isinstance(start, str):
+        return lines.tail(start)
+    return _collect_tail(reversed(lines), start)
+
+
+def iter_tail(lines, starts, indented=False):
+    """
+    Iterator over the last line beginning with start and all lines after it
+    Unlike tail, start only needs to begin the line and the lines after the
+    match are only read from a LazyLines as they are used
+    :param lines: list of lines, LazyLines, or anything supporting reversed()
+    :param starts: start of the line to find, or a tuple of starts
+    :param indented: the start may be preceded by any indentation (spaces and tabs)
+    :return: iterator beginning with the match, None if it is not found
+    """
+    if isinstance(lines, LazyLines):
+        return lines.iter_tail(starts, indented)
+    starts = (starts,) if isinstance(starts, str) else tuple(starts)
+    found = _collect_tail(reversed(lines), _line_matcher(starts, indented))
+    return None if found is None else iter(found)
+
+
+def _line_matcher(starts, indented=False):
+    """Function that returns True for lines beginning with any of the starts (after any indentation)"""
+    if indented:
+        return lambda line: line.lstrip(' \t').startswith(starts)
+    return lambda line: line.startswith(starts)
+
+
+def find_lines(lines, prefixes, indented=()):
+    """
+    Finds the line numbers of all lines starting with each of the prefixes in a
+    single pass, a line only counts for the longest prefix it starts with
+    :param lines: list of lines or LazyLines
+    :param prefixes: strings that lines start with
+    :param indented: strings that lines start with after any indentation (spaces and tabs),
+                     for headers whose indentation differs between versions of a program
+    :return: {prefix: [line numbers]}
+    """
+    if isinstance(lines, LazyLines):
+        return lines.find_lines(prefixes, indented)
+    return _find_lines(lines, prefixes, indented)
+
+
+def join_lines(lines, start, stop):
+    """
+    Lines start to stop (exclusive) as one string
+    :param lines: list of lines or LazyLines
+    """
+    if isinstance(lines, LazyLines):
+        return lines.text(start, stop)
+    return ''.join(lines[start:stop])
+
+
+def _find_lines(lines, prefixes, indented=()):
+    """Python version of find_lines, dispatching on the start of each line"""
+    found = {prefix: [] for prefix in list(prefixes) + list(indented)}
+    if not found:
+        return found
+    dispatches = []
+    for candidates, strip in [(prefixes, False), (indented, True)]:
+        if candidates:
+            length = min(map(len, candidates))
+            dispatch = {}
+            for prefix in sorted(candidates, key=len, reverse=True):
+                dispatch.setdefault(prefix[:length], []).append(prefix)
+            dispatches.append((length, dispatch, strip))
+    for i, line in enumerate(lines):
+        for length, dispatch, strip in dispatches:
+            text = line.lstrip(' \t') if strip else line
+            candidates = dispatch.get(text[:length])
+            if candidates:
+                prefix = _first_prefix(text, candidates)
+                if prefix is not None:
+                    found[prefix].append(i)
+                    break
+    return found
+
+
+def _first_prefix(line, prefixes):
+    """The first of the prefixes that the line starts with, None if there is none"""
+    for prefix in prefixes:
+        if line.startswith(prefix):
+            return prefix
+    return None
+
+
+def read_tail(file_name, start, chunk_size=2**16):
+    """
+    Reads the lines of a file from the last line matching start onwards
+    :param file_name: file to read
+    :param start: line to find, or a function that returns True for it
+    :param chunk_size: number of bytes read at a time
+    :return: list of lines beginning with the match, None if it is not found
+    """
+    return _collect_tail(reverse_readlines(file_name, chunk_size), start)
+
+
+def _collect_tail(reversed_lines, start):
+    """Collect lines from an iterator running backwards until start is matched"""
+    match = start if callable(start) else start.__eq__
+    found = []
+    for line in reversed_lines:
+        found.append(line)
+        if match(line):
+            found.reverse()
+            return found
+    return None
+
+
+# Banners (a full line, ignoring surrounding whitespace) that identify the program that wrote an output
+PROGRAM_SIGNATURES = {
+    '* O   R   C   A *': 'orca',
+    'Welcome to Q-Chem': 'qchem',
+    'PSI4: An Open-Source Ab Initio Electronic Structure Package': 'psi4',
+    'Psi4: An Open-Source Ab Initio Electronic Structure Package': 'psi4',
+    'Northwest Computational Chemistry Package (NWChem)': 'nwchem',
+    '#ZMATRIX': 'zmatrix',
+    '* CFOUR Coupled-Cluster techniques for Computational Chemistry *': 'cfour',
+    '***  PROGRAM SYSTEM MOLPRO  ***': 'molpro',  # Printed after input file
+    "----- GAMESS execution script 'rungms' -----": 'gamess',
+    'N A T U R A L   A T O M I C   O R B I T A L   A N D': 'nbo',
+    'Entering Gaussian System, Link 0=g09': 'gaussian',
+    'Entering Gaussian System, Link 0=g16': 'gaussian',
+    'BAGEL - Freshly leavened quantum chemistry': 'bagel',
+}
+# Regexes for the start of a line that identify the program that reads an input
+# file, the first line that matches any of them decides (earlier entries win ties)
+INPUT_SIGNATURES = [
+    (r'\A\*\*\*,', 'molpro'),
+    (r'\A% pal nprocs ', 'orca'),
+    (r'^\$NBO', 'nbo'),
+    (r'^\$', 'qchem'),
+    (r'^\*CFOUR\(', 'cfour'),
+    (r'^\* (?:xyz|int)', 'orca'),
+    (r'^ \$', 'gamess'),
+    (r'^(?:molecule|set )', 'psi4'),
+]
+# Only this many lines (and bytes) at the start of an output are searched for a banner
+DETECTION_LINES = 200
+DETECTION_BYTES = 2**16
+
+_matchers = {}
+# {(kind, absolute path): (key, program)} of files that were already detected
+_program_memo = {}
+_memo_db = (None, None)
+
+
+def register_program(signature, program, input_file=False):
+    """
+    Register a new signature for program detection
+    :param signature: banner line of an output file, or a regex matching the
+        start of a line of an input file if input_file
+    :param program: name of the program (i.e. the qgrep module)
+    :param input_file: register a signature for find_input_program
+    """
+    if input_file:
+        INPUT_SIGNATURES.append((signature, program))
+    else:
+        PROGRAM_SIGNATURES[signature] = program
+    _matchers.clear()
+    _program_memo.clear()
+
+
+def _matcher(kind):
+    """
+    A single compiled regex matching all signatures of a kind at once
+    The program is found from the name of the group that matched
+    :return: regex, programs of its groups, fingerprint of the signatures
+    """
+    if kind not in _matchers:
+        if kind == 'output':
+            banners = '|'.join(f'(?P<s{i}>{re.escape(banner)})' for i, banner in enumerate(PROGRAM_SIGNATURES))
+            pattern = rf'^[ \t]*(?:{banners})[ \t]*\r?$'
+            programs = list(PROGRAM_SIGNATURES.values())
+        else:
+            pattern = '|'.join(f'(?P<s{i}>{regex})' for i, (regex, program) in enumerate(INPUT_SIGNATURES))
+            programs = [program for regex, program in INPUT_SIGNATURES]
+        fingerprint = hashlib.sha1(f'{pattern}{programs}'.encode()).hexdigest()[:8]
+        _matchers[kind] = (re.compile(pattern.encode(), re.MULTILINE), programs, fingerprint)
+    return _matchers[kind]
+
+
+def _detect(data, kind, max_lines=None):
+    """
+    Find the program of the first matching signature in data (bytes)
+    :param max_lines: only accept matches in this many lines
+    """
+    regex, programs, fingerprint = _matcher(kind)
+    match = regex.search(data)
+    if match is None or (max_lines is not None and data.count(b'\n', 0, match.start()) >= max_lines):
+        return None
+    return programs[int(match.lastgroup[1:])]
+
+
+def _memoized(file_name, kind, detect, use_cache=True):
+    """
+    Run detect(file_name), remembering the result for as long as the file is unchanged
+    Results are kept in memory and in the cache directory, keyed on the path,
+    inode, size and mtime of the file and the registered signatures
+    """
+    stat = os.stat(file_name)
+    key = f'{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}:{_matcher(kind)[2]}'
+    path = os.path.abspath(file_name)
+    memo = _program_memo.get((kind, path))
+    if use_cache and memo and memo[0] == key:
+        return memo[1]
+
+    db = _program_db() if use_cache else None
+    program = None
+    found = False
+    if db:
+        try:
+            row = db.execute('SELECT key, program FROM programs WHERE path = ? AND kind = ?', (path, kind)).fetchone()
+            if row and row[0] == key:
+                program, found = row[1], True
+        except sqlite3.Error:
+            pass
+    if not found:
+        program = detect(file_name)
+        if db:
+            try:
+                with db:
+                    db.execute('INSERT OR REPLACE INTO programs VALUES (?, ?, ?, ?)', (path, kind, key, program))
+            except sqlite3.Error:
+                # The memo is only an optimization (e.g. the database may be locked)
+                pass
+    _program_memo[(kind, path)] = (key, program)
+    return program
+
+
+def _program_db():
+    """Connection to the on-disk detection memo (one per process), None if the cache is disabled"""
+    global _memo_db
+    from . import cache
+
+    if not cache.ENABLED:
+        return None
+    db_file = os.path.join(cache.CACHE_DIR, 'programs.sqlite')
+    owner, connection = _memo_db
+    # Connections cannot be shared with forked processes
+    if owner != (os.getpid(), db_file):
+        try:
+            os.makedirs(cache.CACHE_DIR, exist_ok=True)
+            connection = sqlite3.connect(db_file, timeout=1)
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute('CREATE TABLE IF NOT EXISTS programs '
+                               '(path TEXT, kind TEXT, key TEXT, program TEXT, PRIMARY KEY (path, kind))')
+        except (OSError, sqlite3.Error):
+            connection = None
+        _memo_db = ((os.getpid(), db_file), connection)
+    return connection
+
+
+@timed('detect')
+def check_program(file_name, use_cache=True):
     """
     Takes the name of an output file and determines what program wrote (or
     reads) them
+    Only the first DETECTION_LINES lines (at most DETECTION_BYTES) are searched
+    for a banner in PROGRAM_SIGNATURES (see register_program)
     :param file_name: name of the output file
+    :param use_cache: reuse the result of an earlier call if the file is unchanged
     :return: string of the program or None
     """
-    programs = {
-        '* O   R   C   A *': 'orca',
-        'Welcome to Q-Chem': 'qchem',
-        'PSI4: An Open-Source Ab Initio Electronic Structure Package': 'psi4',
-        'Psi4: An Open-Source Ab Initio Electronic Structure Package': 'psi4',
-        'Northwest Computational Chemistry Package (NWChem)': 'nwchem',
-        '#ZMATRIX': 'zmatrix',
-        '* CFOUR Coupled-Cluster techniques for Computational Chemistry *': 'cfour',
-        '***  PROGRAM SYSTEM MOLPRO  ***': 'molpro',
-        "----- GAMESS execution script 'rungms' -----": 'gamess',
-        'N A T U R A L   A T O M I C   O R B I T A L   A N D': 'nbo',
-        'Entering Gaussian System, Link 0=g09': 'gaussian',
-        '***  PROGRAM SYSTEM MOLPRO  ***': 'molpro',  # Printed after input file
-        'BAGEL - Freshly leavened quantum chemistry': 'bagel',
-    }
+    return _memoized(file_name, 'output', _check_program, use_cache)
 
-    program = None
-    with open(file_name) as f:
-        for i in range(200):
-            line = f.readline().strip()
-            if line in programs:
-                program = programs[line]
-                break
 
-    return program
+def _check_program(file_name):
+    with open(file_name, 'rb') as f:
+        data = f.read(DETECTION_BYTES)
+    if compression_of(data):
+        with open_file(file_name, 'rb') as f:
+            data = f.read(DETECTION_BYTES)
+    return _detect(data, 'output', DETECTION_LINES)
 
 
-def find_input_program(in_file):
+@timed('detect')
+def find_input_program(in_file, use_cache=True):
     """
-    Find the type of input file based on unique identifiers
+    Find the type of input file based on unique identifiers (see INPUT_SIGNATURES)
 
     :param: in_file: file name string
+    :param use_cache: reuse the result of an earlier call if the file is unchanged
     :return: string of the program or None
     """
-    with open(in_file) as f:
-        lines = f.readlines()
-
-    if '***,' == lines[0][:4]:
-        return 'molpro'
-    elif '% pal nprocs ' == lines[0][:13]:
-        return 'orca'
-
-    for line in lines:
-        if '$NBO' == line[:4]:
-            return 'nbo'
-        if '$' == line[0]:
-            return 'qchem'
-        elif '*CFOUR(' == line[:7]:
-            return 'cfour'
-        elif '* xyz' == line[:5] or '* int' == line[:5]:
-            return 'orca'
-        elif ' $' == line[:2]:
-            return 'gamess'
-        elif 'molecule' == line[:8] or 'set ' == line[:4]:
-            return 'psi4'
-    return None
+    return _memoized(in_file, 'input', _find_input_program, use_cache)
+
+
+def _find_input_program(in_file):
+    with open_file(in_file, 'rb') as f:
+        data = f.read(DETECTION_BYTES)
+        program = _detect(data, 'input')
+        if program is None and len(data) == DETECTION_BYTES:
+            # Long input, search the rest of the file
+            program = _detect(data + f.read(), 'input')
+    return program
+
+
+# Regexes (bytes, matched per line) of how each program ends its output and the
+# status they mean, the last one found in the tail of an output decides
+TERMINATION_SIGNATURES = {
+    'orca': [
+        (rb'^TOTAL RUN TIME', 'completed'),
+        (rb'ORCA TERMINATED NORMALLY', 'completed'),
+        (rb'ORCA finished by error termination', 'failed'),
+        (rb'aborting the run', 'failed'),
+    ],
+    'psi4': [
+        (rb'^\*\*\* (?:PSI4|Psi4) exiting successfully', 'completed'),
+        (rb'(?:PSI4|Psi4) encountered an error', 'failed'),
+        (rb'^Traceback \(most recent call last\)', 'failed'),
+    ],
+    'qchem': [
+        (rb'Thank you very much for using Q-Chem', 'completed'),
+        (rb'Q-Chem fatal error', 'failed'),
+    ],
+    'cfour': [
+        # Every module reports its exit status, a job is only done once no module follows
+        (rb'--executable \w+ finished with status\s+0\b', 'completed'),
+        (rb'--executable \w+ finished with status\s+-?[1-9]', 'failed'),
+        (rb'--invoking executable', 'running'),
+        (rb'ERROR ERROR', 'failed'),
+    ],
+    'gamess': [
+        (rb'EXECUTION OF GAMESS TERMINATED NORMALLY', 'completed'),
+        (rb'EXECUTION OF GAMESS TERMINATED -ABNORMALLY-', 'failed'),
+        (rb'ddikick\.x: application process \d+ quit unexpectedly', 'failed'),
+    ],
+    'molpro': [
+        (rb'Molpro calculation terminated', 'completed'),
+        (rb'^ \? Error', 'failed'),
+        (rb'GLOBAL ERROR', 'failed'),
+    ],
+    'gaussian': [
+        (rb'^ Normal termination of Gaussian', 'completed'),
+        (rb'^ Error termination', 'failed'),
+    ],
+    'nwchem': [
+        (rb'^ Total times  cpu:', 'completed'),
+    ],
+    'bagel': [
+        # Only a successful run ends with the closing bar of the footer
+        (rb'^  ={40,}\s*\Z', 'completed'),
+        (rb'ERROR: EXCEPTION RAISED', 'failed'),
+    ],
+}
+# Number of bytes at the end of an output searched for a termination signature
+TERMINATION_BYTES = 2**15
+
+_termination_regexes = {}
+
+
+def _termination_regex(program):
+    """A single regex with a group per signature of the program, None if it has none"""
+    if program not in _termination_regexes:
+        signatures = TERMINATION_SIGNATURES.get(program)
+        _termination_regexes[program] = None if signatures is None else re.compile(
+            b'|'.join(b'(' + regex + b')' for regex, status in signatures), re.MULTILINE)
+    return _termination_regexes[program]
+
+
+def read_end(file_name, size):
+    """
+    The last size bytes of a (possibly compressed) file
+    Only the end of the file is read, from an index for compressed files
+    """
+    index = open_index(file_name)
+    if index is not None:
+        try:
+            return index.read(max(0, index.size - size), index.size)
+        finally:
+            index.close()
+    with open(file_name, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - size))
+        return f.read()
+
+
+@timed('detect')
+def termination(file_name, program=None, size=TERMINATION_BYTES):
+    """
+    Determines how an output ended by searching only its last few KB for the
+    signatures in TERMINATION_SIGNATURES
+    :param file_name: output file
+    :param program: program that wrote the output (detected if not given)
+    :param size: number of bytes at the end of the file to search
+    :return: 'completed', 'failed' or 'running' (no termination was found, the
+        job may also have been killed), None if the program is not supported
+    """
+    if program is None:
+        program = check_program(file_name)
+    regex = _termination_regex(program)
+    if regex is None:
+        return None
+    status = 'running'
+    for match in regex.finditer(read_end(file_name, size)):
+        status = TERMINATION_SIGNATURES[program][match.lastindex - 1][1]
+    return status
+
+
+def is_completed(file_name, program=None):
+    """
+    The output shows successful completion (see termination)
+    :param file_name: output file
+    :param program: program that wrote the output (detected if not given)
+    """
+    return termination(file_name, program) == 'completed'
 
 
 # Values from NIST
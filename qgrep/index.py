@@ -0,0 +1,187 @@
+"""Persistent SQLite index of the output files in a directory tree"""
+import os
+import sqlite3
+
+from fnmatch import fnmatch
+
+from .batch import batch_map
+from .extraction import extract
+from .helper import check_program, termination
+
+# Name of the index database, placed in the root of the indexed tree
+INDEX_NAME = '.qgrep_index.sqlite'
+# Output files that are indexed by default (compressed outputs are also matched)
+PATTERNS = ['output.dat', '*.out', '*.log']
+COMPRESSED_EXTENSIONS = ['', '.gz', '.bz2', '.xz']
+
+COLUMNS = ['path', 'program', 'completed', 'energy', 'natom', 'charge', 'mult', 'steps', 'mtime', 'size']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outputs (
+    path TEXT PRIMARY KEY,
+    program TEXT,
+    completed INTEGER,
+    energy REAL,
+    natom INTEGER,
+    charge INTEGER,
+    mult INTEGER,
+    steps INTEGER,
+    mtime INTEGER,
+    size INTEGER
+)
+'''
+
+
+def summarize(file_name, use_cache=True):
+    """
+    Summarize an output file for the index
+    :param file_name: output file
+    :param use_cache: use the parse cache for fields that need cclib
+    :return: dictionary with the program, completed, energy (in hartree),
+        natom, charge, mult and steps (number of geometries)
+    """
+    program = check_program(file_name)
+    summary = {'program': program}
+    if program is None:
+        return summary
+    fields = ['scfenergies', 'natom', 'charge', 'mult']
+    data = extract(file_name, fields, program, use_cache)
+    energies = data.get('scfenergies', [])
+    # Only the end of the file is needed
+    ended = termination(file_name, program)
+    summary.update({
+        'completed': None if ended is None else ended == 'completed',
+        'energy': float(energies[-1]) if len(energies) else None,
+        'natom': data.get('natom'),
+        'charge': data.get('charge'),
+        'mult': data.get('mult'),
+        'steps': len(energies),
+    })
+    return summary
+
+
+def status(file_name):
+    """
+    The program that wrote an output and how it ended (see helper.termination)
+    :return: (program, 'completed', 'failed', 'running' or None if the program is not supported)
+    """
+    program = check_program(file_name)
+    return program, termination(file_name, program) if program else None
+
+
+def find_outputs(root, patterns=None):
+    """
+    Find all output files below a directory, skipping hidden directories
+    :param root: directory to search
+    :param patterns: file name patterns (see PATTERNS)
+    :return: {path relative to the root: os.stat_result}
+    """
+    patterns = [pattern + ext for pattern in (patterns or PATTERNS) for ext in COMPRESSED_EXTENSIONS]
+    files = {}
+    for directory, dirs, names in os.walk(root):
+        # Skip hidden directories
+        dirs[:] = [d for d in dirs if d[0] != '.']
+        for name in names:
+            if any(fnmatch(name, pattern) for pattern in patterns):
+                path = os.path.join(directory, name)
+                files[os.path.relpath(path, root)] = os.stat(path)
+    return files
+
+
+def _summarize(file_name, use_cache):
+    """Summarize without failing on unparsable files (for batch_map)"""
+    try:
+        return summarize(file_name, use_cache)
+    except Exception:
+        return {'program': check_program(file_name)}
+
+
+class ProjectIndex:
+    """
+    Index of the output files below a root directory
+    Each file is stored with its mtime and size, updates only re-read the files
+    that changed since the last update.
+    :param root: root directory of the project
+    :param db_file: database file (defaults to INDEX_NAME in the root)
+    """
+
+    def __init__(self, root='.', db_file=None):
+        self.root = os.path.abspath(root)
+        self.db_file = db_file or os.path.join(self.root, INDEX_NAME)
+        self.connection = sqlite3.connect(self.db_file)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def find(self, patterns=None):
+        """
+        Find all output files below the root
+        :param patterns: file name patterns (see PATTERNS)
+        :return: {path relative to the root: os.stat_result}
+        """
+        return find_outputs(self.root, patterns)
+
+    def update(self, patterns=None, jobs=1, use_cache=True):
+        """
+        Bring the index up to date with the files on disk
+        :param patterns: file name patterns (see PATTERNS)
+        :param jobs: number of files to read in parallel
+        :param use_cache: use the parse cache for fields that need cclib
+        :return: (number of files added or updated, number removed)
+        """
+        files = self.find(patterns)
+        known = {row['path']: (row['mtime'], row['size'])
+                 for row in self.connection.execute('SELECT path, mtime, size FROM outputs')}
+        changed = [path for path, stat in files.items()
+                   if known.get(path) != (stat.st_mtime_ns, stat.st_size)]
+        removed = [path for path in known if path not in files]
+
+        full_paths = [os.path.join(self.root, path) for path in changed]
+        insert = f'INSERT OR REPLACE INTO outputs VALUES ({", ".join("?"*len(COLUMNS))})'
+        with self.connection:
+            for full_path, out, summary, error in batch_map(_summarize, full_paths, use_cache, jobs=jobs):
+                path = os.path.relpath(full_path, self.root)
+                stat = files[path]
+                summary = dict(summary or {}, path=path, mtime=stat.st_mtime_ns, size=stat.st_size)
+                self.connection.execute(insert, [summary.get(column) for column in COLUMNS])
+            self.connection.executemany('DELETE FROM outputs WHERE path = ?', [(path,) for path in removed])
+
+        return len(changed), len(removed)
+
+    def query(self, where=None, params=(), order='path'):
+        """
+        Select output files from the index
+        :param where: SQL condition on the columns (see COLUMNS)
+        :param params: parameters for ? placeholders in where
+        :param order: column(s) to sort by
+        :return: list of sqlite3.Row (accessible by column name)
+        """
+        sql = 'SELECT * FROM outputs WHERE program IS NOT NULL'
+        if where:
+            sql += f' AND ({where})'
+        sql += f' ORDER BY {order}'
+        return self.connection.execute(sql, params).fetchall()
+
+
+def locate(directory='.'):
+    """
+    Find the index that covers a directory by searching it and its parents
+    :param directory: directory to start from
+    :return: root directory of the index, or None if there is none
+    """
+    directory = os.path.abspath(directory)
+    while True:
+        if os.path.isfile(os.path.join(directory, INDEX_NAME)):
+            return directory
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
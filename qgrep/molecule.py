@@ -1,7 +1,7 @@
 import numpy as np
 from qgrep.atom import atomic_masses, atomic_numbers
-
-from cclib.io import ccread
+from qgrep.cache import ccread
+from qgrep.compression import open_file
 
 
 class Molecule:
@@ -112,14 +112,14 @@ class Molecule:
 
     @staticmethod
     def read_from(infile):
-        """Read from a file"""
+        """Read from an output or xyz file, either of which may be compressed"""
         try:
             data = ccread(infile)
             # Hack: cclib doesn't have an easy way to access atom names
             lines = data.writexyz().splitlines()
         except AttributeError as e:
             # Attempt to read as an XYZ file
-            with open(infile) as f:
+            with open_file(infile) as f:
                 lines = f.readlines()
         # Strip off length if provided
         if lines[0].strip().isdigit():
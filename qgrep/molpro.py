@@ -1,5 +1,10 @@
 """Molpro functions"""
 from .helper import BOHR_TO_ANGSTROM
+from .sections import Section, extract_sections, register
+
+
+GEOMETRY = register('molpro', 'geometry', Section(
+    ' ATOMIC COORDINATES\n', skip=3, row=lambda line: [line.split()[i] for i in [1, 3, 4, 5]], units='bohr'))
 
 
 def get_geom(lines, geom_type='xyz', units='angstrom'):
@@ -7,27 +12,16 @@ def get_geom(lines, geom_type='xyz', units='angstrom'):
     Takes the lines of a Molpro output file and returns its last geometry in the
     specified format
     """
-    end = '\n'
-    if geom_type == 'xyz' and units == 'angstrom':
-        start = ' ATOMIC COORDINATES\n'
-    else:
+    if geom_type != 'xyz' or units != 'angstrom':
         raise ValueError('Unsupported format or geom_type')
 
-    geom_start = -1
-    # Iterate backwards until the start of the last set of coordinates is found
-    for i in reversed(list(range(len(lines)))):
-        if start == lines[i]:
-            geom_start = i + 4
-            break
-    if geom_start == -1:
-        print("Could not find start of geometry")
+    geoms = extract_sections(lines, 'molpro', ['geometry'], last=True)['geometry']
+    if not geoms:
+        print("Could not find geometry")
         return ''
 
     geom = []
-    for line in lines[geom_start:]:
-        if line == end:
-            break
-        idx, atom, charge, *xyz = line.split()
+    for atom, *xyz in geoms[0]:
         x, y, z = map(lambda q: float(q)*BOHR_TO_ANGSTROM, xyz)
         geom.append(f'{atom:<2s} {x} {y} {z}')
 
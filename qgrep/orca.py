@@ -1,84 +1,63 @@
 """Source for all orca related functions"""
-import re
+import os
+import json
+import mmap
+import shutil
+import numpy as np
 
+from bisect import bisect_left
 from collections import OrderedDict
-
+from functools import cached_property
+from itertools import islice
+
+from . import cache
+from .batch import batch_map
+from .helper import BOHR_TO_ANGSTROM, LazyLines, tail
+from .compression import compression, open_file
+from .profiling import timed
 from .molecule import Molecule
 from .convergence import Convergence, Step
+from .scan import Scan
+from .sections import LazyOutput, Section, register
+from .trajectory import ragged_xyz_frames, xyz_frames
+from .vibrations import Vibrations
 
 
+@timed('parse')
 def get_geom(lines, geom_type='xyz', units='angstrom'):
     """
     Takes the lines of an orca output file and returns its last geometry in the
     specified format
     """
-    start = ''
-    end = '\n'
-    if geom_type == 'xyz' and units == 'angstrom':
-        start = 'CARTESIAN COORDINATES (ANGSTROEM)\n'
-    elif geom_type == 'zmat' and units == 'angstrom':
-        start = 'INTERNAL COORDINATES (ANGSTROEM)\n'
-    elif geom_type == 'xyz' and units == 'bohr':
-        start = 'CARTESIAN COORDINATES (A.U.)\n'
-    elif geom_type == 'zmat' and units == 'bohr':
-        start = 'INTERNAL COORDINATES (A.U.)\n'
-    else:
-        print("Invalid format or units")
-        return ''
+    return OrcaOutput.of(lines).geometry(geom_type, units)
 
-    geom_start = -1
-    # Iterate backwards until the start of the last set of coordinates is found
-    for i in reversed(list(range(len(lines)))):
-        if start == lines[i]:
-            geom_start = i + 2
-            break
-    if geom_start == -1:
-        print("Could not find start of geometry")
-        return ''
 
-    geom_end = -1
-    for i in range(geom_start, len(lines)):
-        if end == lines[i]:
-            geom_end = i
-            break
-    if geom_end == -1:
-        return ''
+@timed('parse')
+def get_trajectory(lines):
+    """
+    Gets the geometries of all steps (e.g. of an optimization or scan)
+    :return: atoms, (nsteps, natoms, 3) array of the coordinates in angstrom
+    """
+    return OrcaOutput.of(lines).trajectory
 
-    if geom_type == 'xyz' and units == 'bohr':
-        geom_start += 1
-    geom = lines[geom_start: geom_end]
 
-    return geom
+@timed('parse')
+def get_frames(lines):
+    """
+    Gets the geometries of all steps, even if the atoms change between them
+    :return: [(atoms, (natoms, 3) array of the coordinates in angstrom)] of each step
+    """
+    return OrcaOutput.of(lines).frames
 
 
 def plot(lines, geom_type='xyz'):
     """Plots the geometries from the optimization steps"""
-    start = 'CARTESIAN COORDINATES (ANGSTROEM)\n'
-    end = 'CARTESIAN COORDINATES (A.U.)\n'
-
-    geoms_start = []
-    geoms_end = []
-    for i in range(len(lines)):
-        if start == lines[i]:
-            geoms_start.append(i + 2)
-        if end == lines[i]:
-            geoms_end.append(i - 2)
-
-    geoms = []
-    length = geoms_end[0] - geoms_start[0]
-    for i in range(len(geoms_start)):
-        start = geoms_start[i]
-        end = geoms_end[i]
-        if end - start != length:
-            length = end - start
-
-        geom = f'{length}\nStep {i}\n'
-        for line in lines[start:end]:
-            geom += '\t'.join(line.split()) + '\n'
-
-        geoms.append(geom)
-
-    return geoms
+    try:
+        atoms, trajectory = get_trajectory(lines)
+    except ValueError:
+        # The number of atoms changes between steps
+        return list(ragged_xyz_frames(get_frames(lines)))
+    return list(xyz_frames(atoms, trajectory))
 
 
 def check_convergence(lines):
@@ -113,119 +92,234 @@ def template(geom='', jobtype='Opt', theory='B3LYP-D3', basis='def2-svp', freq=F
 
 
 def get_freqs(lines):
-    """Returns all the frequencies and geometries in xyz format"""
-    # Find the coordinates of the vibrational modes (assumes the last coordinates given)
-    geom = get_geom(lines)
-    num_atoms = len(geom)
-    geom = [f'{num_atoms}', ''] + ['\t'.join(line.split()) for line in geom]
-
-    """Model of vibrational output for an N atom molecule
-            0    1    ...        5
-    atom1x    #    #    ...        #
-    atom1y    #    #    ...        #
-    atom1z    #    #    ...        #
-    atom2x    #    #    ...        #
-    atom2y    #    #    ...        #
-    atom2z    #    #    ...        #
-    ...
-    atomNz    #    #    ...        #
-            6    7    ...        11
-    atom1x    #    #    ...        #
-    atom1y    #    #    ...        #
-    atom1z    #    #    ...        #
-    atom2x    #    #    ...        #
-    atom2y    #    #    ...        #
-    atom2z    #    #    ...        #
-    ...
-    atomNz    #    #    ...        #
-    ...
-    """
-    vibrations_start = 0
-    vib_modes_start = 0
-    vib_modes_end = 0
-    vib_freqs_start = 0
-    vib_freqs_end = 0
-    hybrid_hessian_vib_modes_end = 0
-    for i in reversed(list(range(len(lines)))):
-        line = lines[i]
-        if 'The first frequency considered to be a vibration is ' == line[0:52]:
-            vibrations_start = int(line[52:].strip())
-            hybrid_hessian_vib_modes_end = i - 2
-
-        if 'IR SPECTRUM\n' == line:
-            vib_modes_end = i - 3
-        elif 'NORMAL MODES\n' == line:
-            vib_modes_start = i + 7
-        elif 'VIBRATIONAL FREQUENCIES\n' == line:
-            vib_freqs_start = i + 3
-            break
+    """
+    Returns all the frequencies and geometries in xyz format
+    The .hess file of the job is read instead of the output when it can be found
+    """
+    hess_file = find_hess(getattr(lines, 'file_name', None))
+    vibrations = hess_vibrations(read_hess(hess_file)) if hess_file else None
+    if vibrations is None:
+        vibrations = get_vibrations(lines)
+    if vibrations is None:
+        return ''
+    return vibrations.xyz()
 
-    # Partial hessian calculation output looks a little different
-    if vib_modes_end == 0 and hybrid_hessian_vib_modes_end != 0:
-        vib_modes_end = hybrid_hessian_vib_modes_end
 
-    # Plot all vibrations (don't remove non-frequencies)
-    vibrations_start = 0
+@timed('parse')
+def get_vibrations(lines):
+    """
+    Reads the last frequency calculation
+    :param lines: lines of the output file (list or LazyLines)
+    :return: Vibrations, None if there are no frequencies
+    """
+    return OrcaOutput.of(lines).vibrations
 
-    vib_freqs_end = vib_modes_start - 10
-    vib_freqs = []
-    # Read in the vibrational frequencies
-    for i in range(vib_freqs_start, vib_freqs_end):
-        vib_freqs.append(lines[i].split()[1])
 
-    vibrations = lines[vib_modes_start:vib_modes_end]
-    modes = []
-    """modes list to be ordered by mode number
-    [
-        [       #mode0
-            (atom1_x,y,z),(atom2_x,y,z),...
-       ],
-        [       #mode1
-            (atom1_x,y,z),(atom2_x,y,z),...
-       ],
-        ...
-   ]
-    """
-
-    for i in range(0, len(vibrations), 3 * num_atoms + 1):
-        coords = []
-        for j in range(0, 3 * num_atoms, 3):
-            x = vibrations[i + j + 1].split()[1:]
-            y = vibrations[i + j + 2].split()[1:]
-            z = vibrations[i + j + 3].split()[1:]
-            # the xyz coordinates for atom1 across the vibrations (up to 6)
-            xyz = list(zip(x, y, z))
-            coords.append(xyz)
-            # mode0    mode1    ...    mode5
-        # atom1 xyz = [(x,y,z),(x,y,z), ...]
-        # atom2 xyz = [(x,y,z),(x,y,z), ...]
-        # ...
-        num_modes = len(coords[0])
-        for j in range(num_modes):
-            mode = []
-            for k in range(num_atoms):
-                mode.append(coords[k][j])
-            modes.append(mode)
-
-    # Apply vibrations to the last geometry
-    vibrations = []
-    # Don't print the first six modes, as they are not vibrations
-    for i in range(len(modes) - 6):
-        mode = modes[i + 6]
-        # xyz header including the vibrational frequency
-        # offset by 6 to avoid non-vibrational modes
-        vibrations.append([f'{num_atoms}\n{vib_freqs[i+6]} cm^-1'])
-        for j in range(len(modes[i])):
-            # Geometry goes first, then x, y, and z displacements for modes
-            vibrations[i].append(geom[j + 2] + '\t' + '\t'.join(mode[j]))
-
-    output = ''
-    for freq in vibrations[vibrations_start:]:
-        output += '\n'.join(freq) + '\n\n'
-
-    return output
+def _parse_vibrations(section, geom):
+    """
+    Parse a frequency calculation
+    The normal modes are printed six columns at a time, one row per
+    cartesian coordinate, and are read into a (3N, 3N) array.
+    :param section: lines from VIBRATIONAL FREQUENCIES onwards
+    :param geom: lines of the geometry
+    :return: Vibrations, None if the section is incomplete
+    """
+    try:
+        modes_start = section.index('NORMAL MODES\n') + 7
+    except ValueError:
+        return None
+    try:
+        ir_start = section.index('IR SPECTRUM\n', modes_start)
+        modes_end = ir_start - 3
+    except ValueError:
+        # Partial hessian calculations do not print an IR spectrum
+        ir_start = None
+        first = 'The first frequency considered to be a vibration is '
+        modes_end = next((i - 2 for i in range(modes_start, len(section)) if section[i][:52] == first), None)
+        if modes_end is None:
+            return None
+
+    frequencies = np.array([float(line.split()[1]) for line in section[3:modes_start - 10]])
+    n = len(frequencies)
+
+    # Blocks of a header with the mode numbers followed by n rows of "coordinate value value ..."
+    modes = np.zeros((n, n))
+    block_size = n + 1
+    for column, start in zip(range(0, n, 6), range(modes_start, modes_end, block_size)):
+        width = min(6, n - column)
+        block = np.array(''.join(section[start + 1:start + block_size]).split(), dtype=float)
+        modes[column:column + width] = block.reshape(n, width + 1)[:, 1:].T
+
+    intensities = np.zeros(n)
+    if ir_start is not None:
+        header = section[ir_start + 3].split()
+        # Newer versions print the intensity (km/mol) before T**2
+        column = header.index('Int') if 'Int' in header else 2
+        i = ir_start + 4
+        while section[i][:3] != '---':
+            i += 1
+        for line in section[i + 1:]:
+            if not line.strip():
+                break
+            values = line.split()
+            intensities[int(values[0][:-1])] = float(values[column])
+
+    geom = [line.split() for line in geom]
+    atoms = [atom for atom, *xyz in geom]
+    geometry = np.array([xyz for atom, *xyz in geom], dtype=float)
+
+    return Vibrations(atoms, geometry, frequencies, modes, intensities)
+
+
+def find_hess(output_file):
+    """
+    Find the .hess file written by the job of an output file
+    Either shares its name (job.out -> job.hess) or is input.hess next to output.dat
+    :return: name of the .hess file, None if there is none
+    """
+    if output_file is None or not os.path.isfile(output_file):
+        return None
+    base = os.path.splitext(output_file)[0]
+    if compression(output_file):
+        base = os.path.splitext(base)[0]
+    candidates = [base + '.hess']
+    if os.path.basename(base) == 'output':
+        candidates.append(os.path.join(os.path.dirname(base), 'input.hess'))
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+@timed('parse')
+def read_hess(file_name, use_cache=False):
+    """
+    Reads an ORCA .hess file into arrays
+    The column-blocked matrices are parsed straight from a memory map of the file
+    :param file_name: .hess file (may be compressed)
+    :param use_cache: reuse (and write) an npz entry in the cache directory, invalidated when the file changes
+    :return: {'hessian': (3N, 3N), 'frequencies': (3N,) in cm^-1, 'normal_modes': (3N, 3N) with a mode per column,
+              'atoms': (N,), 'masses': (N,), 'coordinates': (N, 3) in bohr, 'ir_spectrum': (3N, k),
+              'dipole_derivatives': (3N, 3), 'energy': float}, only including the sections that are present
+    """
+    use_cache = use_cache and cache.ENABLED
+    path = cache.entry_path(file_name, '.hess.npz')
+    key = cache.file_key(file_name)
+    if use_cache and os.path.isfile(path):
+        try:
+            with np.load(path) as entry:
+                if json.loads(str(entry['__key__'])) == key:
+                    hess = {name: entry[name].item() if name == 'energy' else entry[name]
+                            for name in entry.files if name != '__key__'}
+                    # Mark as recently used for the LRU eviction
+                    os.utime(path)
+                    return hess
+        except (OSError, ValueError, KeyError):
+            # Corrupt or outdated entry
+            pass
+
+    if compression(file_name):
+        with open_file(file_name, 'rb') as f:
+            hess = _parse_hess(f.read())
+    elif key[1] == 0:
+        # Empty files cannot be mapped (e.g. the job was killed before writing it)
+        hess = {}
+    else:
+        with open(file_name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            hess = _parse_hess(data)
+
+    if use_cache:
+        # Write to a temporary file so that concurrent readers never see half an entry
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(cache.CACHE_DIR, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                np.savez(f, __key__=np.array(json.dumps(key)), **hess)
+            os.replace(tmp, path)
+            cache.evict()
+        except OSError:
+            # The entry is only an optimization
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return hess
+
+
+def _parse_hess(data):
+    """
+    Parse the sections of a .hess file
+    $hessian
+    9
+                       0                  1                  2                  3                  4
+          0      2.2964394144E-03  -4.1787551529E-04   0.0000000000E+00  -3.1573683116E-02  -2.5437931370E-03
+          ...
+    :param data: bytes (or mmap) of the file
+    """
+    hess = {}
+    start = data.find(b'$')
+    while start != -1:
+        end = data.find(b'\n$', start + 1)
+        section = data[start:end if end != -1 else len(data)]
+        # Comments only appear between sections
+        section = section.split(b'\n#')[0].split(b'\n')
+        name = section[0].strip()[1:].decode()
+        body = [line for line in section[1:] if line.strip()]
+        if name == 'act_energy':
+            hess['energy'] = float(body[0])
+        elif name in ('hessian', 'normal_modes'):
+            hess[name] = _hess_matrix(body)
+        elif name == 'vibrational_frequencies':
+            hess['frequencies'] = _hess_table(body)[:, 1]
+        elif name in ('ir_spectrum', 'dipole_derivatives'):
+            hess[name] = _hess_table(body)
+        elif name == 'atoms':
+            atoms = np.array(b' '.join(body[1:]).split()).reshape(int(body[0]), -1)
+            hess['atoms'] = atoms[:, 0].astype(str)
+            hess['masses'] = atoms[:, 1].astype(float)
+            hess['coordinates'] = atoms[:, 2:5].astype(float)
+        start = end + 1 if end != -1 else -1
+
+    return hess
+
+
+def _hess_table(body):
+    """Rows of numbers preceded by the number of rows"""
+    return np.array(b' '.join(body[1:int(body[0]) + 1]).split(), dtype=float).reshape(int(body[0]), -1)
+
+
+def _hess_matrix(body):
+    """A matrix printed in blocks of columns, each starting with a line of column numbers"""
+    shape = [int(n) for n in body[0].split()]
+    nrows, ncols = shape[0], shape[-1]
+    matrix = np.empty((nrows, ncols))
+    col, i = 0, 1
+    while col < ncols:
+        width = len(body[i].split())
+        block = np.array(b' '.join(body[i + 1:i + nrows + 1]).split(), dtype=float)
+        # Drop the row numbers
+        matrix[:, col:col + width] = block.reshape(nrows, width + 1)[:, 1:]
+        col += width
+        i += nrows + 1
+
+    return matrix
+
+
+def hess_vibrations(hess):
+    """
+    Vibrations from the arrays of a .hess file (see read_hess)
+    Intensities are the T**2 (or Int) column of the IR spectrum
+    :return: Vibrations, None if the file has no normal modes (e.g. it is incomplete)
+    """
+    if any(name not in hess for name in ['atoms', 'coordinates', 'frequencies', 'normal_modes']):
+        return None
+    intensities = None
+    if 'ir_spectrum' in hess:
+        ir = hess['ir_spectrum']
+        intensities = ir[:, 2] if ir.shape[1] > 5 else ir[:, 1]
+    return Vibrations(hess['atoms'], hess['coordinates']*BOHR_TO_ANGSTROM, hess['frequencies'],
+                      hess['normal_modes'].T, intensities)
 
 
+@timed('parse')
 def get_ir(lines):
     vib_freqs_start = 0
     vib_freqs_end = 0
@@ -245,76 +339,41 @@ def get_ir(lines):
     return vib_freqs
 
 
+# energy_type: (start of the line, field holding the energy)
+ENERGY_LINES = OrderedDict([
+    ('sp', ('FINAL SINGLE POINT ENERGY', 4)),
+    ('gibbs', ('Final Gibbs free enthalpy', -2)),
+    ('enthalpy', ('Total enthalpy', -2)),
+    ('entropy', ('Total entropy correction', 4)),
+    ('zpve', ('Zero point energy', 4)),
+])
+
+
+@timed('parse')
+def get_all_energies(lines, energy_types=None):
+    """
+    Returns every occurrence of each energy type
+    :param energy_types: keys of ENERGY_LINES (defaults to all of them)
+    :return: {energy_type: array of the energies in order}
+    """
+    energies = OrcaOutput.of(lines).energies
+    if energy_types is None:
+        return dict(energies)
+    return {energy_type: energies.get(energy_type, np.zeros(0)) for energy_type in energy_types}
+
+
+@timed('parse')
 def get_energy(lines, energy_type='sp'):
     """Returns the last calculated energy
     WARNING: It returns as a string in order to prevent python from rounding"""
-    energy = 0
-    if energy_type == 'sp':
-        energy_line = 'FINAL SINGLE POINT ENERGY'
-        for line in reversed(lines):
-            if energy_line == line[:25]:
-                energy = line.split()[4]
-                break
-    elif energy_type == 'gibbs':
-        energy_line = 'Final Gibbs free enthalpy'
-        for line in reversed(lines):
-            if energy_line == line[:25]:
-                energy = line.split()[-2]
-                break
-    elif energy_type == 'enthalpy':
-        energy_line = 'Total enthalpy'
-        for line in reversed(lines):
-            if energy_line == line[:14]:
-                energy = line.split()[-2]
-                break
-    elif energy_type == 'entropy':
-        energy_line = 'Total entropy correction'
-        for line in reversed(lines):
-            if energy_line == line[:24]:
-                energy = line.split()[4]
-                break
-    elif energy_type == 'zpve':
-        energy_line = 'Zero point energy'
-        for line in reversed(lines):
-            if energy_line == line[:17]:
-                energy = line.split()[4]
-                break
-
-    return energy
+    return OrcaOutput.of(lines).energy(energy_type)
 
 
 def get_energies(lines, energy_type='sp'):
     """
     Returns all of the calculated energies
     """
-    energies = []
-    if energy_type == 'sp':
-        energy_line = 'FINAL SINGLE POINT ENERGY'
-        for line in lines:
-            if energy_line == line[:25]:
-                energies.append(float(line.split()[4]))
-    elif energy_type == 'gibbs':
-        energy_line = 'Final Gibbs free enthalpy'
-        for line in lines:
-            if energy_line == line[:25]:
-                energies.append(float(line.split()[-2]))
-    elif energy_type == 'enthalpy':
-        energy_line = 'Total enthalpy'
-        for line in lines:
-            if energy_line == line[:14]:
-                energies.append(float(line.split()[-2]))
-    elif energy_type == 'entropy':
-        energy_line = 'Total entropy correction'
-        for line in lines:
-            if energy_line == line[:24]:
-                energies.append(float(line.split()[4]))
-    elif energy_type == 'zpve':
-        energy_line = 'Zero point energy'
-        for line in lines:
-            if energy_line == line[:17]:
-                energies.append(float(line.split()[4]))
-
-    return energies
+    return get_all_energies(lines, [energy_type])[energy_type].tolist()
 
 
 def convert_zmatrix(lines, units):
@@ -356,87 +415,29 @@ def convert_to_orca_zmatrix(lines):
     return orca_zmatrix
 
 
+@timed('parse')
 def energy_levels(lines):
     """
     Returns the orbital occupations and energies of the last geometry as well as
     useful information
     """
-    start = 'ORBITAL ENERGIES\n'
-    end = '\n'
-
-    levels_start = 0
-    # Iterate backwards until the start of the last set of coordinates is found
-    for i in reversed(list(range(len(lines)))):
-        if start == lines[i]:
-            levels_start = i + 5
-            break
-    if levels_start == 0:
-        print("Could not find start of orbitals")
-        return ''
-
-    levels_end = 0
-    for i in range(levels_start, len(lines)):
-        if end == lines[i]:
-            levels_end = i
-            break
-    if levels_end == 0:
-        print("Could not find the end of the orbitals")
-        return ''
-
-    levels = lines[levels_start: levels_end]
-
-    clean = []
-    for level in levels:
-        num, occ, hartree, eV, *sym = level.split()
-        if sym:
-            clean.append((int(num), float(occ), float(hartree)))
-        else:
-            clean.append((int(num), float(occ), float(hartree), sym))
-
-    info = OrderedDict()
-    for i in range(len(clean)):
-        if clean[i][1] == 0:
-            info['homo'] = clean[i - 1][2]
-            info['lumo'] = clean[i][2]
-            info['homo-lumo-gap'] = info['lumo'] - info['homo']
-            break
-
-    return levels, info
+    return OrcaOutput.of(lines).energy_levels
 
 
+@timed('parse')
 def get_molecule(lines):
     """
     !Deprecated!
     Read geometry and convert to a Molecule
     """
-    start = 'CARTESIAN COORDINATES (ANGSTROEM)\n'
-    end = '\n'
-    geom_start = -1
-    for i, line in reversed(list(enumerate(lines))):
-        if start == line:
-            geom_start = i + 2
-            break
-    if geom_start == -1:
-        return ''
-
-    mol = Molecule()
-    for line in lines[geom_start:]:
-        if end == line:
-            break
-        atom, *xyz = line.split()[:4]
-        mol.append(atom, list(map(float, xyz)))
-
-    return mol
+    return OrcaOutput.of(lines).molecule
 
 
 def get_charge(lines):
     """
     Returns the charge of the molecule in the computations
     """
-    for line in reversed(lines):
-        if line[:13] == ' Total Charge':
-            return int(line.split()[-1])
-    return None
+    return OrcaOutput.of(lines).charge
 
 
 def get_multiplicity(lines):
@@ -444,14 +445,22 @@ def get_multiplicity(lines):
     Returns the multiplicity of the computation. Uses the SCF value.
     If no multiplicity can be found, it returns 0
     """
-    for line in reversed(lines):
-        if line[:13] == ' Multiplicity':
-            return int(line.split()[-1])
-    return 0
+    return OrcaOutput.of(lines).multiplicity
 
+# Items of a geometry convergence block and the keys of their Step parameters
+CONVERGENCE_ITEMS = OrderedDict([
+    ('energy change', 'delta_e'),
+    ('rms gradient', 'rms_grad'),
+    ('max gradient', 'max_grad'),
+    ('rms step', 'rms_step'),
+    ('max step', 'max_step'),
+])
 
-def convergence(output_file):
+
+def iter_convergence(lines):
     """
+    Yields a Step as soon as each geometry convergence block is complete, so
+    partially written outputs can be followed (an unfinished block is skipped)
     Sample geometry convergence output. May not include energy change line
                                 .--------------------.
           ----------------------|Geometry convergence|---------------------
@@ -466,81 +475,431 @@ def convergence(output_file):
           Max(Bonds)      0.1391      Max(Angles)    0.48
           Max(Dihed)        0.00      Max(Improp)    0.00
           -----------------------------------------------------------------
+    A missing energy change is 0 in relaxed scans and nan otherwise, its
+    criterion is taken from the Convergence Tolerances
+    :param lines: iterable of the lines of an ORCA output (e.g. an open file)
     """
-    convergence_re = r'''(Energy change\s+([-]?\d+.\d+)\s+([-]?\d+.\d+)\s+(YES|NO))?
-          RMS gradient \s+([-]?\d+.\d+)\s+([-]?\d+.\d+)\s+(YES|NO)
-          MAX gradient \s+([-]?\d+.\d+)\s+([-]?\d+.\d+)\s+(YES|NO)
-          RMS step     \s+([-]?\d+.\d+)\s+([-]?\d+.\d+)\s+(YES|NO)
-          MAX step     \s+([-]?\d+.\d+)\s+([-]?\d+.\d+)\s+(YES|NO)
-          ....................................................
-          Max\(Bonds\)\s+([-]?\d+.\d+)\s+Max\(Angles\)\s+([-]?\d+.\d+)
-          Max\(Dihed\)\s+([-]?\d+.\d+)\s+Max\(Improp\)\s+([-]?\d+.\d+)
-          -----------------------------------------------------------------'''
-
-    output = open(output_file).read()
-    matches = re.findall(convergence_re, output)
-    steps = []
-    for match in matches:
-        e_str, e_val,  e_tol, e_conv = match[0:4]
-        if e_val:
-            e_val = float(e_val)
-        else:
-            e_val = 0
-        rg_val, rg_tol, rg_conv = match[4:7]
-        mg_val, mg_tol, mg_conv = match[7:10]
-        rs_val, rs_tol, rs_conv = match[10:13]
-        ms_val, ms_tol, ms_conv = match[13:16]
-        rg_val, mg_val, rs_val, ms_val = float(rg_val), float(mg_val), float(rs_val), float(ms_val)
-        steps.append(Step(e_val, rg_val, mg_val, rs_val, ms_val))
+    scf_steps = 0
+    energy_tolerance = np.nan
+    relaxed_scan = False
+    # Number of header lines left to skip, None outside of a convergence block
+    skip = None
+    values = {}
+    for line in lines:
+        if skip is not None:
+            if skip:
+                skip -= 1
+            elif line[10:11] == '.' or line[10:11] == '-' or not line.strip():
+                missing = (0.0 if relaxed_scan else np.nan, energy_tolerance)
+                found = [values.get(key, missing) for key in CONVERGENCE_ITEMS.values()]
+                params = OrderedDict(zip(CONVERGENCE_ITEMS.values(), (value for value, _ in found)))
+                params['scf_steps'] = scf_steps
+                yield Step(params, [tolerance for _, tolerance in found] + [0])
+                skip = None
+            else:
+                item = line[10:28].strip().lower()
+                # The last line may not have been completely written yet
+                if item in CONVERGENCE_ITEMS and line.endswith('\n'):
+                    value, tolerance = line[28:].split()[:2]
+                    values[CONVERGENCE_ITEMS[item]] = float(value), float(tolerance)
+        elif line[33:53] == 'Geometry convergence':
+            skip = 2
+            values = {}
+        elif 'SCF CONVERGED AFTER' in line:
+            # Iterations are numbered from 0
+            scf_steps = int(line.split()[-3]) + 1
+        elif line[:13] == 'Energy Change' and line[25:29] == 'TolE':
+            energy_tolerance = float(line.split()[-2])
+        elif line[23:48] == '*    Relaxed Surface Scan':
+            relaxed_scan = True
+
+
+@timed('parse')
+def convergence(output_file):
+    """
+    Reads the geometry convergence of every step (see iter_convergence)
+    The file is streamed line by line and may still be being written
+    """
+    with open_file(output_file) as f:
+        steps = list(iter_convergence(f))
+    criteria = steps[-1].criteria[:-1] if steps else []
+
+    return Convergence(steps, criteria)
 
-    return Convergence(steps, [])
+
+def last_geom(output_file, geom_type='xyz'):
+    """
+    The last geometry of an output found by searching backwards from its end,
+    so only the tail of the file is read
+    :param output_file: ORCA output file
+    :param geom_type: xyz or zmat
+    :return: list of lines, None if there is no geometry
+    """
+    with LazyLines(output_file) as lines:
+        found = tail(lines, SECTION_HEADERS[geom_type])
+    if found is None:
+        return None
+    geom = []
+    # Skip the dashes
+    for line in found[2:]:
+        if not line.strip():
+            break
+        geom.append(line)
+    return geom
 
 
-def update_geom(infile='input.dat', outfile='output.dat'):
+def update_geom(infile='input.dat', outfile='output.dat', dry_run=False, geom=None):
+    """
+    Replaces the geometry of an input with the last geometry of an output
+    The input is replaced atomically (written to a temporary file and renamed),
+    so it is never left half written.
+    :param infile: ORCA input file to update
+    :param outfile: ORCA output file to take the geometry from
+    :param dry_run: only report the changes, leave the input untouched
+    :param geom: xyz lines to use instead of the last geometry of the outfile
+    :return: {'natoms': number of atoms, 'changed': number of atoms that moved,
+              'max_change': largest change of a coordinate, 'geom_type': (old, new) geometry type}
+    :raises ValueError: if a geometry is missing or the number of atoms differs
+    """
     with open(infile) as f:
         in_lines = f.readlines()
-    start = -1
-    end = -1
+    start = end = None
     for i, line in enumerate(in_lines):
         if line[0] == '*':
-            if len(line.strip()) > 1:
-                geom_type = line[1:].split()[0]
+            if start is None and len(line.strip()) > 1:
+                old_type, *header = line[1:].split()
                 start = i + 1
-            else:
+            elif start is not None and not line[1:].strip():
                 end = i
                 break
-
-    with open(outfile) as f:
-        out_lines = f.readlines()
-
-    geom = get_geom(out_lines, geom_type=geom_type)
-
-    updated = in_lines[:start] + geom + in_lines[end:]
-
-    with open(infile, 'w') as f:
-        f.writelines(updated)
+    if end is None:
+        raise ValueError(f'Could not find the geometry block of {infile}')
+
+    # Internal coordinates can be taken from the output, anything else becomes xyz
+    new_type = 'int' if old_type == 'int' and geom is None else 'xyz'
+    if geom is None:
+        geom = last_geom(outfile, 'zmat' if new_type == 'int' else 'xyz')
+        if geom is None:
+            raise ValueError(f'Could not find a geometry in {outfile}')
+
+    old = [line.split() for line in in_lines[start:end] if line.strip()]
+    new = [line.split() for line in geom]
+    if len(old) != len(new):
+        raise ValueError(f'Different number of atoms in {infile} and {outfile}: {len(old)} != {len(new)}')
+
+    summary = {'natoms': len(new), 'changed': len(new), 'max_change': None, 'geom_type': (old_type, new_type)}
+    if old_type == new_type:
+        try:
+            change = abs(np.array([row[1:] for row in old], dtype=float) - np.array([row[1:] for row in new], dtype=float))
+            summary['changed'] = int(np.count_nonzero(change.max(axis=1) > 1e-6))
+            summary['max_change'] = float(change.max(initial=0))
+        except ValueError:
+            # Differently formatted coordinates (e.g. variables) cannot be compared
+            pass
+
+    if not dry_run:
+        if old_type != new_type:
+            in_lines[start - 1] = f'* {new_type} {" ".join(header)}\n'
+        updated = in_lines[:start] + geom + in_lines[end:]
+        tmp = f'{infile}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                f.writelines(updated)
+            shutil.copymode(infile, tmp)
+            os.replace(tmp, infile)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return summary
 
 
 def completed(lines):
     """
     Check if the output file shows successful completion
     """
-    return lines[-1][:14] == 'TOTAL RUN TIME'
+    return OrcaOutput.of(lines).completed
 
 
 def get_nat_orb_occ(lines):
     """
     Find the natural orbital occupations
     """
-    nat_occ = []
-    start = False
-    for line in lines:
-        if start:
-            if line.strip():
-                nat_occ.append(abs(float(line.split('=')[-1].strip())))
+    return OrcaOutput.of(lines).nat_orb_occ
+
+
+@timed('parse')
+def get_scan(lines):
+    """
+    Gets the optimized points of a relaxed surface scan
+    :return: Scan, None if the output is not a scan
+    """
+    return OrcaOutput.of(lines).scan
+
+
+def read_scan(file_name):
+    """Reads the Scan of an output file (see get_scan)"""
+    with OrcaOutput(file_name) as output:
+        return output.scan
+
+
+def read_scans(file_names, jobs=1):
+    """
+    Reads the scans of many output files in parallel
+    Use scan.stack to combine them into one dataset.
+    :param file_names: output files to read
+    :param jobs: number of files to read in parallel
+    :return: {file name: Scan} of the scans that could be read, {file name: error} of the others
+    """
+    scans, errors = OrderedDict(), OrderedDict()
+    for file_name, out, scan, error in batch_map(read_scan, file_names, jobs=jobs):
+        if scan is None and error is None:
+            error = 'Not a relaxed surface scan'
+        if error:
+            errors[file_name] = error
+        else:
+            scans[file_name] = scan
+    return scans, errors
+
+
+# Headers (the start of a line) of the sections found by the OrcaOutput index
+SECTION_HEADERS = OrderedDict([
+    ('xyz', 'CARTESIAN COORDINATES (ANGSTROEM)\n'),
+    ('xyz_bohr', 'CARTESIAN COORDINATES (A.U.)\n'),
+    ('zmat', 'INTERNAL COORDINATES (ANGSTROEM)\n'),
+    ('zmat_bohr', 'INTERNAL COORDINATES (A.U.)\n'),
+    ('orbital_energies', 'ORBITAL ENERGIES\n'),
+    ('vibrational_frequencies', 'VIBRATIONAL FREQUENCIES\n'),
+    ('natural_orbitals', 'Natural Orbital Occupation Numbers:\n'),
+    ('charge', ' Total Charge'),
+    ('multiplicity', ' Multiplicity'),
+    ('scan_step', '         *               RELAXED SURFACE SCAN STEP'),
+    ('optimization_converged', '                    ***        THE OPTIMIZATION HAS CONVERGED     ***'),
+] + [(energy_type, start) for energy_type, (start, field) in ENERGY_LINES.items()])
+# Most headers are single lines, the cartesian geometries can also be read by the section engine
+for name, header in SECTION_HEADERS.items():
+    register('orca', name, Section(header, rows=0))
+register('orca', 'xyz', Section(SECTION_HEADERS['xyz'], skip=1, units='angstrom'))
+register('orca', 'xyz_bohr', Section(SECTION_HEADERS['xyz_bohr'], skip=2,
+                                     row=lambda line: [line.split()[i] for i in [1, 5, 6, 7]], units='bohr'))
+
+
+class OrcaOutput(LazyOutput):
+    """
+    Lazily parsed ORCA output, the sections are those of SECTION_HEADERS
+    (see sections.LazyOutput)
+    :param output: name of the output file, or its lines (list or LazyLines)
+    """
+    HEADERS = SECTION_HEADERS
+
+    def _block(self, start):
+        """The lines from start up to the next blank line"""
+        block = []
+        for i in range(start, len(self.lines)):
+            line = self.lines[i]
+            if not line.strip():
+                break
+            block.append(line)
+        return block
+
+    def _last_block(self, name, skip):
+        """The lines of the last occurrence of a section after skipping some, up to the next blank line"""
+        found = self.last(name)
+        if found is None:
+            return None
+        block = []
+        for line in islice(found, skip + 1, None):
+            if not line.strip():
+                break
+            block.append(line)
+        return block
+
+    def _last_line(self, name):
+        """The last header line of a section, None if there is none"""
+        found = self.last(name)
+        return None if found is None else next(found)
+
+    def geometry(self, geom_type='xyz', units='angstrom'):
+        """
+        The last geometry in the specified format
+        :param geom_type: xyz or zmat
+        :param units: angstrom or bohr
+        :return: list of lines, '' if it cannot be found
+        """
+        if geom_type not in ['xyz', 'zmat'] or units not in ['angstrom', 'bohr']:
+            print("Invalid format or units")
+            return ''
+        name = geom_type if units == 'angstrom' else geom_type + '_bohr'
+        # Skip the dashes (and the column labels of the bohr coordinates)
+        block = self._last_block(name, 2 if name == 'xyz_bohr' else 1)
+        if block is None:
+            print("Could not find start of geometry")
+            return ''
+        return block
+
+    @cached_property
+    def trajectory(self):
+        """atoms, (nsteps, natoms, 3) array of the coordinates (angstrom) of every step"""
+        starts = self.index['xyz']
+        natoms = len(self._block(starts[0] + 2)) if starts else 0
+        geoms = []
+        for step, start in enumerate(starts):
+            block = self._block(start + 2)
+            if len(block) != natoms:
+                raise ValueError(f'Step {step} has {len(block)} atoms instead of {natoms}')
+            geoms += block
+
+        # Split all of the steps at once
+        geoms = np.array(''.join(geoms).split()).reshape(len(starts), natoms, 4)
+        return geoms[0, :, 0].tolist() if starts else [], geoms[:, :, 1:].astype(float)
+
+    @cached_property
+    def frames(self):
+        """(atoms, (natoms, 3) array of the coordinates in angstrom) of every step, the atoms may change"""
+        frames = []
+        for start in self.index['xyz']:
+            geom = np.array(''.join(self._block(start + 2)).split()).reshape(-1, 4)
+            frames.append((geom[:, 0].tolist(), geom[:, 1:].astype(float)))
+        return frames
+
+    @cached_property
+    def molecule(self):
+        """Molecule of the last geometry, '' if there is none"""
+        block = self._last_block('xyz', 1)
+        if block is None:
+            return ''
+        mol = Molecule()
+        for line in block:
+            atom, *xyz = line.split()[:4]
+            mol.append(atom, list(map(float, xyz)))
+        return mol
+
+    def _energy_strings(self, energy_type):
+        """All energies of a type (see ENERGY_LINES) as strings"""
+        if energy_type not in ENERGY_LINES:
+            return []
+        field = ENERGY_LINES[energy_type][1]
+        return [self.lines[i].split()[field] for i in self.index[energy_type]]
+
+    @cached_property
+    def energies(self):
+        """{energy_type: array of every occurrence of the energy} for all ENERGY_LINES"""
+        return OrderedDict((energy_type, np.array(self._energy_strings(energy_type), dtype=float))
+                           for energy_type in ENERGY_LINES)
+
+    def energy(self, energy_type='sp'):
+        """The last energy of a type as a string (to prevent rounding), 0 if there is none"""
+        line = self._last_line(energy_type) if energy_type in ENERGY_LINES else None
+        if line is None:
+            return 0
+        return line.split()[ENERGY_LINES[energy_type][1]]
+
+    @cached_property
+    def charge(self):
+        """Charge of the molecule, None if it cannot be found"""
+        line = self._last_line('charge')
+        if line is None:
+            return None
+        return int(line.split()[-1])
+
+    @cached_property
+    def multiplicity(self):
+        """Multiplicity of the SCF, 0 if it cannot be found"""
+        line = self._last_line('multiplicity')
+        if line is None:
+            return 0
+        return int(line.split()[-1])
+
+    @cached_property
+    def energy_levels(self):
+        """
+        The orbital occupations and energies of the last geometry, and the
+        HOMO, LUMO and gap, '' if they cannot be found
+        """
+        levels = self._last_block('orbital_energies', 4)
+        if levels is None:
+            print("Could not find start of orbitals")
+            return ''
+
+        clean = []
+        for level in levels:
+            num, occ, hartree, eV, *sym = level.split()
+            if sym:
+                clean.append((int(num), float(occ), float(hartree)))
             else:
+                clean.append((int(num), float(occ), float(hartree), sym))
+
+        info = OrderedDict()
+        for i in range(len(clean)):
+            if clean[i][1] == 0:
+                info['homo'] = clean[i - 1][2]
+                info['lumo'] = clean[i][2]
+                info['homo-lumo-gap'] = info['lumo'] - info['homo']
                 break
-        elif line == 'Natural Orbital Occupation Numbers:\n':
-            start = True
 
-    return nat_occ
+        return levels, info
+
+    @cached_property
+    def vibrations(self):
+        """Vibrations of the last frequency calculation, None if there are none"""
+        section = self.last('vibrational_frequencies')
+        if section is None:
+            return None
+        return _parse_vibrations(list(section), self.geometry())
+
+    @cached_property
+    def nat_orb_occ(self):
+        """Natural orbital occupation numbers (of the first set printed)"""
+        if not self.index['natural_orbitals']:
+            return []
+        return [abs(float(line.split('=')[-1].strip())) for line in self._block(self.index['natural_orbitals'][0] + 1)]
+
+    @cached_property
+    def scan(self):
+        """Scan of the optimized points of a relaxed surface scan, None if it is not a scan"""
+        steps = self.index['scan_step']
+        if not steps:
+            return None
+        xyz, sp, converged = self.index['xyz'], self.index['sp'], self.index['optimization_converged']
+
+        def last(starts, start, end):
+            """The last of the sorted starts within [start, end), None if there is none"""
+            i = bisect_left(starts, end) - 1
+            return starts[i] if i >= 0 and starts[i] >= start else None
+
+        atoms, labels, coordinates, energies, blocks, done = [], [], [], [], [], []
+        for start, end in zip(steps, steps[1:] + [len(self.lines)]):
+            # The scanned coordinates are listed in the box of stars below the step header
+            i, step_labels, values = start + 1, [], []
+            while '***' not in self.lines[i]:
+                content = self.lines[i].strip().strip('*').strip()
+                if content:
+                    label, value = content.rsplit(':', 1)
+                    step_labels.append(' '.join(label.split()))
+                    values.append(float(value))
+                i += 1
+            labels = labels or step_labels
+            coordinates.append(values)
+
+            # The last geometry and energy of each step are those of its optimized structure
+            geom, energy = last(xyz, start, end), last(sp, start, end)
+            block = self._block(geom + 2) if geom is not None else []
+            if block and not atoms:
+                atoms = [line.split()[0] for line in block]
+            blocks.append(block)
+            energies.append(float(self.lines[energy].split()[ENERGY_LINES['sp'][1]]) if energy is not None else np.nan)
+            done.append(last(converged, start, end) is not None)
+
+        geometries = np.full((len(steps), len(atoms), 3), np.nan)
+        for step, block in enumerate(blocks):
+            if not block:
+                continue
+            if len(block) != len(atoms):
+                raise ValueError(f'Scan step {step + 1} has {len(block)} atoms instead of {len(atoms)}')
+            geometries[step] = np.array(''.join(block).split()).reshape(-1, 4)[:, 1:].astype(float)
+
+        return Scan(atoms, labels, coordinates, energies, geometries, done)
+
+    @cached_property
+    def completed(self):
+        """The output shows successful completion"""
+        return next(reversed(self.lines), '')[:14] == 'TOTAL RUN TIME'
@@ -261,7 +261,7 @@ class RY(Orbital):
 
 class RYs(Orbital):
     """Rydberg* Orbital"""
-    def __init__(self):
+    def __init__(self, occupation, atom, atom_n):
         super().__init__(occupation, atom, atom_n)
         self.type = "RY*"
 
@@ -371,7 +371,8 @@ class NBOSet:
                 idx, occup, nbo_type, *other = line.split()
                 idx = int(idx[:-1])
                 occup = float(occup[1:-1])
-                nbo_type = nbo_type.strip('(')
+                # Numbers above 9 are not separated from the type, e.g. RY*(10)
+                nbo_type = nbo_type.split('(')[0]
 
                 atom_re = ' ?(\w{1,2})\s+(\d+)'
                 hybridicity_regex = '(\w)\s*(\d+\.\d+)\(\s*(\d+\.\d+)'
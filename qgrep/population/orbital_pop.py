@@ -5,6 +5,8 @@ import numpy as np
 from re import search
 from copy import deepcopy
 
+from ..compression import open_file
+
 am_types = 'spdfghi'
 
 
@@ -221,7 +223,7 @@ Three blank lines
         else:
             raise NotImplementedError('Only Löwdin Reduced Orbital Population Analysis is implemented')
 
-        with open(file_name) as f:
+        with open_file(file_name) as f:
             output = f.read()
         matches = re.findall(orb_pop_re, output, re.MULTILINE + re.DOTALL)
 
@@ -0,0 +1,181 @@
+"""
+Optional timing of the phases (detect, read, parse, convert, render, ...) of a run
+
+Enabled by setting QGREP_PROFILE to the JSON file the report is written to
+when the process exits. Setting QGREP_CPROFILE as well dumps a cProfile of
+the whole run to that file (view it with python -m pstats or snakeviz).
+When QGREP_PROFILE is not set, phase() returns a shared no-op context and
+timed() returns the function unchanged, so instrumented code runs as before.
+"""
+import os
+import sys
+import time
+import json
+import atexit
+
+from functools import wraps
+from contextlib import nullcontext
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+REPORT = os.environ.get('QGREP_PROFILE', '')
+CPROFILE = os.environ.get('QGREP_CPROFILE', '')
+ENABLED = bool(REPORT)
+
+_null = nullcontext()
+# {name: [count, wall, cpu, peak rss growth, peak rss]}
+_phases = {}
+# Names of the phases currently running
+_active = set()
+_start = (time.perf_counter(), time.process_time())
+_profiler = None
+
+
+def phase(name):
+    """
+    Context manager that records the time spent in a named phase
+        with phase('parse'):
+            ...
+    Phases may be nested, the time of a phase includes that of the phases inside it.
+    A phase nested in one of the same name is not recorded separately.
+    :param name: name of the phase
+    """
+    if not ENABLED:
+        return _null
+    return _Phase(name)
+
+
+def timed(name):
+    """
+    Decorator that records every call of a function as a phase
+    :param name: name of the phase
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _Phase:
+    """Records the wall time, CPU time and growth of the peak memory of a phase"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.nested = self.name in _active
+        if self.nested:
+            return self
+        _active.add(self.name)
+        self.peak = peak_memory()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *args):
+        if self.nested:
+            return
+        _active.discard(self.name)
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        peak = peak_memory()
+        record = _phases.setdefault(self.name, [0, 0.0, 0.0, 0, 0])
+        record[0] += 1
+        record[1] += wall
+        record[2] += cpu
+        record[3] = max(record[3], peak - self.peak)
+        record[4] = max(record[4], peak)
+
+
+def peak_memory():
+    """Peak resident memory of the process in bytes (0 if unknown)"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak*1024
+
+
+def startup_time():
+    """
+    Wall time from the start of the process until qgrep was first imported
+    Only available on Linux, returns None elsewhere
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # The command may contain spaces, the fields after it do not
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return max(0.0, uptime - start_ticks/os.sysconf('SC_CLK_TCK') - (time.perf_counter() - _start[0]))
+
+
+def report():
+    """
+    Summary of the recorded phases
+    :return: dictionary that is written as the JSON report
+    """
+    wall = time.perf_counter() - _start[0]
+    phases = {}
+    for name, (count, phase_wall, cpu, growth, peak) in _phases.items():
+        phases[name] = {
+            'count': count,
+            'wall': round(phase_wall, 6),
+            'cpu': round(cpu, 6),
+            'peak_memory_growth': growth,
+            'peak_memory': peak,
+        }
+    return {
+        'argv': sys.argv,
+        'startup': _startup,
+        'total': {
+            'wall': round(wall, 6),
+            'cpu': round(time.process_time(), 6),
+            'peak_memory': peak_memory(),
+        },
+        'phases': phases,
+    }
+
+
+def write_report(file_name=None):
+    """
+    Write the report as JSON
+    :param file_name: where to write (defaults to QGREP_PROFILE)
+    """
+    with open(file_name or REPORT, 'w') as f:
+        json.dump(report(), f, indent=4)
+        f.write('\n')
+
+
+def _finish():
+    """Write the report and cProfile dump at exit (only the process that enabled profiling)"""
+    if os.getpid() != _pid:
+        return
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(CPROFILE)
+    write_report()
+
+
+_pid = os.getpid()
+_startup = None
+if ENABLED:
+    # Includes the interpreter start and everything imported before qgrep
+    _startup = startup_time()
+    if CPROFILE:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    atexit.register(_finish)
@@ -1,94 +1,39 @@
 """Source for all psi4 related functions"""
+import numpy as np
 
+from .profiling import timed
+from .sections import Section, extract_sections, find_starts, register
+from .vibrations import Vibrations
 
+
+GEOMETRY = register('psi4', 'geometry', Section(
+    '\tCartesian Geometry (in Angstrom)\n', end=lambda line: line[:2] != '\t ', units='angstrom'))
+MOLECULE = register('psi4', 'molecule', Section(
+    '    Geometry (in Angstrom),', skip=3, row=lambda line: line.split()[:4], units='angstrom'))
+VIBRATIONS = register('psi4', 'vibrations', Section('  ==> Harmonic Vibrational Analysis <==', rows=0))
+NORMAL_MODES = register('psi4', 'normal_modes', Section('\tNormal Modes (mass-weighted).', rows=0))
+
+
+@timed('parse')
 def get_geom(lines, geom_type='xyz', units='Angstroms'):
-    """Takes the lines of an psi4 output file and returns its last geometry"""
-    # noinspection PyPep8
-    if geom_type == 'xyz':
-        start = '\tCartesian Geometry (in Angstrom)\n'
-        end = '\t\t\t OPTKING Finished Execution \n'
-
-        geom_end = 0
-        for i in reversed(list(range(len(lines)))):
-            if end == lines[i]:
-                if lines[i-2] == '    Saving final (previous) structure.':
-                    geom_end = i - 2
-                else:
-                    geom_end = i - 1
-                break
-        if geom_end == 0:
-            return ''
-
-        geom_start = 0
-        # Iterate backwards until the beginning of the last set of coordinates is found
-        for i in reversed(list(range(geom_end))):
-            if start == lines[i]:
-                geom_start = i + 1
-                break
-        if geom_start == 0:
-            return ''
-
-        geom = lines[geom_start: geom_end]
-
-        return geom
-
-    elif geom_type == 'zmat':
-        start = '    Geometry (in Angstrom),'
-
-        geom_start = 0
-        # Iterate backwards until the beginning of the last set of coordinates is found
-        for i in reversed(range(len(lines))):
-            if start == lines[i][:27]:
-                geom_start = i + 2
-                break
-        if geom_start == 0:
-            return ''
-
-        geom_end = 0
-        for i, line in enumerate(lines[geom_start:], start=geom_start):
-            if line == '\n':
-                geom_end = i
-                break
-        if geom_end == 0:
-            return ''
-
-        geom = lines[geom_start: geom_end]
-
-        return geom
+    """
+    Takes the lines of an psi4 output file and returns its last geometry
+    :param geom_type: xyz for the optimizer geometries, zmat for the geometry of the molecule
+    """
+    name = {'xyz': 'geometry', 'zmat': 'molecule'}.get(geom_type)
+    if name is None:
+        return ''
+    geoms = extract_sections(lines, 'psi4', [name], last=True)[name]
+    if not geoms:
+        return ''
+    return ['\t'.join(row) + '\n' for row in geoms[0]]
 
 
 def plot(lines, geom_type='xyz'):
     """Plots the geometries from the optimization steps"""
-    start = '\tCartesian Geometry (in Angstrom)\n'
-    end = '\t\t\t OPTKING Finished Execution \n'
-
-    geoms_start = []
-    geoms_end = []
-    for i in range(len(lines)):
-        if start == lines[i]:
-            geoms_start.append(i + 1)
-        if end == lines[i]:
-            geoms_end.append(i - 1)
-
-    # Last optimization step has an extra line after it
     geoms = []
-    length = geoms_end[0] - geoms_start[0]
-    last = False
-    for i in range(len(geoms_start)):
-        if i == len(geoms_start) - 1 and completed(lines):
-            last = True
-
-        start = geoms_start[i]
-        end = geoms_end[i]
-        if end - start != length:
-            length = end - start
-
-        geom = f'{length}\nStep {i}\n'
-
-        for line in lines[start:end - int(last)]:
-            geom += '\t'.join(line.split()) + '\n'
-
-        geoms.append(geom)
+    for i, geom in enumerate(extract_sections(lines, 'psi4', ['geometry'])['geometry']):
+        geoms.append(f'{len(geom)}\nStep {i}\n' + ''.join('\t'.join(row) + '\n' for row in geom))
 
     return geoms
 
@@ -105,103 +50,151 @@ def check_convergence(lines):
 
 
 def get_freqs(lines):
-    """
-    Returns all the frequencies and geometries in xyz format
-
-    Model of vibrational output for an N atom molecule
-
-            0    1    ...        5
-    atom1x    #    #    ...        #
-    atom1y    #    #    ...        #
-    atom1z    #    #    ...        #
-    atom2x    #    #    ...        #
-    atom2y    #    #    ...        #
-    atom2z    #    #    ...        #
-    ...
-    atomNz    #    #    ...        #
-            6    7    ...        11
-    atom1x    #    #    ...        #
-    atom1y    #    #    ...        #
-    atom1z    #    #    ...        #
-    atom2x    #    #    ...        #
-    atom2y    #    #    ...        #
-    atom2z    #    #    ...        #
-    ...
-    atomNz    #    #    ...        #
-    ...
-    """
-
-    geometries = plot(lines)
+    """Returns all the frequencies and geometries in xyz format"""
+    vibrations = get_vibrations(lines)
+    if vibrations is None:
+        return ''
+    # Psi4 only prints the vibrations, not the translations and rotations
+    return vibrations.xyz(start=0)
 
-    # Find the coordinates of the vibrational modes
-    vibrations_start = 0
-    vib_modes_start = 0
-    vib_modes_end = 0
-    for i in reversed(list(range(len(lines)))):
-        if 'The first frequency considered to be a vibration is ' == lines[i][0:52]:
-            vibrations_start = int(lines[i][52:].strip())
 
-        if 'IR SPECTRUM\n' == lines[i]:
-            vib_modes_end = i - 3
-        if 'NORMAL MODES\n' == lines[i]:
-            vib_modes_start = i + 7
+@timed('parse')
+def get_vibrations(lines):
+    """
+    Reads the last harmonic vibrational analysis
+    :param lines: lines of the output file (list or LazyLines)
+    :return: Vibrations (with the last geometry printed before the analysis), None if there are no frequencies
+    """
+    starts = find_starts(lines, 'psi4', ['vibrations', 'normal_modes', 'molecule'])
+    analyses = [(start, _parse_vibanal) for start in starts['vibrations'][-1:]]
+    analyses += [(start, _parse_normal_modes) for start in starts['normal_modes'][-1:]]
+    if not analyses:
+        return None
+    start, parse = max(analyses)
+    parsed = parse(lines, start)
+    if parsed is None:
+        return None
+    atoms, frequencies, displacements, intensities, reduced_masses = parsed
+
+    geometry = np.full((len(atoms), 3), np.nan)
+    molecules = [i for i in starts['molecule'] if i < start]
+    if molecules:
+        rows = MOLECULE.read(lines, molecules[-1])
+        if rows is not None and len(rows) == len(atoms):
+            geometry = np.array([xyz for atom, *xyz in rows], dtype=float)
+
+    return Vibrations(atoms, geometry, frequencies, displacements.reshape(len(frequencies), -1),
+                      intensities, reduced_masses)
+
+
+def _frequencies(values):
+    """Frequencies from their printed values, imaginary ones (123.4567i) are negative"""
+    return np.array([-float(value[:-1]) if value.endswith('i') else float(value) for value in values])
+
+
+def _parse_vibanal(lines, start):
+    """
+    Parse the vibrational analysis of Psi4 1.x
+
+    The modes are printed three at a time, a row per property followed by a
+    row per atom with the x, y, z displacements of each mode
+
+      Vibration                       7                   8                   9
+      Freq [cm^-1]                1776.3454           3833.3551           3946.5363
+      Reduced mass [u]              1.0825              1.0453              1.0812
+      IR activ [km/mol]            74.5285              1.7085             21.0427
+      ...
+      -------------------------------------------------------------------------------
+          1   O               -0.00 -0.00 -0.07     0.00 -0.00  0.05    -0.07 -0.00 -0.00
+          2   H               -0.00  0.42  0.56    -0.00 -0.58 -0.40     0.56  0.00  0.43
+
+    The atom rows of each block are read into an array at once.
+    :return: atoms, frequencies, (nmodes, natoms, 3) displacements, IR intensities
+             and reduced masses (None when not printed), None if there are no finished blocks
+    """
+    i = start + 1
+    while i < len(lines) and not lines[i].startswith('  Vibration '):
+        i += 1
+    properties = {}
+    blocks = []
+    atoms = []
+    while i < len(lines) and lines[i].startswith('  Vibration '):
+        columns = len(lines[i].split()) - 1
+        i += 1
+        while i < len(lines) and not lines[i].startswith('  ---'):
+            values = lines[i].split()
+            # Rows without a value per mode (e.g. an empty Irrep row) are skipped
+            if len(values) > columns:
+                properties.setdefault(' '.join(values[:-columns]), []).extend(values[-columns:])
+            i += 1
+        end = i + 1
+        while end < len(lines) and lines[end].strip():
+            end += 1
+        if end >= len(lines):
+            # Unfinished block
             break
-
-    vibrations_start = 0
-
-    vibrations = lines[vib_modes_start:vib_modes_end]
-    modes = []
-    """modes list to be ordered by mode number
-    [
-        [       #mode0
-            (atom1_x,y,z),(atom2_x,y,z),...
-       ],
-        [       #mode1
-            (atom1_x,y,z),(atom2_x,y,z),...
-       ],
-        ...
-   ]
+        # Split off the atom number and symbol, and convert the displacements in one go
+        rows = [line.split(None, 2) for line in lines[i + 1:end]]
+        atoms = [atom for number, atom, values in rows]
+        values = np.array(' '.join(values for number, atom, values in rows).split(), dtype=float)
+        blocks.append(values.reshape(len(rows), columns, 3).transpose(1, 0, 2))
+        i = end + 1
+    if not blocks:
+        return None
+
+    displacements = np.concatenate(blocks)
+    nmodes = len(displacements)
+    intensities = properties.get('IR activ [km/mol]')
+    reduced_masses = properties.get('Reduced mass [u]')
+    if intensities is not None:
+        intensities = np.array(intensities[:nmodes], dtype=float)
+    if reduced_masses is not None:
+        reduced_masses = np.array(reduced_masses[:nmodes], dtype=float)
+    return atoms, _frequencies(properties['Freq [cm^-1]'][:nmodes]), displacements, intensities, reduced_masses
+
+
+def _parse_normal_modes(lines, start):
     """
+    Parse the (mass-weighted) normal modes of Psi4 4.0, printed one mode at a time
 
-    num_atoms = len(geometries[-1])
-    print(geometries)
-    print(num_atoms)
-    for i in range(0, len(vibrations), 3 * num_atoms + 1):
-        coords = []
-        for j in range(0, 3 * num_atoms, 3):
-            x = vibrations[i + j + 1].split()[1:]
-            y = vibrations[i + j + 2].split()[1:]
-            z = vibrations[i + j + 3].split()[1:]
-            # the xyz coordinates for atom1 across the vibrations (up to 6)
-            xyz = list(zip(x, y, z))
-            coords.append(xyz)
-            # mode0    mode1    ...    mode5
-            # atom1 xyz = [(x,y,z),(x,y,z), ...]
-            # atom2 xyz = [(x,y,z),(x,y,z), ...]
-            # ...
-        num_modes = len(coords[0])
-        for j in range(num_modes):
-            mode = []
-            for k in range(num_atoms):
-                mode.append(coords[k][j])
-            modes.append(mode)
-
-    # Apply vibrations to the last geometry
-    geom = geometries[-1]
-    vibrations = []
-    for i in range(len(modes)):
-        mode = modes[i]
-        vibrations.append([f'{num_atoms} Mode: {i}'])
-        for j in range(len(modes[i])):
-            vibrations[i].append(geom[j + 2] + '\t' + '\t'.join(mode[j]))
-
-    output = ''
-    for freq in vibrations[vibrations_start:]:
-        output += '\n'.join(freq) + '\n\n'
-
-    return output
-
+       Frequency:       2170.53
+       Force constant:   0.1783
+             X       Y       Z           mass
+      H        0.000  -0.433  -0.527       1.007825
+      O        0.000   0.000   0.264      15.994915
 
+    Every block has the same number of rows, so all of them are read into an array at once.
+    :return: atoms, frequencies, (nmodes, natoms, 3) displacements, None, None
+             (None if there are no finished modes)
+    """
+    first = start
+    while first < len(lines) and not lines[first].startswith('   Frequency:'):
+        first += 1
+    end = first + 3
+    while end < len(lines) and lines[end].strip():
+        end += 1
+    if end >= len(lines):
+        return None
+    natoms = end - first - 3
+    # Frequency, force constant, header, atom rows and a blank line
+    stride = natoms + 4
+    frequencies = []
+    for i in range(first, len(lines) - stride + 1, stride):
+        if not lines[i].startswith('   Frequency:'):
+            break
+        frequencies.append(lines[i].split()[1])
+    nmodes = len(frequencies)
+    if not nmodes:
+        return None
+    rows = [line.split(None, 1) for i in range(first, first + nmodes*stride, stride)
+            for line in lines[i + 3:i + 3 + natoms]]
+    atoms = [atom for atom, values in rows[:natoms]]
+    # x, y, z and the mass of each atom
+    values = np.array(' '.join(values for atom, values in rows).split(), dtype=float).reshape(nmodes, natoms, 4)
+    return atoms, _frequencies(frequencies), values[:, :, :3], None, None
+
+
+@timed('parse')
 def get_energy(lines, energy_type='sp'):
     """
     WARNING: It returns as a string in order to prevent python from rounding
@@ -214,6 +207,7 @@ def get_energy(lines, energy_type='sp'):
         print('Energy type not yet supported')
 
 
+@timed('parse')
 def get_energies(lines, energy_type='sp'):
     """
     Returns the energies of an optimization
@@ -241,7 +235,7 @@ def template(geom='', jobtype='opt', theory='B3LYP-D3', basis='def2-svp', freq=F
 
 def completed(lines):
     '''Determine if the program has completed successfully'''
-    if lines[-1] == '*** PSI4 exiting successfully. Buy a developer a beer!\n':
+    if next(reversed(lines), '') == '*** PSI4 exiting successfully. Buy a developer a beer!\n':
         return True
     else:
         return False
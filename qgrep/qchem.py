@@ -1,32 +1,24 @@
 """Source for all qchem related functions"""
 from os import path
 
+from .helper import join_lines
+from .sections import Section, extract_sections, find_starts, register
 
-def get_geom(lines, geom_type='xyz', units='Angstrom'):
-    start = 'Standard Nuclear Orientation (Angstroms)'
-    end = 'Molecular Point Group'
-
-    geom_end = 0
-    # Iterate backwards until the end last set of coordinates is found
-    for i in reversed(list(range(len(lines)))):
-        if end in lines[i]:
-            geom_end = i - 1
-            break
-    if geom_end == 0:
-        return ''
 
-    geom_start = 0
-    # Iterate backwards until the beginning of the last set of coordinates is found
-    for i in reversed(list(range(geom_end))):
-        if start in lines[i]:
-            geom_start = i + 3
-            break
-    if geom_start == 0:
-        return ''
+# The indentation of the headers differs between versions
+GEOMETRY = register('qchem', 'geometry', Section(
+    'Standard Nuclear Orientation (Angstroms)', skip=2, end=lambda line: line.lstrip()[:3] == '---',
+    row=lambda line: line.split()[1:], units='angstrom', indented=True))
+CONVERGENCE = register('qchem', 'convergence', Section(
+    'Maximum     Tolerance    Cnvgd?', rows=3, row=str, indented=True))
 
-    geom = ['\t'.join(line.split()[1:]) + '\n' for line in lines[geom_start:geom_end]]
 
-    return geom
+def get_geom(lines, geom_type='xyz', units='Angstrom'):
+    """Takes the lines of a qchem output file and returns its last geometry"""
+    geoms = extract_sections(lines, 'qchem', ['geometry'], last=True)['geometry']
+    if not geoms:
+        return ''
+    return ['\t'.join(row) + '\n' for row in geoms[0]]
 
 
 def plot(lines, geom_type='xyz'):
@@ -34,44 +26,16 @@ def plot(lines, geom_type='xyz'):
     if geom_type != 'xyz':
         raise SyntaxError('Only xyz coordinates are currently supported')
 
-    start = 'Standard Nuclear Orientation (Angstroms)'
-    end = 'Molecular Point Group'
-
-    geoms_start = []
-    geoms_end = []
-    for i, line in enumerate(lines):
-        if start in line:
-            geoms_start.append(i + 3)
-        if end in line:
-            geoms_end.append(i - 1)
-
     geoms = []
-    length = geoms_end[0] - geoms_start[0]
-    for i in range(len(geoms_start)):
-        start = geoms_start[i]
-        end = geoms_end[i]
-        # Should probably do some error checking here
-        if not end - start == length:
-            length = end - start
-
-        geom = f'{length}\nStep {i}\n'
-        for line in lines[start:end]:
-            geom += '\t'.join(line.split()[1:]) + '\n'
-
-        geoms.append(geom)
+    for i, geom in enumerate(extract_sections(lines, 'qchem', ['geometry'])['geometry']):
+        geoms.append(f'{len(geom)}\nStep {i}\n' + ''.join('\t'.join(row) + '\n' for row in geom))
 
     return geoms
 
 
 def check_convergence(lines):
     """Returns all the geometry convergence results"""
-    convergence_result = 'Maximum     Tolerance    Cnvgd?'
-    convergence_list = []
-    for i, line in enumerate(lines):
-        if convergence_result in line:
-            convergence_list.append(''.join(lines[i:i + 4]))
-
-    return convergence_list
+    return [join_lines(lines, i, i + 4) for i in find_starts(lines, 'qchem', ['convergence'])['convergence']]
 
 
 def template(geom='', jobtype='Opt', theory='B3LYP', basis='sto-3g'):
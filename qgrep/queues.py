@@ -531,7 +531,8 @@ class Job:
             if (state == 'running' and state2 != 'r') or \
                     (state == 'pending' and state2 != 'qw'):
                 pass
-            return jid, name, state2, owner, queue
+            # The working directory is not part of the SGE xml
+            return jid, name, state2, owner, queue, None
 
         elif grid_engine == 'pbs':
             jid = job_xml.find('Job_Id').text.split('.')[0]
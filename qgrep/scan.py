@@ -0,0 +1,77 @@
+"""Relaxed surface scan results"""
+import numpy as np
+
+from .trajectory import xyz_frames
+
+
+class Scan:
+    """
+    The optimized points of a relaxed surface scan
+    :param atoms: atom symbols
+    :param labels: names of the scanned coordinates (e.g. 'Bond (  5,   0)')
+    :param coordinates: (npoints, ncoordinates) array of the values of the scanned coordinates
+    :param energies: (npoints,) array of the energies of the optimized geometries (nan if there is none yet)
+    :param geometries: (npoints, natoms, 3) array of the optimized geometries in angstrom
+    :param converged: (npoints,) array of whether each optimization converged
+    """
+    def __init__(self, atoms, labels, coordinates, energies, geometries, converged):
+        self.atoms = list(atoms)
+        self.labels = list(labels)
+        self.coordinates = np.asarray(coordinates, dtype=float).reshape(-1, len(self.labels))
+        self.energies = np.asarray(energies, dtype=float)
+        self.geometries = np.asarray(geometries, dtype=float).reshape(-1, len(self.atoms), 3)
+        self.converged = np.asarray(converged, dtype=bool)
+
+    def __len__(self):
+        """Number of points"""
+        return len(self.energies)
+
+    def __str__(self):
+        out = ' '.join(f'{label:>16}' for label in self.labels) + '        Energy  Converged\n'
+        for coordinates, energy, converged in zip(self.coordinates, self.energies, self.converged):
+            out += ' '.join(f'{value:16.8f}' for value in coordinates) + f' {energy:16.8f}  {"yes" if converged else "no"}\n'
+        return out
+
+    def xyz(self):
+        """Multi-frame xyz of the optimized geometries, labelled with the coordinates and energy"""
+        comments = (', '.join(f'{label}: {value:.8f}' for label, value in zip(self.labels, coordinates))
+                    + f', E: {energy:.8f}' for coordinates, energy in zip(self.coordinates, self.energies))
+        return ''.join(xyz_frames(self.atoms, self.geometries, comments))
+
+
+def stack(scans, names=None):
+    """
+    Stack scans into one dataset, shorter scans and smaller molecules are padded with nan
+    :param scans: list of Scans
+    :param names: name of each scan (e.g. its file name)
+    :return: {'names': (nscans,), 'atoms': (nscans, natoms) ('' when padded), 'labels': (nscans, ncoordinates),
+              'coordinates': (nscans, npoints, ncoordinates), 'energies': (nscans, npoints),
+              'geometries': (nscans, npoints, natoms, 3), 'converged': (nscans, npoints)}
+    """
+    if names is None:
+        names = [str(i) for i in range(len(scans))]
+    npoints = max((len(scan) for scan in scans), default=0)
+    natoms = max((len(scan.atoms) for scan in scans), default=0)
+    ncoordinates = max((len(scan.labels) for scan in scans), default=0)
+
+    data = {
+        'names': np.array(names, dtype=str),
+        'atoms': np.full((len(scans), natoms), '', dtype=object),
+        'labels': np.full((len(scans), ncoordinates), '', dtype=object),
+        'coordinates': np.full((len(scans), npoints, ncoordinates), np.nan),
+        'energies': np.full((len(scans), npoints), np.nan),
+        'geometries': np.full((len(scans), npoints, natoms, 3), np.nan),
+        'converged': np.zeros((len(scans), npoints), dtype=bool),
+    }
+    for i, scan in enumerate(scans):
+        n, m, k = len(scan), len(scan.atoms), len(scan.labels)
+        data['atoms'][i, :m] = scan.atoms
+        data['labels'][i, :k] = scan.labels
+        data['coordinates'][i, :n, :k] = scan.coordinates
+        data['energies'][i, :n] = scan.energies
+        data['geometries'][i, :n, :m] = scan.geometries
+        data['converged'][i, :n] = scan.converged
+    # Plain string arrays can be saved without pickling
+    data['atoms'] = data['atoms'].astype(str)
+    data['labels'] = data['labels'].astype(str)
+    return data
@@ -0,0 +1,239 @@
+"""Declarative sections of output files, extracted together in a single pass"""
+import importlib
+import numpy as np
+
+from collections import OrderedDict
+from functools import cached_property
+from itertools import islice
+
+from .helper import BOHR_TO_ANGSTROM, LazyLines, find_lines, iter_tail
+from .profiling import timed
+
+# {program: {name: Section}}, filled in by the program modules (see register)
+SECTIONS = {}
+
+
+class Section:
+    """
+    Declarative description of a block of lines in an output file
+    :param start: the line that starts the section begins with this
+    :param skip: number of lines between the start line and the first row
+    :param end: the line after the last row begins with this, or a function that returns True for it
+    :param rows: fixed number of rows (instead of an end)
+    :param row: function that parses a row (defaults to splitting it)
+    :param units: units of the coordinates in the rows (bohr or angstrom), for geometries
+    :param indented: the start line may be indented by any amount (start is given without the
+                     indentation), for headers whose indentation changes between program versions
+    """
+    def __init__(self, start, skip=0, end='\n', rows=None, row=str.split, units=None, indented=False):
+        self.start = start
+        self.skip = skip
+        self.end = end
+        self.rows = rows
+        self.row = row
+        self.units = units
+        self.indented = indented
+
+    def is_end(self, line):
+        """The line ends the section"""
+        return self.end(line) if callable(self.end) else line.startswith(self.end)
+
+    def read(self, lines, start):
+        """
+        Parse an occurrence of the section
+        :param lines: lines of the output
+        :param start: index of the start line of the occurrence
+        :return: list of the parsed rows, None if the section is not finished
+        """
+        return self.parse(lines[i] for i in range(start, len(lines)))
+
+    def parse(self, lines):
+        """
+        Parse an occurrence of the section from an iterator over its lines
+        :param lines: iterator beginning with the start line
+        :return: list of the parsed rows, None if the section is not finished
+        """
+        lines = islice(lines, 1 + self.skip, None)
+        if self.rows is not None:
+            rows = [self.row(line) for line in islice(lines, self.rows)]
+            return rows if len(rows) == self.rows else None
+        rows = []
+        for line in lines:
+            if self.is_end(line):
+                return rows
+            rows.append(self.row(line))
+        return None
+
+
+def register(program, name, section):
+    """
+    Register a section of the outputs of a program
+    :param program: name of the program (as returned by helper.check_program)
+    :param name: name of the section (e.g. geometry)
+    :param section: Section
+    :return: the section
+    """
+    SECTIONS.setdefault(program, {})[name] = section
+    return section
+
+
+def registered(program, names=None):
+    """
+    The registered sections of a program, importing its module to register them if needed
+    :param names: names of the sections (defaults to all of them)
+    :return: {name: Section}
+    """
+    if program not in SECTIONS:
+        importlib.import_module(f'.{program}', __package__)
+    specs = SECTIONS.get(program, {})
+    if names is None:
+        return dict(specs)
+    return {name: specs[name] for name in names}
+
+
+def find_starts(lines, program, names=None):
+    """
+    Find the start lines of all of the sections in a single pass (see helper.find_lines)
+    :param lines: lines of an output (list or LazyLines)
+    :param program: program that wrote the output
+    :param names: sections to find (defaults to all of them)
+    :return: {name: line numbers of the start of each occurrence}
+    """
+    specs = registered(program, names)
+    found = find_lines(lines, list({section.start for section in specs.values() if not section.indented}),
+                       list({section.start for section in specs.values() if section.indented}))
+    return {name: found[section.start] for name, section in specs.items()}
+
+
+def extract_sections(lines, program, names=None, last=False):
+    """
+    Extract sections of an output, the start lines of all of the sections are
+    found together in one pass and only the lines of the sections are then read
+    :param lines: lines of an output (list or LazyLines)
+    :param program: program that wrote the output
+    :param names: sections to extract (defaults to all of them)
+    :param last: only read the last finished occurrence of each section, which
+                 is searched for backwards from the end (see helper.iter_tail)
+    :return: {name: list of the parsed rows of each occurrence}
+    """
+    specs = registered(program, names)
+    found, starts = {}, None
+    for name, section in specs.items():
+        if last:
+            tail = iter_tail(lines, section.start, section.indented)
+            block = section.parse(tail) if tail is not None else None
+            if tail is None or block is not None:
+                found[name] = [block] if block is not None else []
+                continue
+        # Every occurrence, or an earlier one if the last is not finished
+        if starts is None:
+            starts = find_starts(lines, program, list(specs))
+        blocks = []
+        for start in reversed(starts[name]) if last else starts[name]:
+            block = section.read(lines, start)
+            if block is None:
+                continue
+            blocks.append(block)
+            if last:
+                break
+        found[name] = blocks
+    return found
+
+
+def to_trajectory(blocks, section):
+    """
+    Convert the blocks of a geometry section (with rows of atom, x, y, z) to arrays
+    :return: atoms, (nsteps, natoms, 3) array of the coordinates in angstrom
+    """
+    if not blocks:
+        return [], np.zeros((0, 0, 3))
+    natoms = len(blocks[0])
+    for step, block in enumerate(blocks):
+        if len(block) != natoms:
+            raise ValueError(f'Step {step} has {len(block)} atoms instead of {natoms}')
+    geoms = np.array([row[:4] for block in blocks for row in block]).reshape(len(blocks), natoms, 4)
+    scale = BOHR_TO_ANGSTROM if section.units == 'bohr' else 1
+    return geoms[0, :, 0].tolist(), geoms[:, :, 1:].astype(float)*scale
+
+
+def trajectory(lines, program, name='geometry', last=False):
+    """
+    Geometries of an output as arrays
+    :param name: name of a geometry section
+    :param last: only the last geometry
+    :return: atoms, (nsteps, natoms, 3) array of the coordinates in angstrom
+    """
+    return to_trajectory(extract_sections(lines, program, [name], last)[name], registered(program, [name])[name])
+
+
+class LazyOutput:
+    """
+    Lazily parsed output, subclassed by the program modules
+    The first property that needs a section builds an index of the line numbers
+    of every header in HEADERS in a single pass (see helper.find_lines). Each
+    property then only reads the lines it needs and is cached, so asking for
+    many of them costs about one scan of the file. Properties that only need
+    the last occurrence of a section use last, which searches backwards from
+    the end of the file unless the index has already been built.
+    :param output: name of the output file, or its lines (list or LazyLines)
+    """
+    # {section: start of its header lines, or a tuple of starts}
+    HEADERS = {}
+
+    def __init__(self, output):
+        self._owned = isinstance(output, str)
+        self.lines = LazyLines(output) if self._owned else output
+        self.file_name = output if self._owned else getattr(output, 'file_name', None)
+
+    @classmethod
+    def of(cls, lines):
+        """
+        The output of some lines, shared by all calls with the same LazyLines
+        Lists may be changed in place, so each call gets a new output.
+        """
+        if isinstance(lines, cls):
+            return lines
+        if isinstance(lines, LazyLines):
+            output = lines.outputs.get(cls)
+            if output is None:
+                output = lines.outputs[cls] = cls(lines)
+            return output
+        return cls(lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Release the file if it was opened by the output"""
+        if self._owned:
+            self.lines.close()
+
+    @staticmethod
+    def _starts(header):
+        """The starts of the lines of a header as a tuple"""
+        return (header,) if isinstance(header, str) else tuple(header)
+
+    @cached_property
+    @timed('parse')
+    def index(self):
+        """{section: line numbers of each of its headers}"""
+        starts = OrderedDict((name, self._starts(header)) for name, header in self.HEADERS.items())
+        found = find_lines(self.lines, list({start for names in starts.values() for start in names}))
+        return OrderedDict((name, sorted(i for start in names for i in found[start])) for name, names in starts.items())
+
+    def last(self, name):
+        """
+        Iterator over the lines from the last header of a section to the end of
+        the output, None if there is none
+        Found with the index if it has already been built, otherwise by searching
+        backwards from the end (see helper.iter_tail), so only the tail is read.
+        """
+        if 'index' in self.__dict__:
+            if not self.index[name]:
+                return None
+            lines = self.lines
+            return (lines[i] for i in range(self.index[name][-1], len(lines)))
+        return iter_tail(self.lines, self._starts(self.HEADERS[name]))
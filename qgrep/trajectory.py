@@ -0,0 +1,42 @@
+"""Multi-frame xyz rendering of trajectories (optimizations, scans, ...)"""
+
+
+def xyz_frames(atoms, trajectory, comments=None, atom_form='%s', coord_form='\t%.6f', end=''):
+    """
+    Generates the frames of a multi-frame xyz one at a time
+    :param atoms: atom symbols
+    :param trajectory: (nsteps, natoms, 3) array of coordinates
+    :param comments: comment line of each frame (defaults to Step i)
+    :param atom_form: %-format of the atom symbol
+    :param coord_form: %-format of each coordinate (including the separator)
+    :param end: appended to every frame
+    """
+    natoms = len(atoms)
+    # The atoms are the same in every frame, so only the coordinates are formatted per step
+    template = ''.join((atom_form % atom).replace('%', '%%') + coord_form*3 + '\n' for atom in atoms)
+    if comments is None:
+        comments = (f'Step {i}' for i in range(len(trajectory)))
+    for comment, frame in zip(comments, trajectory):
+        yield f'{natoms}\n{comment}\n' + template % tuple(frame.ravel().tolist()) + end
+
+
+def ragged_xyz_frames(frames, comments=None, **forms):
+    """
+    Generates the frames of a multi-frame xyz whose atoms change between frames
+    :param frames: (atoms, (natoms, 3) array of coordinates) of each frame
+    :param comments: comment line of each frame (defaults to Step i)
+    :param forms: formatting options of xyz_frames
+    """
+    if comments is None:
+        comments = (f'Step {i}' for i in range(len(frames)))
+    for comment, (atoms, frame) in zip(comments, frames):
+        yield from xyz_frames(atoms, [frame], [comment], **forms)
+
+
+def write_xyz(file_name, atoms, trajectory, comments=None, **forms):
+    """
+    Streams a trajectory to a multi-frame xyz file, one frame at a time
+    :param forms: formatting options of xyz_frames
+    """
+    with open(file_name, 'w') as f:
+        f.writelines(xyz_frames(atoms, trajectory, comments, **forms))
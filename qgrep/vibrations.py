@@ -0,0 +1,48 @@
+"""Harmonic vibrational analysis results"""
+import numpy as np
+
+
+class Vibrations:
+    """
+    Frequencies, normal modes and IR intensities of a molecule
+    :param atoms: atom symbols
+    :param geometry: (N, 3) array of coordinates in angstrom
+    :param frequencies: (M,) array of frequencies in cm^-1 (M = 3N for ORCA, including translations and rotations)
+    :param modes: (M, 3N) array, modes[i] holds the cartesian displacements (x1, y1, z1, x2, ...) of mode i
+    :param intensities: (M,) array of IR intensities (zero for modes without one)
+    :param reduced_masses: (M,) array of reduced masses in amu (None if they are not printed)
+    """
+    def __init__(self, atoms, geometry, frequencies, modes, intensities=None, reduced_masses=None):
+        self.atoms = list(atoms)
+        self.geometry = np.asarray(geometry, dtype=float)
+        self.frequencies = np.asarray(frequencies, dtype=float)
+        self.modes = np.asarray(modes, dtype=float)
+        if intensities is None:
+            intensities = np.zeros(len(self.frequencies))
+        self.intensities = np.asarray(intensities, dtype=float)
+        self.reduced_masses = None if reduced_masses is None else np.asarray(reduced_masses, dtype=float)
+
+    def __len__(self):
+        """Number of modes"""
+        return len(self.frequencies)
+
+    def __str__(self):
+        return self.xyz()
+
+    def displacements(self, i=None):
+        """(N, 3) array of the displacements of each atom in mode i, (modes, N, 3) array of all of them if i is None"""
+        if i is None:
+            return self.modes.reshape(len(self), -1, 3)
+        return self.modes[i].reshape(-1, 3)
+
+    def xyz(self, start=6):
+        """
+        Multi-frame xyz of the modes, each atom line holds the coordinates followed by the displacements
+        :param start: first mode to include (skips the translations and rotations by default)
+        """
+        natoms = len(self.atoms)
+        # The geometry is the same in every frame, only the displacements are formatted per mode
+        frame = ''.join(f'{atom}\t{x:.6f}\t{y:.6f}\t{z:.6f}\t'.replace('%', '%%') + '%.6f\t%.6f\t%.6f\n'
+                        for atom, (x, y, z) in zip(self.atoms, self.geometry))
+        return ''.join(f'{natoms}\n{freq:.2f} cm^-1\n' + frame % tuple(mode.tolist()) + '\n'
+                       for freq, mode in zip(self.frequencies[start:], self.modes[start:]))
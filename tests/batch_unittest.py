@@ -0,0 +1,29 @@
+import unittest
+
+from sys import path
+
+path.insert(0, '..')
+
+from qgrep.batch import batch_map
+
+
+def square(x, offset=0):
+    print(f'squaring {x}')
+    if x < 0:
+        raise ValueError('negative')
+    return x**2 + offset
+
+
+class TestBatch(unittest.TestCase):
+    def test_batch_map(self):
+        for jobs in [1, 3]:
+            results = list(batch_map(square, [3, -1, 1, 2], 1, jobs=jobs))
+            self.assertEqual([3, -1, 1, 2], [item for item, out, result, error in results])
+            self.assertEqual([10, None, 2, 5], [result for item, out, result, error in results])
+            self.assertEqual('squaring 3\n', results[0][1])
+            self.assertIsNone(results[0][3])
+            self.assertIn('ValueError: negative', results[1][3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from sys import path
+
+path.insert(0, '..')
+
+from qgrep import cache
+
+
+class TestCache(unittest.TestCase):
+    """Tests the parse cache"""
+
+    def setUp(self):
+        self.cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = tempfile.mkdtemp()
+        self.file_name = 'orca/Benzene_freqs.out'
+
+    def tearDown(self):
+        shutil.rmtree(cache.CACHE_DIR)
+        cache.CACHE_DIR = self.cache_dir
+
+    def test_ccread(self):
+        data = cache.ccread(self.file_name)
+        self.assertTrue(os.path.isfile(cache.entry_path(self.file_name)))
+        cached = cache.load(self.file_name)
+        self.assertIsNotNone(cached)
+        for attr in ['atomcoords', 'atomnos', 'scfenergies', 'vibfreqs', 'geovalues']:
+            np.testing.assert_array_equal(getattr(data, attr), getattr(cached, attr))
+        self.assertEqual(data.natom, cached.natom)
+        self.assertEqual(data.optdone, cached.optdone)
+        self.assertEqual(data.metadata['package'], cached.metadata['package'])
+        self.assertEqual(len(data.moenergies), len(cached.moenergies))
+        self.assertEqual(data.writexyz(), cached.writexyz())
+
+    def test_unwritable(self):
+        """The data is still returned when the cache cannot be written"""
+        # The entry cannot replace a directory, after its temporary file is written
+        os.makedirs(cache.entry_path(self.file_name))
+        self.assertEqual(12, cache.ccread(self.file_name).natom)
+        self.assertEqual([os.path.basename(cache.entry_path(self.file_name))], os.listdir(cache.CACHE_DIR))
+
+        # The cache directory cannot be created (its parent is a file)
+        cache_dir = cache.CACHE_DIR
+        open(os.path.join(cache_dir, 'file'), 'w').close()
+        cache.CACHE_DIR = os.path.join(cache_dir, 'file', 'cache')
+        try:
+            self.assertEqual(12, cache.ccread(self.file_name).natom)
+        finally:
+            cache.CACHE_DIR = cache_dir
+
+    def test_invalidate(self):
+        cache.ccread(self.file_name)
+        self.assertIsNone(cache.load(self.file_name, key=['changed']))
+        cache.invalidate(self.file_name)
+        self.assertIsNone(cache.load(self.file_name))
+
+    def test_evict(self):
+        cache.ccread(self.file_name)
+        cache.ccread('orca/H2O_hybrid_hess.out')
+        self.assertEqual(2, len(os.listdir(cache.CACHE_DIR)))
+        cache.evict(0)
+        self.assertEqual(0, len(os.listdir(cache.CACHE_DIR)))
+
+
+if __name__ == '__main__':
+    unittest.main()
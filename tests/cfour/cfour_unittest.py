@@ -29,7 +29,58 @@ class TestCFour(unittest.TestCase):
 
     def test_get_energy(self):
         """Testing get_energy"""
-        raise NotImplementedError
+        # Strings, to prevent rounding
+        self.assertEqual((None, '-75.715550970627', '-75.707782429407', '-75.584718209661247'),
+                         cfour.get_energy(self.files['h2o.out']))
+        self.assertIsNone(cfour.get_final_energy(self.files['h2o.out']))
+        lines = self.files['h2o.out'] + ['  CCSD(T) energy                   -75.123456789\n']
+        self.assertEqual('-75.123456789', cfour.get_final_energy(lines))
+        self.assertEqual(('-75.123456789', '-75.715550970627', '-75.707782429407', '-75.584718209661247'),
+                         cfour.get_energy(lines))
+        summary = cfour.get_summary(lines)
+        self.assertEqual([-75.123456789, -75.715550970627, -75.707782429407, -75.58471820966125],
+                         [summary.energies[name] for name in ['ccsd(t)', 'ccsd', 'mp2', 'scf']])
+
+    def test_get_summary(self):
+        """Testing get_summary"""
+        summary = cfour.get_summary(self.files['h2o.out'])
+        self.assertEqual(('CCSD', '3-21G', 'RHF'), (summary.method, summary.basis, summary.reference))
+        self.assertEqual((0, 1), (summary.charge, summary.multiplicity))
+        self.assertEqual((1e-7, 1e-7, 1e-5, 1e-7, 1e-14),
+                         (summary.scf_conv, summary.cc_conv, summary.geo_conv, summary.lineq_conv, summary.int_thresh))
+        # The old functions return the values as printed
+        self.assertEqual(('0', '1'), (cfour.get_charge(self.files['h2o.out']), cfour.get_multiplicity(self.files['h2o.out'])))
+        self.assertEqual(('7', '7', '5', '7', '0.10E-13'), cfour.get_conv_params(self.files['h2o.out']))
+        self.assertEqual({'AB': 0.05456}, summary.t2_amplitudes)
+        self.assertEqual((5, 5, 1), (summary.nalpha, summary.nbeta, summary.ncore))
+        # sqrt(2*0.0194728674**2/(10 - 2))
+        self.assertAlmostEqual(0.0097364337, summary.t1)
+        self.assertEqual((None, 0.05456, summary.t1), cfour.get_diagnostics(self.files['h2o.out']))
+
+        uhf = [
+            '  The expectation value of S**2 is  0.75312345\n',
+            ' total alpha spin electron number:   5.00000000000000\n',
+            ' total  beta spin electron number:   3.99999999999999\n',
+            '  There are   2 frozen-core orbitals.\n',
+            ' Largest T2 amplitudes for spin case AA:\n',
+            ' -----------------------------------------------------------------------------\n',
+            ' [  4   3  10   8]-0.01000 [  3   4   8  10] 0.02000\n',
+            ' -----------------------------------------------------------------------------\n',
+            ' Largest T2 amplitudes for spin case BB:\n',
+            ' -----------------------------------------------------------------------------\n',
+            ' [  4   3  10   8]-0.07000\n',
+            ' -----------------------------------------------------------------------------\n',
+            ' Norm of T1AA vector (       16 symmetry allowed elements):  0.0300000000.\n',
+            ' Norm of T1BB vector (       16 symmetry allowed elements):  0.0400000000.\n',
+            '  CCSD(T) energy                   -75.123456789\n',
+        ]
+        summary = cfour.get_summary(uhf)
+        self.assertEqual(0.75312345, summary.s2)
+        self.assertEqual('0.75312345', cfour.get_diagnostics(uhf)[0])
+        self.assertEqual({'AA': 0.02, 'BB': 0.07}, summary.t2_amplitudes)
+        self.assertEqual(0.07, summary.max_t2)
+        self.assertAlmostEqual(0.05/5**0.5, summary.t1)
+        self.assertEqual('-75.123456789', cfour.get_final_energy(uhf))
 
     def test_get_freqs(self):
         """Testing get_freqs"""
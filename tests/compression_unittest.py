@@ -0,0 +1,94 @@
+import os
+import bz2
+import gzip
+import lzma
+import shutil
+import tempfile
+import unittest
+
+from sys import path
+
+path.insert(0, '..')
+
+from qgrep import cache, compression
+from qgrep.helper import LazyLines, check_program, read_tail, tail
+
+
+class TestCompression(unittest.TestCase):
+    """Tests reading compressed outputs"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        # Keep the detection memo out of the real cache directory
+        cls.cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = os.path.join(cls.tmp_dir, 'cache')
+        with open('orca/CH3F_Cl_scan.out', 'rb') as f:
+            cls.data = f.read()
+        cls.files = {}
+        for kind, compress in [('gzip', gzip.compress), ('bz2', bz2.compress), ('xz', lzma.compress)]:
+            # No extension, so only the magic bytes can be used
+            cls.files[kind] = cls.write(kind, compress(cls.data))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
+        cache.CACHE_DIR = cls.cache_dir
+
+    @classmethod
+    def write(cls, name, data):
+        file_name = os.path.join(cls.tmp_dir, name)
+        with open(file_name, 'wb') as f:
+            f.write(data)
+        return file_name
+
+    def test_compression(self):
+        for kind, file_name in self.files.items():
+            self.assertEqual(kind, compression.compression(file_name))
+        self.assertIsNone(compression.compression('orca/CH3F_Cl_scan.out'))
+
+    def test_open_file(self):
+        text = self.data.decode()
+        for file_name in self.files.values():
+            with compression.open_file(file_name) as f:
+                self.assertEqual(text, f.read())
+            self.assertEqual('orca', check_program(file_name))
+        self.assertRaises(ValueError, compression.open_file, self.files['gzip'], 'w')
+
+    def test_gzip_index(self):
+        # Multiple members with zero padding between them
+        file_name = self.write('multi.gz', gzip.compress(self.data) + b'\x00'*8 + gzip.compress(self.data))
+        data = self.data*2
+        index = compression.open_index(file_name)
+        index.spacing = 2**16
+        self.assertEqual(data[-100:], index.read(len(data) - 100, len(data)))
+        self.assertEqual(len(data), index.size)
+        self.assertGreater(len(index.checkpoints), 2)
+        for start, end in [(0, 10), (12345, 2345678), (len(data) - 5, len(data) + 5), (2**16 - 1, 2**16 + 1)]:
+            self.assertEqual(data[start:end], index.read(start, end))
+        index.close()
+
+    def test_xz_index(self):
+        # Concatenated streams with stream padding
+        file_name = self.write('multi.xz', lzma.compress(self.data[:1000]) + b'\x00'*4 + lzma.compress(self.data[1000:]))
+        with compression.open_index(file_name) as index:
+            self.assertEqual(2, len(index.blocks))
+            self.assertEqual(len(self.data), index.size)
+            for start, end in [(0, 10), (990, 1010), (12345, 234567), (len(self.data) - 5, len(self.data))]:
+                self.assertEqual(self.data[start:end], index.read(start, end))
+
+    def test_lazy_lines(self):
+        lines = self.data.decode().splitlines(True)
+        start = 'CARTESIAN COORDINATES (ANGSTROEM)\n'
+        for file_name in self.files.values():
+            with LazyLines(file_name) as lazy:
+                self.assertEqual(lines, list(lazy))
+                self.assertEqual(lines[-10:], list(reversed(lazy))[9::-1])
+                self.assertEqual(tail(lines, start), tail(lazy, start))
+                self.assertEqual(len(lines), len(lazy))
+                self.assertEqual(lines[1234], lazy[1234])
+            self.assertEqual(tail(lines, start), read_tail(file_name, start))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import shutil
+import tempfile
 import unittest
 import numpy as np
 
@@ -6,10 +8,20 @@ from numpy.testing import assert_array_almost_equal as aaa_equal
 
 path.insert(0, '..')
 
+from qgrep import cache
 from qgrep.energy_levels import read_energy_levels
 
 
 class EnergyLevels(unittest.TestCase):
+    def setUp(self):
+        # Keep the cache entries out of the real cache directory
+        self.cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(cache.CACHE_DIR)
+        cache.CACHE_DIR = self.cache_dir
+
     def test_read_energy_levels(self):
         levels, homos = read_energy_levels('orca/H2O_hybrid_hess.out', 'eV')
         orbs = [-520.02709244, -26.6515108, -14.03756442, -9.86790946, -7.8383211, 1.14181693,
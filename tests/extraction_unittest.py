@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from sys import path
+
+path.insert(0, '..')
+
+from qgrep import cache
+from qgrep.extraction import extract, extract_cclib, scan_orca, scan_psi4, NATIVE_FIELDS
+
+
+class TestExtraction(unittest.TestCase):
+    """Tests the targeted extraction against a full cclib parse"""
+
+    def setUp(self):
+        # Keep the cache entries out of the real cache directory
+        self.cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(cache.CACHE_DIR)
+        cache.CACHE_DIR = self.cache_dir
+
+    def compare(self, file_name, program):
+        fields = NATIVE_FIELDS[program]
+        native = extract(file_name, fields)
+        full = extract_cclib(file_name, fields, use_cache=False)
+        self.assertEqual(sorted(native), sorted(full))
+        for field in native:
+            np.testing.assert_allclose(np.asarray(native[field], dtype=float),
+                                       np.asarray(full[field], dtype=float))
+
+    def test_orca(self):
+        self.compare('orca/Benzene_freqs.out', 'orca')
+        self.compare('orca/CH3F_Cl_scan.out', 'orca')
+        self.compare('orca/H2O_hybrid_hess.out', 'orca')
+
+    def test_psi4(self):
+        self.compare('psi4_output.dat', 'psi4')
+        with open('psi4_output.dat') as f:
+            lines = f.readlines()
+        self.assertTrue(scan_psi4(lines, ['optdone'])['optdone'])
+        end = next(i for i, line in enumerate(lines) if 'Optimization is complete!' in line)
+        self.assertNotIn('optdone', scan_psi4(lines[:end], ['optdone']))
+        self.assertFalse(scan_psi4(lines[:end] + ['\tOptimizer: Did not converge!\n'], ['optdone'])['optdone'])
+
+    def test_gaussian(self):
+        self.compare('gaussian_output.log', 'gaussian')
+
+    def test_extract(self):
+        data = extract('orca/Benzene_freqs.out', ['scfenergies', 'freeenergy', 'natom'])
+        self.assertAlmostEqual(-232.08944966, data['scfenergies'][-1])
+        self.assertAlmostEqual(-232.01547613, data['freeenergy'])
+        # Fallback to cclib
+        self.assertEqual(12, data['natom'])
+        self.assertEqual({'completed': True}, extract('orca/Benzene_freqs.out', ['completed']))
+
+    def test_orca_boxed(self):
+        """The centred messages are found whatever the width of their box"""
+        lines = ['               *           SCF CONVERGED AFTER   5 CYCLES          *\n',
+                 '      *  SCF CONVERGED AFTER  12 CYCLES  *\n',
+                 ' The SCF CONVERGED AFTER 3 CYCLES is not a line of ORCA\n',
+                 '           *      The optimization did not converge but reached the      *\n',
+                 '           *      maximum number of optimization cycles.                 *\n']
+        self.assertEqual({'scfsteps': [6, 13], 'optdone': False}, scan_orca(lines, ['scfsteps', 'optdone']))
+        self.assertEqual({}, scan_orca(lines[2:3], ['scfsteps', 'optdone']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
+import os
+import gzip
 import unittest
+import numpy as np
 
 from sys import path
+from tempfile import TemporaryDirectory
 
 path.insert(0, '../..')
 
@@ -24,5 +28,41 @@ class TestGamess(unittest.TestCase):
         self.assertEqual(len(checklist), 6)
         self.assertEqual('\n'.join(checklist), ''.join(self.files['CH2_opt.check']).strip())
 
+    def test_get_trajectory(self):
+        """Testing get_trajectory"""
+        atoms, geoms = gamess.get_trajectory(self.files['CH2_opt.out'])
+        self.assertEqual(['C', 'H', 'H'], atoms)
+        self.assertEqual((7, 3, 3), geoms.shape)
+        np.testing.assert_allclose([-0.8627489580, 0, 0.5662358750], geoms[-1, 1])
+
+    def test_read_vec(self):
+        """Testing reading and writing $VEC and $HESS groups"""
+        rng = np.random.default_rng(0)
+        coefficients = rng.uniform(-1, 1, (13, 11))
+        hessian = rng.uniform(-1, 1, (9, 9))
+        vec = gamess.vec_group(coefficients)
+        self.assertEqual(' $VEC\n 1  1', vec[:11])
+        self.assertEqual(3*11 + 2, len(vec.splitlines()))
+        with TemporaryDirectory() as tmpdir:
+            dat_file = os.path.join(tmpdir, 'input.dat')
+            with open(dat_file, 'w') as f:
+                f.write(' $DATA\nC1\n $END\n' + gamess.vec_group(np.zeros((13, 11))) + '\n' + vec + '\n')
+                f.write(gamess.encode_group('HESS', hessian, 'ENERGY IS     -38.8 E(NUC) IS       6.1\n') + '\n')
+                # Unfinished groups are skipped
+                f.write(' $VEC\n 1  1 1.00000000E+00\n')
+            self.assertEqual(vec, gamess.read_group(dat_file, 'VEC'))
+            np.testing.assert_allclose(coefficients, gamess.read_vec(dat_file), atol=1e-8)
+            np.testing.assert_allclose(hessian, gamess.read_hess(dat_file), atol=1e-8)
+            self.assertIsNone(gamess.read_group(dat_file, 'GRAD'))
+
+            with open(dat_file, 'rb') as f, gzip.open(dat_file + '.gz', 'wb') as g:
+                g.write(f.read())
+            np.testing.assert_allclose(coefficients, gamess.read_vec(dat_file + '.gz'), atol=1e-8)
+
+        # Neighbouring negative values are not separated by whitespace
+        values, numbers = gamess.decode_group(' 1  1-1.00000000E+00-2.50000000E-01\n')
+        np.testing.assert_allclose([-1, -0.25], values[0, :2])
+        self.assertEqual([1], numbers.tolist())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,153 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from sys import path
+path.insert(0, '..')
+
+from qgrep import cache, gaussian
+from qgrep.helper import LazyLines
+
+
+CCSD_T = ''' Charge =  1 Multiplicity = 2
+ SCF Done:  E(UHF) =  -75.6271844013     A.U. after   12 cycles
+ E2 =    -0.1345624911D+00 EUMP2 =    -0.75761746892400D+02
+ DE(Corr)= -0.14934027     E(CORR)=     -75.776524675     Delta=-3.61D-06
+ Wavefunction amplitudes converged. E(Corr)=     -75.776525092
+ Time for triples=        0.12 seconds.
+ T4(CCSD)= -0.13527521D-02
+ T5(CCSD)=  0.32587417D-04
+ CCSD(T)= -0.75777845256D+02
+ Error termination via Lnk1e in /opt/g16/l502.exe at Mon Jan  1 00:00:00 2024.
+'''
+
+NOSYMM = '''                          Input orientation:
+ ---------------------------------------------------------------------
+ Center     Atomic      Atomic             Coordinates (Angstroms)
+ Number     Number       Type             X           Y           Z
+ ---------------------------------------------------------------------
+      1          6           0        0.000000    0.000000    0.000000
+      2          8           0        0.000000    0.000000    1.128000
+ ---------------------------------------------------------------------
+'''
+
+
+class TestGaussian(unittest.TestCase):
+    """Tests the gaussian module"""
+
+    def setUp(self):
+        with open('gaussian_output.log') as f:
+            self.lines = f.readlines()
+        # Keep the cache entries out of the real cache directory
+        self.cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(cache.CACHE_DIR)
+        cache.CACHE_DIR = self.cache_dir
+
+    def test_get_geom(self):
+        self.assertEqual(['O  0.000000 0.000000 0.127054',
+                          'H  0.000000 0.762371 -0.508216',
+                          'H  0.000000 -0.762371 -0.508216'], gaussian.get_geom(self.lines))
+
+    def test_get_trajectory(self):
+        # The standard orientation of the three steps and of the frequency calculation
+        atoms, trajectory = gaussian.get_trajectory(self.lines)
+        self.assertEqual(['O', 'H', 'H'], atoms)
+        self.assertEqual((4, 3, 3), trajectory.shape)
+        np.testing.assert_allclose([0, 0.768472, -0.479224], trajectory[1, 1])
+        self.assertEqual(4, len(gaussian.plot(self.lines)))
+
+        # Without symmetry only the input orientation is printed
+        atoms, trajectory = gaussian.get_trajectory(NOSYMM.splitlines(True))
+        self.assertEqual(['C', 'O'], atoms)
+        np.testing.assert_allclose([[[0, 0, 0], [0, 0, 1.128]]], trajectory)
+
+    def test_get_energies(self):
+        energies = gaussian.get_all_energies(self.lines)
+        np.testing.assert_allclose([-74.9629054124, -74.9655902413, -74.9659011917, -74.9659011923], energies['scf'])
+        self.assertEqual('-74.9659011923', gaussian.get_energy(self.lines))
+        self.assertEqual('-74.963531', gaussian.get_energy(self.lines, 'gibbs'))
+        self.assertEqual([0.020002], gaussian.get_energies(self.lines, 'zpve'))
+        self.assertEqual(0, gaussian.get_energy(self.lines, 'mp2'))
+
+        lines = CCSD_T.splitlines(True)
+        self.assertEqual('-0.75761746892400E+02', gaussian.get_energy(lines, 'mp2'))
+        self.assertEqual('-75.776525092', gaussian.get_energy(lines, 'ccsd'))
+        np.testing.assert_allclose([-75.777845256], gaussian.get_energies(lines, 'ccsd(t)'))
+
+    def test_convergence(self):
+        conv = gaussian.convergence(self.lines)
+        self.assertEqual(3, len(conv.steps))
+        np.testing.assert_allclose([0.027029, 0.003108, 0.000079], conv.rms_grad)
+        np.testing.assert_allclose([0.059484, 0.006943, 0.000214], conv.max_step)
+        np.testing.assert_allclose([-74.9655902413 + 74.9629054124, -74.9659011917 + 74.9655902413], conv.delta_e[1:])
+        self.assertTrue(np.isnan(conv.delta_e[0]))
+        self.assertEqual([8, 7, 6], [step.scf_steps for step in conv])
+        np.testing.assert_allclose([0.0003, 0.00045, 0.0012, 0.0018], conv.criteria[1:])
+        # Only the last step converged, on all four criteria
+        self.assertEqual(4, str(conv).count('*'))
+        self.assertEqual(3, len(gaussian.check_convergence(self.lines)))
+
+    def test_get_vibrations(self):
+        # The high precision modes are used when they were printed
+        vibrations = gaussian.get_vibrations(self.lines)
+        self.assertEqual(['O', 'H', 'H'], vibrations.atoms)
+        np.testing.assert_allclose([2170.0330, 4140.0517, 4391.1231], vibrations.frequencies)
+        np.testing.assert_allclose([4.8472, 0.6152, 3.3512], vibrations.intensities)
+        np.testing.assert_allclose([1.0785, 1.0491, 1.0746], vibrations.reduced_masses)
+        np.testing.assert_allclose([[0, 0, 0.07123], [0, -0.43215, -0.56521], [0, 0.43215, -0.56521]],
+                                   vibrations.displacements(0))
+        np.testing.assert_allclose([0, -0.762371, -0.508216], vibrations.geometry[2])
+
+        # Otherwise only the usual block
+        start = next(i for i, line in enumerate(self.lines) if 'Frequencies ---' in line) - 6
+        end = next(i for i, line in enumerate(self.lines) if 'Frequencies -- ' in line) - 6
+        vibrations = gaussian.get_vibrations(self.lines[:start] + self.lines[end:])
+        np.testing.assert_allclose([2170.0330, 4140.0517, 4391.1231], vibrations.frequencies)
+        np.testing.assert_allclose([[0, 0.07, 0], [0, -0.56, 0.43], [0, -0.56, -0.43]], vibrations.displacements(2))
+
+        self.assertEqual(3, gaussian.get_freqs(self.lines).count('cm^-1'))
+        self.assertIsNone(gaussian.get_vibrations(CCSD_T.splitlines(True)))
+
+    def test_completed(self):
+        self.assertTrue(gaussian.completed(self.lines))
+        self.assertFalse(gaussian.completed(CCSD_T.splitlines(True)))
+        self.assertTrue(gaussian.GaussianOutput(self.lines).optimization_done)
+        # The last link decides
+        self.assertFalse(gaussian.completed(self.lines + [' Error termination via Lnk1e\n']))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_name = tmpdir + '/gaussian.log'
+            with open(file_name, 'w') as f:
+                f.writelines(self.lines + [' Error termination via Lnk1e\n'])
+            with gaussian.GaussianOutput(file_name) as output:
+                self.assertFalse(output.completed)
+
+    def test_charge_multiplicity(self):
+        self.assertEqual(0, gaussian.get_charge(self.lines))
+        self.assertEqual(1, gaussian.get_multiplicity(self.lines))
+        self.assertEqual(1, gaussian.get_charge(CCSD_T.splitlines(True)))
+        self.assertEqual(2, gaussian.get_multiplicity(CCSD_T.splitlines(True)))
+
+    def test_gaussian_output(self):
+        # The memory mapped lines give the same results
+        with gaussian.GaussianOutput('gaussian_output.log') as output:
+            self.assertIsInstance(output.lines, LazyLines)
+            np.testing.assert_allclose(gaussian.get_trajectory(self.lines)[1], output.trajectory[1])
+            np.testing.assert_allclose(gaussian.get_vibrations(self.lines).modes, output.vibrations.modes)
+            self.assertEqual(3, len(output.convergence.steps))
+            self.assertTrue(output.completed)
+
+        # The last energy, charge and termination only read the end of the file
+        with LazyLines('gaussian_output.log') as lines:
+            self.assertEqual(gaussian.get_energy(self.lines), gaussian.get_energy(lines))
+            self.assertEqual(0, gaussian.get_charge(lines))
+            self.assertTrue(gaussian.completed(lines))
+            self.assertNotIn('index', gaussian.GaussianOutput.of(lines).__dict__)
+            self.assertIsNone(lines._offsets)
+
+
+if __name__ == '__main__':
+    unittest.main()
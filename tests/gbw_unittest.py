@@ -0,0 +1,102 @@
+import os
+import gzip
+import unittest
+import numpy as np
+
+from sys import path
+from tempfile import TemporaryDirectory
+
+path.insert(0, '..')
+
+from qgrep.gbw import GBW, is_gbw
+from qgrep.energy_levels import read_energy_levels
+
+
+def write_gbw(file_name, orbitals, padding=40):
+    """
+    Write the orbital section of a .gbw file
+    :param orbitals: list of (coefficients with an orbital per column, occupations, energies) for each operator
+    :param padding: bytes between the header and the orbital section (stand in for the geometry and basis)
+    """
+    nbasis = len(orbitals[0][1])
+    data = bytearray(32 + padding)
+    data[24:32] = np.array([32 + padding], dtype='<i8').tobytes()
+    data += np.array([len(orbitals), nbasis], dtype='<i4').tobytes()
+    for coefficients, occupations, energies in orbitals:
+        data += np.asarray(coefficients, dtype='<f8').T.tobytes()
+        data += np.asarray(occupations, dtype='<f8').tobytes() + np.asarray(energies, dtype='<f8').tobytes()
+        data += np.zeros(2*nbasis, dtype='<i4').tobytes()
+    with open(file_name, 'wb') as f:
+        f.write(data)
+
+
+class TestGBW(unittest.TestCase):
+    """Tests the .gbw reader"""
+
+    def setUp(self):
+        self.coefficients = np.arange(9, dtype=float).reshape(3, 3)
+        self.occupations = [2, 2, 0]
+        self.energies = [-20.5, -0.5, 0.25]
+
+    def test_restricted(self):
+        with TemporaryDirectory() as tmpdir:
+            file_name = os.path.join(tmpdir, 'input.gbw')
+            write_gbw(file_name, [(self.coefficients, self.occupations, self.energies)])
+            with GBW(file_name) as gbw:
+                self.assertTrue(gbw.restricted)
+                self.assertEqual(3, gbw.nbasis)
+                np.testing.assert_array_equal(self.coefficients, gbw.coefficients[0])
+                np.testing.assert_array_equal([2, 5, 8], gbw.mo(2))
+                np.testing.assert_array_equal(self.occupations, gbw.occupations[0])
+                np.testing.assert_array_equal(self.energies, gbw.energies[0])
+                np.testing.assert_array_equal([1], gbw.homos)
+                # Views of the memory map rather than copies
+                self.assertFalse(gbw.coefficients[0].flags.owndata)
+
+            levels, homos = read_energy_levels(file_name, 'hartree')
+            np.testing.assert_array_equal([self.energies], levels)
+            levels, homos = read_energy_levels(file_name, 'eV')
+            self.assertAlmostEqual(0.25*27.211386, levels[0, 2], 5)
+
+            # Compressed files
+            with open(file_name, 'rb') as f, gzip.open(file_name + '.gz', 'wb') as g:
+                g.write(f.read())
+            self.assertTrue(is_gbw(file_name + '.gz'))
+            with GBW(file_name + '.gz') as gbw:
+                np.testing.assert_array_equal(self.energies, gbw.energies[0])
+
+    def test_unrestricted(self):
+        with TemporaryDirectory() as tmpdir:
+            file_name = os.path.join(tmpdir, 'input.gbw')
+            write_gbw(file_name, [(self.coefficients, [1, 1, 0], self.energies),
+                                  (-self.coefficients, [1, 0, 0], [-20, -0.4, 0.3])])
+            with GBW(file_name) as gbw:
+                self.assertFalse(gbw.restricted)
+                np.testing.assert_array_equal(-self.coefficients, gbw.coefficients[1])
+                np.testing.assert_array_equal([1, 0], gbw.homos)
+
+            # Truncated
+            with open(file_name, 'r+b') as f:
+                f.truncate(100)
+            self.assertRaises(ValueError, GBW, file_name)
+
+    def test_invalid(self):
+        """Files that do not fit the layout are rejected"""
+        with TemporaryDirectory() as tmpdir:
+            file_name = os.path.join(tmpdir, 'input.gbw')
+            write_gbw(file_name, [(self.coefficients, [2, 3, 0], self.energies)])
+            self.assertRaises(ValueError, GBW, file_name)
+            write_gbw(file_name, [(self.coefficients, self.occupations, self.energies)])
+            with open(file_name, 'r+b') as f:
+                f.seek(24)
+                f.write(np.array([16], dtype='<i8').tobytes())
+            self.assertRaises(ValueError, GBW, file_name)
+
+    def test_is_gbw(self):
+        self.assertTrue(is_gbw('input.gbw'))
+        self.assertFalse(is_gbw('output.dat'))
+        self.assertFalse(is_gbw('gbw'))
+
+
+if __name__ == '__main__':
+    unittest.main()
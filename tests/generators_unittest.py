@@ -0,0 +1,137 @@
+import os
+import unittest
+
+from sys import path
+from tempfile import TemporaryDirectory
+from xml.etree import ElementTree
+
+path.insert(0, '..')
+path.insert(0, '../benchmarks')
+
+import generators
+
+from qgrep import cfour, gamess, gaussian, orca, psi4, qchem
+from qgrep.basis import BasisSet
+from qgrep.extraction import extract
+from qgrep.helper import check_program
+from qgrep.population.nbo import NBOSet
+from qgrep.population.orbital_pop import OrbitalPopulation
+from qgrep.queues import Queues
+
+
+class TestGenerators(unittest.TestCase):
+    """The synthetic benchmark outputs must stay readable by the parsers"""
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, text, name='output.out'):
+        file_name = os.path.join(self.tmpdir.name, name)
+        with open(file_name, 'w') as f:
+            f.write(text)
+        return file_name
+
+    def test_orca_optimization(self):
+        file_name = self.write(generators.orca_optimization(steps=7, natoms=4))
+        self.assertEqual('orca', check_program(file_name, use_cache=False))
+        with open(file_name) as f:
+            lines = f.readlines()
+        self.assertEqual(7, len(orca.plot(lines)))
+        self.assertEqual(4, len(orca.get_geom(lines)))
+        data = extract(file_name, ['scfenergies', 'geovalues', 'geotargets', 'completed', 'natom'], use_cache=False)
+        self.assertEqual((7, 5), data['geovalues'].shape)
+        self.assertEqual(7, len(data['scfenergies']))
+        self.assertEqual(4, data['natom'])
+        self.assertTrue(data['completed'])
+
+    def test_qchem_optimization(self):
+        file_name = self.write(generators.qchem_optimization(steps=7, natoms=4))
+        self.assertEqual('qchem', check_program(file_name, use_cache=False))
+        with open(file_name) as f:
+            lines = f.readlines()
+        self.assertEqual(4, len(qchem.get_geom(lines)))
+        self.assertEqual(7, len(qchem.plot(lines)))
+        convergence = qchem.check_convergence(lines)
+        self.assertEqual(7, len(convergence))
+        self.assertIn('Energy change', convergence[-1])
+
+    def test_cfour_ccsd_t(self):
+        file_name = self.write(generators.cfour_ccsd_t(steps=3, iterations=2))
+        self.assertEqual('cfour', check_program(file_name, use_cache=False))
+        with open(file_name) as f:
+            summary = cfour.get_summary(f.readlines())
+        self.assertEqual(('CCSD(T)', 'UHF', 2), (summary.method, summary.reference, summary.multiplicity))
+        self.assertEqual(['AA', 'BB', 'AB'], list(summary.t2_amplitudes))
+        self.assertIsNotNone(summary.t1)
+        self.assertIsNotNone(summary.energies['ccsd(t)'])
+
+    def test_gamess_dat(self):
+        file_name = self.write(generators.gamess_dat(nbasis=12, natoms=3))
+        self.assertEqual((12, 12), gamess.read_vec(file_name).shape)
+        self.assertEqual((9, 9), gamess.read_hess(file_name).shape)
+
+    def test_psi4_frequencies(self):
+        file_name = self.write(generators.psi4_frequencies(natoms=5))
+        self.assertEqual('psi4', check_program(file_name, use_cache=False))
+        with open(file_name) as f:
+            vibrations = psi4.get_vibrations(f.readlines())
+        self.assertEqual(9, len(vibrations))
+        self.assertEqual((9, 5, 3), vibrations.displacements().shape)
+        self.assertEqual(9, len(vibrations.intensities))
+
+    def test_gaussian_opt_freq(self):
+        for hpmodes in [True, False]:
+            file_name = self.write(generators.gaussian_opt_freq(steps=4, natoms=5, hpmodes=hpmodes))
+            self.assertEqual('gaussian', check_program(file_name, use_cache=False))
+            with gaussian.GaussianOutput(file_name) as output:
+                self.assertEqual((5, 5, 3), output.trajectory[1].shape)
+                self.assertEqual(4, len(output.convergence.steps))
+                self.assertEqual((9, 5, 3), output.vibrations.displacements().shape)
+                self.assertTrue(output.completed)
+
+    def test_orca_frequencies(self):
+        file_name = self.write(generators.orca_frequencies(natoms=5))
+        with open(file_name) as f:
+            freqs = orca.get_freqs(f.readlines())
+        # 3N - 6 modes, each with a header and one line per atom
+        self.assertEqual(9, freqs.count('cm^-1'))
+        self.assertEqual(9*(2 + 5), len([line for line in freqs.splitlines() if line]))
+
+    def test_orca_hess(self):
+        hess = orca.read_hess(self.write(generators.orca_hess(natoms=5), 'freqs.hess'), use_cache=False)
+        self.assertEqual((15, 15), hess['hessian'].shape)
+        self.assertEqual((15, 15), hess['normal_modes'].shape)
+        self.assertEqual((5, 3), hess['coordinates'].shape)
+        self.assertEqual(9, len(orca.hess_vibrations(hess).xyz().split('cm^-1')) - 1)
+
+    def test_lowdin_population(self):
+        op = OrbitalPopulation(self.write(generators.lowdin_population(norbitals=20, natoms=4)))
+        self.assertEqual(20, len(op))
+        self.assertEqual(list(range(20)), [orb.index for orb in op])
+
+    def test_nbo_section(self):
+        orbitals = NBOSet(iter(generators.nbo_section(natoms=6, rydbergs=12).splitlines(True))).orbitals
+        self.assertEqual(12*6, sum(orbital.type == 'RY*' for orbital in orbitals))
+        self.assertEqual(2*5, sum(orbital.type == 'NBO' for orbital in orbitals))
+
+    def test_qstat_xml(self):
+        for grid_engine in ['sge', 'pbs']:
+            xml, sizes = generators.qstat_xml(jobs=60, grid_engine=grid_engine)
+            queues = Queues.__new__(Queues)
+            queues.grid_engine, queues.sizes = grid_engine, sizes
+            queues.tree = ElementTree.fromstring(xml)
+            queues.parse_tree()
+            self.assertEqual(set(sizes), set(queues.queues))
+            self.assertEqual(20, sum(len(queue.running) for queue in queues.queues.values()))
+
+    def test_gaussian94_basis(self):
+        bs = BasisSet.read_str(generators.gaussian94_basis(natoms=3, shells=5).strip())
+        self.assertEqual(['H', 'He', 'Li'], list(bs.atoms))
+        self.assertEqual(5, len(bs['He']))
+
+
+if __name__ == '__main__':
+    unittest.main()
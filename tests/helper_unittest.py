@@ -1,3 +1,7 @@
+import os
+import gzip
+import shutil
+import tempfile
 import unittest
 import numpy as np
 
@@ -5,11 +9,20 @@ from sys import path
 
 path.insert(0, '..')
 
-from qgrep import helper
+from qgrep import cache, helper
 
 
 class TestHelper(unittest.TestCase):
 
+    def setUp(self):
+        # Keep the detection memo out of the real cache directory
+        self.cache_dir, self.enabled = cache.CACHE_DIR, cache.ENABLED
+        cache.CACHE_DIR = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(cache.CACHE_DIR)
+        cache.CACHE_DIR, cache.ENABLED = self.cache_dir, self.enabled
+
     def test_convert_energy(self):
         self.assertEqual(627.509, helper.convert_energy(1, 'hartree', 'kcal/mol'))
         self.assertAlmostEqual(0.0251223, helper.convert_energy(2.1, '1/cm', 'kJ/mol'), 5)
@@ -18,5 +31,183 @@ class TestHelper(unittest.TestCase):
         self.assertAlmostEqual(0, sum([11.7152, 16.3176]) -
                                sum(helper.convert_energy([2.8, 3.9], 'kcal/mol', 'kJ/mol')), 5)
 
+    def test_lazy_lines(self):
+        file_name = 'orca/Benzene_freqs.out'
+        with open(file_name) as f:
+            lines = f.readlines()
+        lazy = helper.LazyLines(file_name)
+        self.assertEqual(len(lines), len(lazy))
+        self.assertEqual(lines, list(lazy))
+        self.assertEqual(lines[::-1], list(reversed(lazy)))
+        self.assertEqual(lines[10], lazy[10])
+        self.assertEqual(lines[-1], lazy[-1])
+        self.assertEqual(lines[100:120], lazy[100:120])
+        self.assertEqual(lines[-5:], lazy[-5:])
+        self.assertRaises(IndexError, lazy.__getitem__, len(lines))
+        self.assertIn(lines[3], lazy)
+        self.assertEqual(''.join(lines[100:120]), lazy.text(100, 120))
+        self.assertEqual(''.join(lines[-5:]), helper.join_lines(lazy, -5, None))
+        self.assertEqual('', lazy.text(20, 10))
+        lazy.close()
+
+    def test_reverse_readlines(self):
+        file_name = 'orca/CH3F_Cl_scan.out'
+        with open(file_name) as f:
+            lines = f.readlines()
+        self.assertEqual(lines[::-1], list(helper.reverse_readlines(file_name)))
+        self.assertEqual(lines[::-1], list(helper.reverse_readlines(file_name, chunk_size=7)))
+
+    def test_tail(self):
+        file_name = 'orca/CH3F_Cl_scan.out'
+        with open(file_name) as f:
+            lines = f.readlines()
+        start = 'CARTESIAN COORDINATES (ANGSTROEM)\n'
+        last = len(lines) - 1 - lines[::-1].index(start)
+        self.assertEqual(lines[last:], helper.tail(lines, start))
+        self.assertEqual(lines[last:], helper.tail(helper.LazyLines(file_name), start))
+        self.assertEqual(lines[last:], helper.read_tail(file_name, start))
+        self.assertEqual(lines[-1:], helper.read_tail(file_name, lambda line: line[:14] == 'TOTAL RUN TIME'))
+        self.assertIsNone(helper.tail(lines, 'Not in the file\n'))
+        self.assertIsNone(helper.tail(helper.LazyLines(file_name), 'Not in the file\n'))
+        lazy = helper.LazyLines(file_name)
+        for line in [lines[0], lines[1], lines[-1], 'TOTAL SCF ENERGY\n']:
+            self.assertEqual(helper.tail(lines, line), helper.tail(lazy, line))
+        # Lines that are only found with \r\n newlines
+        with tempfile.TemporaryDirectory() as tmpdir:
+            crlf = os.path.join(tmpdir, 'crlf.out')
+            with open(crlf, 'w', newline='\r\n') as f:
+                f.writelines(lines)
+            self.assertEqual(lines[last:], helper.tail(helper.LazyLines(crlf), start))
+
+    def test_iter_tail(self):
+        file_name = 'orca/CH3F_Cl_scan.out'
+        with open(file_name) as f:
+            lines = f.readlines()
+        lazy = helper.LazyLines(file_name)
+        for starts in [' Total Charge', 'FINAL SINGLE POINT', ('FINAL SINGLE POINT', ' Total Charge'), lines[0][:5]]:
+            last = max(i for i, line in enumerate(lines) if line.startswith(starts))
+            self.assertEqual(lines[last:], list(helper.iter_tail(lines, starts)))
+            self.assertEqual(lines[last:], list(helper.iter_tail(lazy, starts)))
+        self.assertIsNone(helper.iter_tail(lines, 'Not in the file'))
+        self.assertIsNone(helper.iter_tail(lazy, 'Not in the file'))
+        # The index of the lines is not needed
+        self.assertIsNone(lazy._offsets)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            crlf = os.path.join(tmpdir, 'crlf.out')
+            with open(crlf, 'w', newline='\r\n') as f:
+                f.writelines(lines)
+            self.assertEqual(list(helper.iter_tail(lines, ' Total Charge')),
+                             list(helper.iter_tail(helper.LazyLines(crlf), ' Total Charge')))
+
+    def test_find_lines(self):
+        file_name = 'orca/CH3F_Cl_scan.out'
+        with open(file_name) as f:
+            lines = f.readlines()
+        prefixes = ['CARTESIAN COORDINATES (ANGSTROEM)\n', 'CARTESIAN COORDINATES', ' Total Charge', '\n', lines[0]]
+        found = helper.find_lines(lines, prefixes)
+        self.assertEqual([i for i, line in enumerate(lines) if line == prefixes[0]], found[prefixes[0]])
+        # Lines only count for the longest prefix they start with
+        self.assertEqual([i for i, line in enumerate(lines) if line == 'CARTESIAN COORDINATES (A.U.)\n'],
+                         found['CARTESIAN COORDINATES'])
+        self.assertEqual(30, len(found[' Total Charge']))
+        self.assertEqual(found, helper.find_lines(helper.LazyLines(file_name), prefixes))
+        self.assertEqual({}, helper.find_lines(lines, []))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            crlf = os.path.join(tmpdir, 'crlf.out')
+            with open(crlf, 'w', newline='\r\n') as f:
+                f.writelines(lines)
+            self.assertEqual(found, helper.find_lines(helper.LazyLines(crlf), prefixes))
+
+    def test_termination(self):
+        for file_name in ['orca/Benzene_freqs.out', 'psi4_output.dat', 'qchem_output.dat',
+                          'gamess/CH2_opt.out', 'cfour/h2o.out']:
+            self.assertEqual('completed', helper.termination(file_name))
+            self.assertTrue(helper.is_completed(file_name))
+        self.assertIsNone(helper.termination('orca/CH3F_Cl_scan.inp'))
+        self.assertFalse(helper.is_completed('orca/CH3F_Cl_scan.inp', 'orca'))
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            outputs = {
+                'orca': ('COMPLETED\nTOTAL RUN TIME: 0 days\n', 'ORCA finished by error termination in SCF\n'),
+                'psi4': ('*** Psi4 exiting successfully. Buy a developer a beer!\n',
+                         'Traceback (most recent call last):\n  File "psi4", line 1\n'),
+                'cfour': (' --executable xjoda finished with status            0\n',
+                          ' --executable xvscf finished with status            1\n'),
+                'gamess': (' EXECUTION OF GAMESS TERMINATED NORMALLY Thu Oct  9\n ddikick.x: exited gracefully.\n',
+                           ' EXECUTION OF GAMESS TERMINATED -ABNORMALLY- AT Thu Oct  9\n'),
+                'molpro': (' Molpro calculation terminated\n', ' ? Error\n ? No convergence\n'),
+                'gaussian': (' Normal termination of Gaussian 09 at Thu Oct  9\n', ' Error termination via Lnk1e\n'),
+                'bagel': ('  ' + '='*63 + '\n', '  ERROR: EXCEPTION RAISED:  SCF did not converge\n'),
+            }
+            for program, (done, failed) in outputs.items():
+                file_name = os.path.join(tmpdir, program + '.out')
+                for text, status in [(done, 'completed'), (failed, 'failed'), (done + failed, 'failed'),
+                                     (failed + done, 'completed'), ('Iteration 1\n', 'running')]:
+                    with open(file_name, 'w') as f:
+                        f.write('x'*helper.TERMINATION_BYTES + '\n' + text)
+                    self.assertEqual(status, helper.termination(file_name, program), (program, text))
+            # A CFOUR job between modules is still running
+            with open(file_name, 'w') as f:
+                f.write(outputs['cfour'][0] + ' --invoking executable xvscf\n')
+            self.assertEqual('running', helper.termination(file_name, 'cfour'))
+
+            # Only the end of compressed files is read
+            with open('psi4_output.dat', 'rb') as f, gzip.open(os.path.join(tmpdir, 'psi4_output.dat.gz'), 'wb') as g:
+                g.write(f.read())
+            self.assertEqual('completed', helper.termination(os.path.join(tmpdir, 'psi4_output.dat.gz')))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_check_program(self):
+        self.assertEqual('orca', helper.check_program('orca/Benzene_freqs.out'))
+        self.assertEqual('psi4', helper.check_program('psi4_output.dat'))
+        self.assertEqual('qchem', helper.check_program('qchem_output.dat'))
+        self.assertEqual('cfour', helper.check_program('cfour/h2o.out'))
+        self.assertEqual('gamess', helper.check_program('gamess/CH2_opt.out'))
+        self.assertEqual('gaussian', helper.check_program('gaussian_output.log'))
+        self.assertIsNone(helper.check_program('orca/Benzene_freqs.inp'))
+
+    def test_find_input_program(self):
+        self.assertEqual('orca', helper.find_input_program('orca/Benzene_freqs.inp'))
+        self.assertEqual('cfour', helper.find_input_program('cfour/h2o.ZMAT'))
+        self.assertEqual('gamess', helper.find_input_program('gamess/CH2_opt.inp'))
+        self.assertEqual('nbo', helper.find_input_program('population/nbo/H2O.47'))
+
+    def test_detection_memo(self):
+        # Even if the cache is disabled in the environment (QGREP_NO_CACHE)
+        cache.ENABLED = True
+        file_name = os.path.join(cache.CACHE_DIR, 'output.dat')
+        self.addCleanup(helper._program_memo.clear)
+        self.addCleanup(helper._matchers.clear)
+        with open(file_name, 'w') as f:
+            f.write('Header\n   My New Program 1.0   \n')
+        self.assertIsNone(helper.check_program(file_name))
+        helper.register_program('My New Program 1.0', 'new_program')
+        self.assertEqual('new_program', helper.check_program(file_name))
+        self.assertTrue(os.path.isfile(os.path.join(cache.CACHE_DIR, 'programs.sqlite')))
+
+        # Reused from the on-disk memo without reading the file
+        helper._program_memo.clear()
+        check_program = helper._check_program
+        helper._check_program = None
+        try:
+            self.assertEqual('new_program', helper.check_program(file_name))
+        finally:
+            helper._check_program = check_program
+        del helper.PROGRAM_SIGNATURES['My New Program 1.0']
+        helper._matchers.clear()
+        self.assertIsNone(helper.check_program(file_name))
+
+        # Changing the file invalidates the memo
+        with open(file_name, 'w') as f:
+            f.write('\n'*helper.DETECTION_LINES + '* O   R   C   A *\n')
+        self.assertIsNone(helper.check_program(file_name))
+        with open(file_name, 'w') as f:
+            f.write('\n'*(helper.DETECTION_LINES - 1) + '* O   R   C   A *\n')
+        os.utime(file_name, ns=(0, 10**9))
+        self.assertEqual('orca', helper.check_program(file_name))
+
+
 if __name__ == '__main__':
     unittest.main()
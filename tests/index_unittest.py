@@ -0,0 +1,76 @@
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from sys import path
+
+path.insert(0, '..')
+
+from qgrep import cache
+from qgrep.index import ProjectIndex, INDEX_NAME, locate, summarize
+
+
+class TestIndex(unittest.TestCase):
+    """Tests the project index"""
+
+    def setUp(self):
+        # Keep the cache entries out of the real cache directory
+        self.cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'benzene'))
+        os.makedirs(os.path.join(self.root, 'water', 'psi4'))
+        shutil.copy('orca/Benzene_freqs.out', os.path.join(self.root, 'benzene', 'output.dat'))
+        with open('psi4_output.dat', 'rb') as f, gzip.open(os.path.join(self.root, 'water', 'psi4', 'output.dat.gz'), 'wb') as g:
+            g.write(f.read())
+        # Unfinished job
+        with open('orca/H2O_hybrid_hess.out') as f:
+            lines = f.readlines()
+        with open(os.path.join(self.root, 'water', 'running.out'), 'w') as f:
+            f.writelines(lines[:2000])
+        with open(os.path.join(self.root, 'notes.log'), 'w') as f:
+            f.write('Not an output file\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        shutil.rmtree(cache.CACHE_DIR)
+        cache.CACHE_DIR = self.cache_dir
+
+    def test_summarize(self):
+        summary = summarize('orca/Benzene_freqs.out')
+        self.assertEqual('orca', summary['program'])
+        self.assertTrue(summary['completed'])
+        self.assertAlmostEqual(-232.08944966, summary['energy'])
+        self.assertEqual((12, 0, 1), (summary['natom'], summary['charge'], summary['mult']))
+        self.assertEqual({'program': None}, summarize('helper_unittest.py'))
+
+    def test_update(self):
+        with ProjectIndex(self.root) as index:
+            self.assertEqual((4, 0), index.update())
+            self.assertEqual(3, len(index.query()))
+            # Nothing changed
+            self.assertEqual((0, 0), index.update())
+
+            unfinished = index.query('program = ? AND NOT completed', ['orca'])
+            self.assertEqual([os.path.join('water', 'running.out')], [row['path'] for row in unfinished])
+            psi4, = index.query('program = "psi4"')
+            self.assertEqual(os.path.join('water', 'psi4', 'output.dat.gz'), psi4['path'])
+            self.assertEqual(3, psi4['natom'])
+            self.assertTrue(psi4['completed'])
+            self.assertEqual(['benzene/output.dat'], [row['path'] for row in index.query('natom > 10')])
+
+            # Only the changed and removed files are updated
+            os.remove(os.path.join(self.root, 'notes.log'))
+            with open(os.path.join(self.root, 'water', 'running.out'), 'a') as f:
+                f.write('TOTAL RUN TIME: 0 days 0 hours 0 minutes 38 seconds 15 msec\n')
+            self.assertEqual((1, 1), index.update())
+            self.assertEqual([], index.query('NOT completed'))
+
+        self.assertTrue(os.path.isfile(os.path.join(self.root, INDEX_NAME)))
+        self.assertEqual(os.path.abspath(self.root), locate(os.path.join(self.root, 'water', 'psi4')))
+
+
+if __name__ == '__main__':
+    unittest.main()
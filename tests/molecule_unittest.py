@@ -1,4 +1,7 @@
 import os
+import lzma
+import shutil
+import tempfile
 import unittest
 import numpy as np
 
@@ -7,6 +10,7 @@ from numpy.testing import assert_almost_equal
 
 path.insert(0, '..')
 
+from qgrep import cache
 from qgrep.molecule import Molecule
 
 
@@ -93,6 +97,21 @@ H       0.000000      1.000000      1.000000
 
         os.remove(geom_file)
 
+    def test_read_compressed(self):
+        """Testing reading compressed outputs"""
+        cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(cache.CACHE_DIR, 'output.out.xz')
+            with open('orca/Benzene_freqs.out', 'rb') as f, lzma.open(file_name, 'wb') as g:
+                g.write(f.read())
+            mol = Molecule.read_from(file_name)
+            self.assertEqual(Molecule.read_from('orca/Benzene_freqs.out').geom, mol.geom)
+            self.assertEqual(12, len(mol))
+        finally:
+            shutil.rmtree(cache.CACHE_DIR)
+            cache.CACHE_DIR = cache_dir
+
     def test_com(self):
         """ Test the center of mass """
         water_com = np.array([0, 0.05595744, 0.94404256])
@@ -1,10 +1,16 @@
+import os
+import shutil
+import tempfile
 import unittest
+import numpy as np
 
 from sys import path
+from tempfile import TemporaryDirectory
 
 path.insert(0, '../..')
 
-from qgrep import orca
+from qgrep import cache, orca
+from qgrep.helper import LazyLines
 
 
 class TestOrca(unittest.TestCase):
@@ -12,7 +18,7 @@ class TestOrca(unittest.TestCase):
 
     def setUp(self):
         """Read in the necessary files"""
-        files = ['CH3F_Cl_scan.out', 'CH3F_Cl_scan.xyz',
+        files = ['CH3F_Cl_scan.out', 'CH3F_Cl_scan.xyz', 'CH3F_Cl_scan.inp',
                  'CH3F_Cl_scan.orca_zmat', 'CH3F_Cl_scan.bohr.xyz',
                  'CH3F_Cl_scan.bohr.orca_zmat', 'CH3F_Cl_scan.check',
                  'CH3F_Cl_scan.plot', 'CH3F_Cl_scan.zmat',
@@ -22,6 +28,13 @@ class TestOrca(unittest.TestCase):
         for file in files:
             with open(file, 'r') as f:
                 self.files[file] = f.readlines()
+        # Keep the cache entries out of the real cache directory
+        self.cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(cache.CACHE_DIR)
+        cache.CACHE_DIR = self.cache_dir
 
     def test_get_geom(self):
         """Testing get_geom"""
@@ -44,6 +57,28 @@ class TestOrca(unittest.TestCase):
         self.assertEqual(len(checklist), 74)
         self.assertEqual(checklist[-1], ''.join(self.files['CH3F_Cl_scan.check']))
 
+    def test_convergence(self):
+        """Testing convergence"""
+        scan = orca.convergence('CH3F_Cl_scan.out')
+        self.assertEqual(74, len(scan.steps))
+        self.assertEqual([3e-05, 5e-04, 2e-03, 7e-03, 1e-02], scan.criteria)
+        first, last = scan.steps[0], scan.steps[-1]
+        # Relaxed scans have no energy change in the first step
+        self.assertEqual(0, first.delta_e)
+        self.assertEqual([0.47945491, 1.97388707, 0.07276069, 0.29671759, 19],
+                         [first.rms_grad, first.max_grad, first.rms_step, first.max_step, first.scf_steps])
+        self.assertEqual(-3.17e-05, round(last.delta_e, 7))
+        self.assertEqual(''.join(self.files['CH3F_Cl_scan.check']).count('YES'),
+                         sum(abs(value) < criterion for value, criterion in zip(last.params.values(), last.criteria)))
+        self.assertIn(' 73: -3.17e-05  1.05e-04* 2.43e-04* 6.08e-03* 1.27e-02 |      6\n', str(scan))
+
+        # Partially written outputs stop at the last complete block
+        lines = self.files['CH3F_Cl_scan.out']
+        block = lines.index('          ----------------------|Geometry convergence|---------------------\n', 1000)
+        steps = list(orca.iter_convergence(lines[:block + 5] + [lines[block + 5][:30]]))
+        self.assertEqual(2, len(steps))
+        self.assertEqual(3, len(list(orca.iter_convergence(lines[:block + 12]))))
+
     def test_get_energy(self):
         """Testing get_energy"""
         energy = orca.get_energy(self.files['CH3F_Cl_scan.out'])
@@ -57,18 +92,129 @@ class TestOrca(unittest.TestCase):
         energy = orca.get_energy(self.files['Benzene_freqs.out'], 'entropy')
         self.assertEqual('-0.03181612', energy)
 
+    def test_get_all_energies(self):
+        """Testing get_all_energies"""
+        energies = orca.get_all_energies(self.files['Benzene_freqs.out'])
+        self.assertEqual(['sp', 'gibbs', 'enthalpy', 'entropy', 'zpve'], list(energies))
+        self.assertEqual(13, len(energies['sp']))
+        self.assertEqual(-232.089449656962, energies['sp'][-1])
+        self.assertEqual([-232.01547613], list(energies['gibbs']))
+        self.assertEqual(list(energies['sp']), orca.get_energies(self.files['Benzene_freqs.out']))
+
+        energies = orca.get_all_energies(self.files['CH3F_Cl_scan.out'], ['sp', 'zpve'])
+        self.assertEqual((89,), energies['sp'].shape)
+        self.assertEqual(0, len(energies['zpve']))
+        self.assertEqual(0, orca.get_energy(self.files['CH3F_Cl_scan.out'], 'zpve'))
+
     def test_get_freqs(self):
         """Testing get_freqs"""
+        # Parsed from the outputs, there are no .hess files next to them
+        self.assertIsNone(orca.find_hess('H2O_hybrid_hess.out'))
         benzene_freqs = orca.get_freqs(self.files['Benzene_freqs.out'])
         H2O_freqs = orca.get_freqs(self.files['H2O_hybrid_hess.out'])
         self.assertEqual(benzene_freqs, ''.join(self.files['Benzene_freqs.freqs']))
         self.assertEqual(H2O_freqs, ''.join(self.files['H2O_hybrid_hess.freqs']))
 
+    def test_get_vibrations(self):
+        """Testing get_vibrations"""
+        benzene = orca.get_vibrations(self.files['Benzene_freqs.out'])
+        self.assertEqual(36, len(benzene))
+        self.assertEqual((36, 36), benzene.modes.shape)
+        self.assertEqual((12, 3), benzene.geometry.shape)
+        self.assertEqual(['C']*6 + ['H']*6, benzene.atoms)
+        self.assertEqual(401.64, benzene.frequencies[6])
+        self.assertEqual(3204.82, benzene.frequencies[-1])
+        self.assertEqual(82.744698, benzene.intensities[10])
+        self.assertEqual([0.004135, -0.000574, 0.135026], list(benzene.displacements(6)[0]))
+        self.assertEqual([0.003798, -0.000333, 0.002793], list(benzene.modes[33:, -1]))
+        self.assertEqual(benzene.xyz(), ''.join(self.files['Benzene_freqs.freqs']))
+
+        h2o = orca.get_vibrations(self.files['H2O_hybrid_hess.out'])
+        self.assertEqual((9, 9), h2o.modes.shape)
+        self.assertEqual([0.0]*6 + [1634.51, 3637.21, 3744.60], list(h2o.frequencies))
+        self.assertEqual([68.739825, 1.091436, 21.094117], list(h2o.intensities[6:]))
+
+        self.assertIsNone(orca.get_vibrations(self.files['CH3F_Cl_scan.out']))
+        self.assertEqual('', orca.get_freqs(self.files['CH3F_Cl_scan.out']))
+
+    def test_read_hess(self):
+        """
+        Testing read_hess
+        hess/H2O_hybrid_hess.hess is written in the layout of ORCA .hess files from
+        the values printed in H2O_hybrid_hess.out, so it only has their precision.
+        It is kept apart from the output so that the other tests parse the output.
+        """
+        with TemporaryDirectory() as tmpdir:
+            shutil.copy('H2O_hybrid_hess.out', tmpdir)
+            shutil.copy('hess/H2O_hybrid_hess.hess', tmpdir)
+            output = os.path.join(tmpdir, 'H2O_hybrid_hess.out')
+            hess_file = orca.find_hess(output)
+            self.assertEqual(os.path.join(tmpdir, 'H2O_hybrid_hess.hess'), hess_file)
+            shutil.copy(hess_file, os.path.join(tmpdir, 'input.hess'))
+            shutil.copy('H2O_hybrid_hess.out', os.path.join(tmpdir, 'output.dat'))
+            self.assertEqual(os.path.join(tmpdir, 'input.hess'), orca.find_hess(os.path.join(tmpdir, 'output.dat')))
+            self.assertIsNone(orca.find_hess('Benzene_freqs.out'))
+
+            hess = orca.read_hess(hess_file)
+            self.assertEqual([], os.listdir(cache.CACHE_DIR))
+            # The cache entry holds the same arrays and is not written next to the job
+            self.assertEqual(sorted(hess), sorted(orca.read_hess(hess_file, use_cache=True)))
+            self.assertTrue(os.path.isfile(cache.entry_path(hess_file, '.hess.npz')))
+            cached = orca.read_hess(hess_file, use_cache=True)
+            self.assertEqual(sorted(hess), sorted(cached))
+            for name in hess:
+                self.assertTrue(np.array_equal(hess[name], cached[name]))
+            self.assertFalse(any(name.endswith('.npz') for name in os.listdir(tmpdir)))
+
+            np.testing.assert_allclose(-76.302012, hess['energy'])
+            self.assertEqual((9, 9), hess['hessian'].shape)
+            np.testing.assert_allclose(hess['hessian'], hess['hessian'].T)
+            np.testing.assert_allclose(-2.5437931370E-03, hess['hessian'][0, 4])
+            self.assertEqual(['O', 'H', 'H'], list(hess['atoms']))
+            np.testing.assert_allclose([15.999, 1.008, 1.008], hess['masses'])
+            np.testing.assert_allclose(1.847251822377, hess['coordinates'][1, 0])
+            self.assertEqual((9, 3), hess['dipole_derivatives'].shape)
+
+            # The same vibrations as the output, to the precision of the output
+            h2o = orca.get_vibrations(self.files['H2O_hybrid_hess.out'])
+            vibrations = orca.hess_vibrations(hess)
+            np.testing.assert_allclose(h2o.frequencies, vibrations.frequencies, atol=0.01)
+            np.testing.assert_allclose(h2o.intensities, vibrations.intensities, atol=1e-6)
+            np.testing.assert_allclose(h2o.modes, vibrations.modes, atol=1e-6)
+            self.assertEqual(''.join(self.files['H2O_hybrid_hess.freqs']), orca.get_freqs(LazyLines(output)))
+
+            # An empty .hess file (e.g. of a killed job) is ignored
+            open(hess_file, 'w').close()
+            self.assertEqual({}, orca.read_hess(hess_file))
+            self.assertIsNone(orca.hess_vibrations({}))
+            self.assertEqual(''.join(self.files['H2O_hybrid_hess.freqs']), orca.get_freqs(LazyLines(output)))
+
     def test_plot(self):
         """Testing plot"""
         geoms = orca.plot(self.files['CH3F_Cl_scan.out'])
         self.assertEqual('\n'.join(geoms), ''.join(self.files['CH3F_Cl_scan.plot']))
 
+        # Steps with a different number of atoms are plotted on their own
+        lines = list(self.files['CH3F_Cl_scan.out'])
+        del lines[lines.index('CARTESIAN COORDINATES (ANGSTROEM)\n') + 2]
+        self.assertRaises(ValueError, orca.get_trajectory, lines)
+        frames = orca.plot(lines)
+        self.assertEqual(geoms[1:], frames[1:])
+        self.assertEqual('5\nStep 0\n', frames[0][:9])
+        self.assertEqual(geoms[0].split('\n')[3:], frames[0].split('\n')[2:])
+
+    def test_get_trajectory(self):
+        """Testing get_trajectory"""
+        atoms, trajectory = orca.get_trajectory(self.files['CH3F_Cl_scan.out'])
+        self.assertEqual(['C', 'Cl', 'H', 'H', 'H', 'F'], atoms)
+        self.assertEqual((89, 6, 3), trajectory.shape)
+        self.assertEqual([-1.552478, -0.437225, -0.000033], list(trajectory[0, 0]))
+        self.assertEqual([-3.764206, -0.442662, 0.038547], list(trajectory[-1, -1]))
+
+        atoms, trajectory = orca.get_trajectory([])
+        self.assertEqual([], atoms)
+        self.assertEqual(0, len(trajectory))
+
     def test_convert_zmatrix(self):
         zmat = orca.convert_zmatrix(self.files['CH3F_Cl_scan.out'], 'angstrom')
         self.assertEqual(['\t'.join(line) + '\n' for line in zmat],
@@ -104,6 +250,129 @@ F      -3.76420600   -0.44266200    0.03854700'''
         self.assertTrue(orca.completed(self.files['Benzene_freqs.out']))
         self.assertTrue(orca.completed(self.files['CH3F_Cl_scan.out']))
 
+    def test_orca_output(self):
+        """Testing OrcaOutput"""
+        with orca.OrcaOutput('Benzene_freqs.out') as output:
+            self.assertEqual(13, len(output.index['xyz']))
+            self.assertEqual(list(orca.SECTION_HEADERS), list(output.index))
+            self.assertEqual(orca.get_geom(self.files['Benzene_freqs.out']), output.geometry())
+            self.assertEqual('-232.01547613', output.energy('gibbs'))
+            self.assertEqual(13, len(output.energies['sp']))
+            self.assertEqual((0, 1), (output.charge, output.multiplicity))
+            self.assertEqual((13, 12, 3), output.trajectory[1].shape)
+            self.assertEqual(36, len(output.vibrations))
+            self.assertTrue(output.completed)
+            self.assertIn('homo', output.energy_levels[1])
+            # Properties are only computed once
+            self.assertIs(output.vibrations, output.vibrations)
+
+        # The functions share one OrcaOutput per LazyLines
+        scan = LazyLines('CH3F_Cl_scan.out')
+        self.assertIs(orca.OrcaOutput.of(scan), orca.OrcaOutput.of(scan))
+        self.assertEqual(-1, orca.get_charge(scan))
+        self.assertIn('charge', orca.OrcaOutput.of(scan).__dict__)
+        # The last occurrences are found from the end of the file without building the index
+        self.assertNotIn('index', orca.OrcaOutput.of(scan).__dict__)
+        self.assertEqual(orca.get_geom(self.files['CH3F_Cl_scan.out']), orca.get_geom(scan))
+        self.assertEqual(orca.get_energy(self.files['CH3F_Cl_scan.out']), orca.get_energy(scan))
+        self.assertNotIn('index', orca.OrcaOutput.of(scan).__dict__)
+        scan.close()
+
+        # Lists may change in place, so they are not cached
+        lines = list(self.files['CH3F_Cl_scan.out'])
+        energy = orca.get_energy(lines)
+        lines[len(lines) - 10:] = ['FINAL SINGLE POINT ENERGY      -1.000000000000\n'] + lines[len(lines) - 9:]
+        self.assertNotEqual(energy, orca.get_energy(lines))
+        self.assertEqual('', orca.energy_levels(['\n']))
+
+    def test_last_geom(self):
+        """Testing the tail search for the last geometry"""
+        self.assertEqual(self.files['CH3F_Cl_scan.xyz'], orca.last_geom('CH3F_Cl_scan.out'))
+        self.assertEqual(orca.get_geom(self.files['CH3F_Cl_scan.out'], 'zmat'), orca.last_geom('CH3F_Cl_scan.out', 'zmat'))
+        self.assertIsNone(orca.last_geom('CH3F_Cl_scan.inp'))
+
+    def test_update_geom(self):
+        """Testing update_geom"""
+        with TemporaryDirectory() as tmpdir:
+            infile, outfile = os.path.join(tmpdir, 'input.dat'), os.path.join(tmpdir, 'output.dat')
+            shutil.copy('CH3F_Cl_scan.inp', infile)
+            shutil.copy('CH3F_Cl_scan.out', outfile)
+
+            summary = orca.update_geom(infile, outfile, dry_run=True)
+            self.assertEqual((6, 6, ('xyz', 'xyz')), (summary['natoms'], summary['changed'], summary['geom_type']))
+            self.assertAlmostEqual(1.010494, summary['max_change'])
+            with open(infile) as f:
+                self.assertEqual(''.join(self.files['CH3F_Cl_scan.inp']), f.read())
+
+            orca.update_geom(infile, outfile)
+            with open(infile) as f:
+                lines = f.readlines()
+            self.assertEqual(self.files['CH3F_Cl_scan.inp'][:9], lines[:9])
+            self.assertEqual(self.files['CH3F_Cl_scan.xyz'], lines[9:-1])
+            self.assertEqual('*\n', lines[-1])
+            self.assertEqual(['input.dat', 'output.dat'], sorted(os.listdir(tmpdir)))
+            self.assertEqual(0, orca.update_geom(infile, outfile)['changed'])
+
+            # Internal coordinates are taken from the output
+            with open(infile, 'w') as f:
+                f.writelines(self.files['CH3F_Cl_scan.inp'][:8] + ['*int -1 1\n'] + ['C 0 0 0 0 0 0\n']*6 + ['*\n'])
+            self.assertEqual(('int', 'int'), orca.update_geom(infile, outfile)['geom_type'])
+            with open(infile) as f:
+                self.assertEqual(orca.get_geom(self.files['CH3F_Cl_scan.out'], 'zmat'), f.readlines()[9:-1])
+
+            # The number of atoms must match
+            with open(infile, 'w') as f:
+                f.writelines(self.files['CH3F_Cl_scan.inp'][:-2] + ['*\n'])
+            self.assertRaises(ValueError, orca.update_geom, infile, outfile)
+
+    def test_get_scan(self):
+        """Testing the extraction of relaxed surface scans"""
+        scan = orca.get_scan(self.files['CH3F_Cl_scan.out'])
+        self.assertEqual(15, len(scan))
+        self.assertEqual(['C', 'Cl', 'H', 'H', 'H', 'F'], scan.atoms)
+        self.assertEqual(['Bond ( 5, 0)'], scan.labels)
+        np.testing.assert_allclose(np.linspace(3, 1.2, 15), scan.coordinates[:, 0])
+        self.assertEqual((15, 6, 3), scan.geometries.shape)
+        self.assertTrue(scan.converged.all())
+        # Same as the RELAXED SURFACE SCAN RESULTS
+        self.assertAlmostEqual(-33.86955061, scan.energies[0], 8)
+        self.assertAlmostEqual(-33.93045273, scan.energies[-1], 8)
+        # The last geometry of the scan is the final geometry
+        atoms, trajectory = orca.get_trajectory(self.files['CH3F_Cl_scan.out'])
+        np.testing.assert_array_equal(trajectory[-1], scan.geometries[-1])
+        self.assertEqual(15, scan.xyz().count('E: -33.'))
+
+        self.assertIsNone(orca.get_scan(self.files['Benzene_freqs.out']))
+
+        # A scan that is still running
+        lines = self.files['CH3F_Cl_scan.out']
+        cut = [i for i, line in enumerate(lines) if 'RELAXED SURFACE SCAN STEP   3' in line][0]
+        scan = orca.get_scan(lines[:cut + 10])
+        self.assertEqual(3, len(scan))
+        self.assertEqual([True, True, False], scan.converged.tolist())
+        self.assertTrue(np.isnan(scan.energies[2]))
+        self.assertTrue(np.isnan(scan.geometries[2]).all())
+
+    def test_read_scans(self):
+        """Testing reading many scans at once"""
+        files = ['CH3F_Cl_scan.out', 'Benzene_freqs.out', 'CH3F_Cl_scan.out']
+        scans, errors = orca.read_scans(files, jobs=2)
+        self.assertEqual(['CH3F_Cl_scan.out'], list(scans))
+        self.assertEqual(['Benzene_freqs.out'], list(errors))
+        np.testing.assert_array_equal(orca.get_scan(self.files['CH3F_Cl_scan.out']).energies,
+                                      scans['CH3F_Cl_scan.out'].energies)
+
+    def test_lazy_lines(self):
+        """Testing that LazyLines can be used in place of readlines"""
+        scan = LazyLines('CH3F_Cl_scan.out')
+        freqs = LazyLines('Benzene_freqs.out')
+        self.assertEqual(orca.get_geom(scan), self.files['CH3F_Cl_scan.xyz'])
+        self.assertEqual('\n'.join(orca.plot(scan)), ''.join(self.files['CH3F_Cl_scan.plot']))
+        self.assertEqual(orca.get_energy(freqs, 'gibbs'), '-232.01547613')
+        self.assertEqual(orca.get_freqs(freqs), ''.join(self.files['Benzene_freqs.freqs']))
+        self.assertEqual(orca.get_charge(scan), -1)
+        self.assertTrue(orca.completed(scan))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,65 @@
+import os
+import json
+import unittest
+
+from sys import path
+from tempfile import TemporaryDirectory
+
+path.insert(0, '..')
+
+from qgrep import profiling
+from qgrep.profiling import phase, timed
+
+
+def add(a, b):
+    return a + b
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.enabled = profiling.ENABLED
+        profiling._phases.clear()
+
+    def tearDown(self):
+        profiling.ENABLED = self.enabled
+        profiling._phases.clear()
+
+    def test_disabled(self):
+        profiling.ENABLED = False
+        self.assertIs(add, timed('parse')(add))
+        self.assertIs(phase('read'), phase('parse'))
+        with phase('read'):
+            pass
+        self.assertEqual({}, profiling.report()['phases'])
+
+    def test_enabled(self):
+        profiling.ENABLED = True
+        timed_add = timed('parse')(add)
+        self.assertEqual('add', timed_add.__name__)
+        self.assertEqual(3, timed_add(1, 2))
+        with phase('read'):
+            timed_add(1, 2)
+        with phase('read'):
+            pass
+        # Nested phases of the same name are counted once
+        with phase('parse'):
+            timed_add(1, 2)
+
+        phases = profiling.report()['phases']
+        self.assertEqual(['parse', 'read'], sorted(phases))
+        self.assertEqual(3, phases['parse']['count'])
+        self.assertEqual(2, phases['read']['count'])
+        for name in ['wall', 'cpu', 'peak_memory_growth', 'peak_memory']:
+            self.assertGreaterEqual(phases['read'][name], 0)
+
+        with TemporaryDirectory() as tmpdir:
+            file_name = os.path.join(tmpdir, 'profile.json')
+            profiling.write_report(file_name)
+            with open(file_name) as f:
+                report = json.load(f)
+        self.assertEqual(phases, report['phases'])
+        self.assertGreater(report['total']['wall'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+
+from sys import path
+path.insert(0, '..')
+
+from qgrep import psi4
+
+
+VIBANAL = '''    Geometry (in Angstrom), charge = 0, multiplicity = 1:
+
+       Center              X                  Y                   Z       
+    ------------   -----------------  -----------------  -----------------
+           O          0.000000000000     0.000000000000    -0.068516219320
+           H          0.000000000000    -0.790689573744     0.543701060715
+           H          0.000000000000     0.790689573744     0.543701060715
+
+  ==> Harmonic Vibrational Analysis <==
+
+  Vibration                       7                   8                   9
+  Freq [cm^-1]                 123.4567i          3833.3551           3946.5363
+  Irrep                           A1                  A1                  B2
+  Reduced mass [u]              1.0825              1.0453              1.0812
+  Force const [mDyne/A]         2.0124              9.0498              9.9218
+  IR activ [km/mol]            74.5285              1.7085             21.0427
+  ----------------------------------------------------------------------------------
+      1   O               -0.00 -0.00 -0.07     0.00 -0.00  0.05    -0.07 -0.00 -0.00
+      2   H               -0.00  0.42  0.56    -0.00 -0.58 -0.40     0.56  0.00  0.43
+      3   H               -0.00 -0.42  0.56    -0.00  0.58 -0.40     0.56 -0.00  0.43
+
+'''
+
+
+class TestPsi4(unittest.TestCase):
+    """Tests the psi4 class"""
+
+    def setUp(self):
+        with open('psi4_output.dat') as f:
+            self.lines = f.readlines()
+
+    def test_get_vibrations(self):
+        # Psi4 4.0 prints the mass-weighted normal modes one at a time
+        vibrations = psi4.get_vibrations(self.lines)
+        self.assertEqual(['H', 'O', 'H'], vibrations.atoms)
+        np.testing.assert_allclose([2170.53, 4139.32, 4390.41], vibrations.frequencies)
+        self.assertEqual((3, 3, 3), vibrations.displacements().shape)
+        np.testing.assert_allclose([[0, -0.433, -0.527], [0, 0, 0.264], [0, 0.433, -0.527]],
+                                   vibrations.displacements(0))
+        np.testing.assert_allclose([0, 0.7581055431, -0.5647004883], vibrations.geometry[0], atol=1e-8)
+        self.assertIsNone(vibrations.reduced_masses)
+
+        # Psi4 1.x prints the properties and displacements of three modes at a time
+        vibrations = psi4.get_vibrations(VIBANAL.splitlines(True))
+        self.assertEqual(['O', 'H', 'H'], vibrations.atoms)
+        np.testing.assert_allclose([-123.4567, 3833.3551, 3946.5363], vibrations.frequencies)
+        np.testing.assert_allclose([74.5285, 1.7085, 21.0427], vibrations.intensities)
+        np.testing.assert_allclose([1.0825, 1.0453, 1.0812], vibrations.reduced_masses)
+        np.testing.assert_allclose([[0.56, 0, 0.43], [0.56, 0, 0.43]], vibrations.displacements()[2, 1:])
+        np.testing.assert_allclose([0, -0.790689573744, 0.543701060715], vibrations.geometry[1])
+
+        # Unfinished blocks are ignored
+        self.assertIsNone(psi4.get_vibrations(VIBANAL.splitlines(True)[:-2]))
+        self.assertIsNone(psi4.get_vibrations(self.lines[:3540]))
+
+    def test_get_freqs(self):
+        freqs = psi4.get_freqs(self.lines)
+        self.assertEqual(3, freqs.count('cm^-1'))
+        self.assertIn('2170.53 cm^-1\nH\t0.000000\t0.758105\t-0.564700\t0.000000\t-0.433000\t-0.527000\n', freqs)
+        self.assertEqual('', psi4.get_freqs(self.lines[:100]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+
+from sys import path
+
+path.insert(0, '..')
+
+from qgrep.scan import Scan, stack
+
+
+class TestScan(unittest.TestCase):
+    """Tests the relaxed surface scan results"""
+
+    def setUp(self):
+        self.short = Scan(['H', 'H'], ['Bond ( 0, 1)'], [[0.7], [0.8]], [-1.1, -1.2],
+                          np.zeros((2, 2, 3)), [True, False])
+        self.long = Scan(['O', 'H', 'H'], ['Bond ( 0, 1)', 'Bond ( 0, 2)'], [[1, 1], [1.1, 1], [1.2, 1]],
+                         [-76.1, -76.2, -76.3], np.ones((3, 3, 3)), [True, True, True])
+
+    def test_scan(self):
+        self.assertEqual(2, len(self.short))
+        self.assertEqual((2, 1), self.short.coordinates.shape)
+        self.assertEqual((3, 2), self.long.coordinates.shape)
+        self.assertIn('no', str(self.short).splitlines()[-1])
+        self.assertEqual('2\nBond ( 0, 1): 0.70000000, E: -1.10000000\n', self.short.xyz()[:43])
+
+    def test_stack(self):
+        data = stack([self.short, self.long], ['short', 'long'])
+        self.assertEqual(['short', 'long'], data['names'].tolist())
+        self.assertEqual((2, 3, 2), data['coordinates'].shape)
+        self.assertEqual((2, 3, 3, 3), data['geometries'].shape)
+        self.assertEqual([['H', 'H', ''], ['O', 'H', 'H']], data['atoms'].tolist())
+        self.assertEqual(['Bond ( 0, 1)', ''], data['labels'][0].tolist())
+        self.assertTrue(np.isnan(data['energies'][0, 2]))
+        self.assertTrue(np.isnan(data['coordinates'][0, :, 1]).all())
+        self.assertTrue(np.isnan(data['geometries'][0, :, 2]).all())
+        self.assertEqual([[True, False, False], [True, True, True]], data['converged'].tolist())
+        np.testing.assert_array_equal(self.long.geometries, data['geometries'][1])
+
+        self.assertEqual((0, 0), stack([])['energies'].shape)
+
+
+if __name__ == '__main__':
+    unittest.main()
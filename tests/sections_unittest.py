@@ -0,0 +1,145 @@
+import os
+import unittest
+import tempfile
+import numpy as np
+
+from sys import path
+
+path.insert(0, '..')
+
+from qgrep import cfour, gamess, helper, psi4, qchem, sections
+from qgrep.helper import LazyLines
+from qgrep.sections import Section
+
+# Newer versions of Q-Chem and GAMESS indent the headers differently than the outputs in the tests
+QCHEM_5 = """\
+             Standard Nuclear Orientation (Angstroms)
+    I     Atom           X                Y                Z
+ ----------------------------------------------------------------
+    1      O       0.0000000000     0.0000000000     0.1187000000
+    2      H       0.0000000000     0.7568000000    -0.4748000000
+    3      H       0.0000000000    -0.7568000000    -0.4748000000
+ ----------------------------------------------------------------
+ Nuclear Repulsion Energy =           9.1681932913 hartrees
+                                Maximum     Tolerance    Cnvgd?
+          Gradient           0.000151      0.000300      YES
+          Displacement       0.000212      0.001200      YES
+          Energy change     -0.000000      0.000001      YES
+"""
+GAMESS = """\
+ MAXIMUM GRADIENT = 0.0000123    RMS GRADIENT = 0.0000061
+
+ NSERCH:   4  E=      -38.3712345678  GRAD. MAX=  0.0000123  R.M.S.=  0.0000061
+"""
+
+
+class TestSections(unittest.TestCase):
+    """Tests the declarative section engine"""
+
+    def setUp(self):
+        self.lines = ['header\n', 'START\n', '---\n', 'H 0 0 0\n', 'H 0 0 1\n', '\n',
+                      'START\n', '---\n', 'H 0 0 0\n', 'H 0 0 2\n', '\n',
+                      'START\n', '---\n', 'H 0 0 0\n']
+
+    def test_section(self):
+        section = Section('START', skip=1)
+        self.assertEqual([['H', '0', '0', '0'], ['H', '0', '0', '1']], section.read(self.lines, 1))
+        # Not finished yet
+        self.assertIsNone(section.read(self.lines, 11))
+        self.assertEqual([['H', '0', '0', '0'], ['H', '0', '0', '2']],
+                         Section('START', skip=1, end=lambda line: line[0] != 'H').read(self.lines, 6))
+        self.assertEqual(['---\n'], Section('START', rows=1, row=str).read(self.lines, 6))
+        self.assertIsNone(Section('START', rows=3).read(self.lines, 11))
+
+    def test_extract_sections(self):
+        self.addCleanup(sections.SECTIONS.pop, 'test')
+        sections.register('test', 'geometry', Section('START', skip=1, units='bohr'))
+        sections.register('test', 'header', Section('head', rows=0))
+        found = sections.extract_sections(self.lines, 'test')
+        self.assertEqual(['geometry', 'header'], list(found))
+        self.assertEqual(2, len(found['geometry']))
+        self.assertEqual([[]], found['header'])
+        self.assertEqual(found['geometry'][1:], sections.extract_sections(self.lines, 'test', ['geometry'], True)['geometry'])
+        self.assertEqual({'geometry': [1, 6, 11]}, sections.find_starts(self.lines, 'test', ['geometry']))
+
+        atoms, trajectory = sections.trajectory(self.lines, 'test')
+        self.assertEqual(['H', 'H'], atoms)
+        self.assertEqual((2, 2, 3), trajectory.shape)
+        self.assertAlmostEqual(2*0.52917721067, trajectory[1, 1, 2])
+
+    def test_lazy_output(self):
+        class Output(sections.LazyOutput):
+            HEADERS = {'start': 'START', 'header': ('head', 'H 0 0 1')}
+
+        output = Output(self.lines)
+        self.assertEqual(self.lines[11:], list(output.last('start')))
+        self.assertEqual(self.lines[4:], list(output.last('header')))
+        self.assertNotIn('index', output.__dict__)
+        self.assertEqual({'start': [1, 6, 11], 'header': [0, 4]}, dict(output.index))
+        self.assertEqual(self.lines[11:], list(output.last('start')))
+        self.assertIsNone(Output(['\n']).last('start'))
+        self.assertIsNot(Output.of(self.lines), Output.of(self.lines))
+        with LazyLines('qchem_output.dat') as lines:
+            self.assertIs(Output.of(lines), Output.of(lines))
+
+    def test_indented(self):
+        """Headers are found whatever their indentation"""
+        lines = QCHEM_5.splitlines(True)
+        geom = ['O\t0.0000000000\t0.0000000000\t0.1187000000\n', 'H\t0.0000000000\t0.7568000000\t-0.4748000000\n',
+                'H\t0.0000000000\t-0.7568000000\t-0.4748000000\n']
+        self.assertEqual(geom, qchem.get_geom(lines))
+        self.assertEqual(1, len(qchem.plot(lines)))
+        self.assertEqual([''.join(lines[8:12])], qchem.check_convergence(lines))
+        self.assertEqual(['NSERCH:   4  E=      -38.3712345678  GRAD. MAX=  0.0000123  R.M.S.=  0.0000061'],
+                         gamess.check_convergence(GAMESS.splitlines(True)))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_name = os.path.join(tmpdir, 'output.out')
+            with open(file_name, 'w') as f:
+                f.write(QCHEM_5)
+            with LazyLines(file_name) as lazy:
+                self.assertEqual(geom, qchem.get_geom(lazy))
+                self.assertEqual(qchem.check_convergence(lines), qchem.check_convergence(lazy))
+                self.assertEqual(sections.find_starts(lines, 'qchem'), sections.find_starts(lazy, 'qchem'))
+                # Only indentation is skipped
+                self.assertIsNone(lazy.iter_tail('Energy =', indented=True))
+                self.assertEqual(lines[7:], list(lazy.iter_tail('Nuclear Repulsion', indented=True)))
+        self.assertIsNone(helper.iter_tail(['x Maximum     Tolerance    Cnvgd?\n'], 'Maximum', indented=True))
+        self.assertEqual({'Maximum': [], 'x': [0]}, helper.find_lines(['x Maximum\n'], ['x'], ['Maximum']))
+
+    def test_programs(self):
+        """The program modules register their sections"""
+        with LazyLines('qchem_output.dat') as lines:
+            # The last occurrences are found from the end without indexing the lines
+            last = sections.extract_sections(lines, 'qchem', last=True)
+            self.assertIsNone(lines._offsets)
+            found = sections.extract_sections(lines, 'qchem')
+            self.assertEqual({name: blocks[-1:] for name, blocks in found.items()}, last)
+            self.assertEqual(16, len(found['geometry']))
+            self.assertEqual(16, len(found['convergence']))
+            self.assertEqual(qchem.get_geom(lines), qchem.get_geom(list(lines)))
+            atoms, trajectory = sections.trajectory(lines, 'qchem')
+            self.assertEqual((16, 20, 3), trajectory.shape)
+            self.assertEqual('Fe', atoms[0])
+
+        lines = open('psi4_output.dat').readlines()
+        self.assertEqual(5, len(psi4.plot(lines)))
+        self.assertEqual(['H\t0.0000000000\t0.7581055431\t-0.5647004883\n',
+                          'O\t0.0000000000\t0.0000000000\t0.0711625290\n',
+                          'H\t0.0000000000\t-0.7581055431\t-0.5647004883\n'], psi4.get_geom(lines))
+        self.assertEqual(3, len(psi4.get_geom(lines, 'zmat')))
+        self.assertTrue(all(geom.startswith('3\n') for geom in psi4.plot(lines)))
+
+        lines = open('gamess/CH2_opt.out').readlines()
+        self.assertEqual(6, len(gamess.check_convergence(lines)))
+        self.assertEqual(len(gamess.plot(lines)), len(sections.trajectory(lines, 'gamess')[1]))
+
+        lines = open('cfour/h2o.out').readlines()
+        atoms, trajectory = sections.trajectory(lines, 'cfour')
+        self.assertEqual(['O', 'H', 'H'], atoms)
+        self.assertAlmostEqual(0.11005538*0.52917721067, trajectory[0, 0, 2])
+        self.assertEqual(len(cfour.plot(lines)), len(trajectory))
+
+
+if __name__ == '__main__':
+    unittest.main()
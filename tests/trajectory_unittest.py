@@ -0,0 +1,43 @@
+import os
+import unittest
+import numpy as np
+
+from sys import path
+from tempfile import TemporaryDirectory
+
+path.insert(0, '..')
+
+from qgrep.trajectory import xyz_frames, write_xyz
+
+
+class TestTrajectory(unittest.TestCase):
+    """Tests the multi-frame xyz rendering"""
+
+    def setUp(self):
+        self.atoms = ['O', 'H', 'H']
+        self.trajectory = np.array([[[0, 0, 0.1], [0, 0.75, -0.5], [0, -0.75, -0.5]],
+                                    [[0, 0, 0.2], [0, 0.80, -0.4], [0, -0.80, -0.4]]])
+
+    def test_xyz_frames(self):
+        frames = list(xyz_frames(self.atoms, self.trajectory))
+        self.assertEqual(2, len(frames))
+        self.assertEqual('3\nStep 1\n'
+                         'O\t0.000000\t0.000000\t0.200000\n'
+                         'H\t0.000000\t0.800000\t-0.400000\n'
+                         'H\t0.000000\t-0.800000\t-0.400000\n', frames[1])
+
+        frames = list(xyz_frames(['Cl'], self.trajectory[:, :1], comments=['a', 'b'],
+                                 atom_form='%-3s', coord_form=' %8.3f', end='\n'))
+        self.assertEqual(['1\na\nCl     0.000    0.000    0.100\n\n',
+                          '1\nb\nCl     0.000    0.000    0.200\n\n'], frames)
+
+    def test_write_xyz(self):
+        with TemporaryDirectory() as tmpdir:
+            file_name = os.path.join(tmpdir, 'geom.xyz')
+            write_xyz(file_name, self.atoms, self.trajectory)
+            with open(file_name) as f:
+                self.assertEqual(''.join(xyz_frames(self.atoms, self.trajectory)), f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()